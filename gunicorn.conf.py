@@ -0,0 +1,38 @@
+"""
+Configuración de gunicorn (`gunicorn -c gunicorn.conf.py app:app`).
+
+Con `preload_app`, `app.py` se importa una sola vez en el proceso maestro, así que el horario en
+memoria (`IA_VUELOS_GRAPH=1`), la matriz de distancias y los índices se cargan antes del fork y
+los workers comparten esas páginas (copy-on-write). Antes de cada fork se congela el recolector de
+basura y después, en cada worker, se descartan las conexiones heredadas del pool y se crean los
+procesos del A* paralelo (`IA_VUELOS_PARALLEL_WORKERS`), que no se crean al importar `app`.
+"""
+
+import os
+
+from ia_vuelos import graph, parallel_search, warmup
+
+bind = f"0.0.0.0:{os.environ.get('FLASK_RUN_PORT', '8000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", "4"))
+# varias peticiones por worker, para que el control de admisión (ia_vuelos/admission.py) reparta
+# el presupuesto de cada worker entre ellas en vez de que esperen en la cola del socket
+threads = int(os.environ.get("GUNICORN_THREADS", "4"))
+preload_app = True
+
+
+def pre_fork(server, worker):
+    graph.preparar_fork()
+
+
+def post_fork(server, worker):
+    import app
+
+    # las conexiones abiertas por el maestro no se pueden compartir entre procesos
+    app.engine.dispose(close=False)
+    # los procesos del A* paralelo, antes de que el worker arranque sus hilos (un fork con otros
+    # hilos a la mitad de algo puede dejar candados tomados en los hijos)
+    if parallel_search.habilitado():
+        with app.SessionLocal() as session:
+            parallel_search.para(session, graph.actual())
+    if warmup.habilitado():
+        warmup.abrir_conexiones(app.engine)
@@ -0,0 +1,200 @@
+"""
+Control de admisión de las búsquedas de rutas, por worker.
+
+El costo de una búsqueda varía en órdenes de magnitud según la distancia entre origen y destino y
+la densidad de vuelos, así que antes de correrla se estima (`Controlador.estimar`):
+
+- si el par ya se buscó, con el promedio móvil (EWMA) de los nodos que expandió;
+- si no, con la distancia (km) multiplicada por el promedio móvil de nodos expandidos por km de
+  todas las búsquedas, ajustada por el número de destinos directos del origen respecto a la
+  mediana (con el horario en memoria).
+
+El costo se mide en "búsquedas típicas" (`EXPANSIONES_POR_UNIDAD` nodos) y el worker tiene un
+presupuesto de costo en curso (`IA_VUELOS_ADMISSION_BUDGET`). Una búsqueda entra si cabe en lo que
+queda del presupuesto (o si no hay ninguna otra corriendo); si no, las de prioridad baja se
+rechazan de inmediato y las demás esperan hasta `IA_VUELOS_ADMISSION_MAX_WAIT_S` segundos a que
+se libere presupuesto. Las rechazadas se responden con 429 y `Retry-After`.
+
+Se activa con `IA_VUELOS_ADMISSION=1`; las métricas son `ia_vuelos_admission_total` (por
+resultado), `ia_vuelos_admission_queue_depth` y `ia_vuelos_admission_in_flight_cost`.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import numpy as np
+
+from ia_vuelos import direct_flights, graph, metrics
+from ia_vuelos.lib import heuristica_a_objetivos
+from ia_vuelos.sqlalchemy import Airport
+
+EXPANSIONES_POR_UNIDAD = 50
+# peso de la observación nueva en los promedios móviles
+ALFA = 0.2
+# pares de aeropuertos de los que se guarda historial
+TAMANIO_HISTORIAL = 100_000
+
+
+class Rechazada(Exception):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(f"sin presupuesto, reintentar en {retry_after} s")
+        self.retry_after = retry_after
+
+
+class Estimacion:
+    def __init__(self, par: tuple, km: float, expansiones: float) -> None:
+        self.par = par
+        self.km = km
+        self.expansiones = expansiones
+        self.costo = max(expansiones / EXPANSIONES_POR_UNIDAD, 0.1)
+
+
+def _ewma(anterior: float | None, valor: float) -> float:
+    return valor if anterior is None else (1 - ALFA) * anterior + ALFA * valor
+
+
+class Controlador:
+    def __init__(self, presupuesto: float, espera_maxima: float) -> None:
+        self.presupuesto = presupuesto
+        self.espera_maxima = espera_maxima
+        self._condicion = threading.Condition()
+        self._en_curso = 0.0
+        self._corriendo = 0
+        self._esperando = 0
+        # {par: EWMA de nodos expandidos}, con los pares menos recientes primero
+        self._historial: OrderedDict[tuple, float] = OrderedDict()
+        self._expansiones_por_km: float | None = None
+        self._segundos_por_unidad: float | None = None
+        # (horario, destinos directos por aeropuerto, mediana)
+        self._grados: tuple | None = None
+
+    def _grado(self, origenes: list[Airport]) -> float:
+        """
+        Destinos directos de los orígenes respecto a la mediana de todos los aeropuertos (1 sin
+        horario en memoria).
+        """
+        horario = graph.actual()
+        if horario is None:
+            return 1.0
+        if self._grados is None or self._grados[0] is not horario:
+            grados = direct_flights.para(horario).grados()
+            self._grados = (horario, grados, max(float(np.median(grados[grados > 0])), 1.0))
+        _, grados, mediana = self._grados
+        indices = [horario.indice(int(origen.id)) for origen in origenes]
+        return max(sum(int(grados[i]) for i in indices if i >= 0), 1) / mediana
+
+    def estimar(self, origenes: list[Airport], objetivos: list[Airport]) -> Estimacion:
+        par = (
+            tuple(sorted(int(a.id) for a in origenes)),
+            tuple(sorted(int(a.id) for a in objetivos)),
+        )
+        distancia = heuristica_a_objetivos(objetivos)
+        km = min(distancia(origen) for origen in origenes)
+        with self._condicion:
+            conocido = self._historial.get(par)
+            por_km = self._expansiones_por_km
+        if conocido is not None:
+            return Estimacion(par, km, conocido)
+        if por_km is None:
+            # sin historial todavía: todas cuentan como una búsqueda típica
+            return Estimacion(par, km, EXPANSIONES_POR_UNIDAD)
+        return Estimacion(par, km, por_km * km * math.sqrt(self._grado(origenes)))
+
+    def _retry_after(self) -> int:
+        segundos = self._segundos_por_unidad or 1.0
+        return max(1, math.ceil(segundos * self._en_curso / self.presupuesto))
+
+    @contextmanager
+    def admitir(self, estimacion: Estimacion, prioridad: str = "normal"):
+        """
+        Se corre el bloque si la búsqueda cabe en el presupuesto; si no, se lanza `Rechazada`
+        (de inmediato con prioridad `"low"`, o después de esperar `espera_maxima`).
+        """
+        costo = min(estimacion.costo, self.presupuesto)
+        with self._condicion:
+            limite = time.monotonic() + self.espera_maxima
+
+            def cabe() -> bool:
+                return self._corriendo == 0 or self._en_curso + costo <= self.presupuesto
+
+            if not cabe():
+                if prioridad == "low":
+                    metrics.incrementar("ia_vuelos_admission_total", resultado="rechazada")
+                    raise Rechazada(self._retry_after())
+                self._esperando += 1
+                metrics.fijar("ia_vuelos_admission_queue_depth", self._esperando)
+                try:
+                    while not cabe():
+                        restante = limite - time.monotonic()
+                        if restante <= 0:
+                            metrics.incrementar("ia_vuelos_admission_total", resultado="rechazada")
+                            raise Rechazada(self._retry_after())
+                        self._condicion.wait(restante)
+                finally:
+                    self._esperando -= 1
+                    metrics.fijar("ia_vuelos_admission_queue_depth", self._esperando)
+                metrics.incrementar("ia_vuelos_admission_total", resultado="diferida")
+            else:
+                metrics.incrementar("ia_vuelos_admission_total", resultado="admitida")
+            self._en_curso += costo
+            self._corriendo += 1
+            metrics.fijar("ia_vuelos_admission_in_flight_cost", self._en_curso)
+
+        try:
+            yield
+        finally:
+            with self._condicion:
+                self._en_curso -= costo
+                self._corriendo -= 1
+                metrics.fijar("ia_vuelos_admission_in_flight_cost", self._en_curso)
+                self._condicion.notify_all()
+
+    def registrar(self, estimacion: Estimacion, expansiones: int, segundos: float) -> None:
+        """
+        Se actualizan los promedios con lo que realmente costó la búsqueda.
+        """
+        with self._condicion:
+            self._historial[estimacion.par] = _ewma(
+                self._historial.pop(estimacion.par, None), expansiones
+            )
+            if len(self._historial) > TAMANIO_HISTORIAL:
+                self._historial.popitem(last=False)
+            if estimacion.km > 0:
+                self._expansiones_por_km = _ewma(
+                    self._expansiones_por_km, expansiones / estimacion.km
+                )
+            unidades = max(expansiones / EXPANSIONES_POR_UNIDAD, 0.1)
+            self._segundos_por_unidad = _ewma(self._segundos_por_unidad, segundos / unidades)
+
+
+def habilitado() -> bool:
+    return os.environ.get("IA_VUELOS_ADMISSION", "") not in ("", "0")
+
+
+_controlador: Controlador | None = None
+_creando = threading.Lock()
+
+
+def actual() -> Controlador | None:
+    """
+    El controlador del proceso, si está activado (`IA_VUELOS_ADMISSION=1`). Se crea una sola vez
+    aunque lo pidan varios hilos a la vez: con dos, cada uno tendría su propio presupuesto.
+    """
+    global _controlador
+    if _controlador is None and habilitado():
+        with _creando:
+            if _controlador is None:
+                _controlador = Controlador(
+                    presupuesto=float(os.environ.get("IA_VUELOS_ADMISSION_BUDGET", "8")),
+                    espera_maxima=float(os.environ.get("IA_VUELOS_ADMISSION_MAX_WAIT_S", "2")),
+                )
+    return _controlador
+
+
+def usar(controlador: Controlador | None) -> None:
+    global _controlador
+    _controlador = controlador
@@ -0,0 +1,135 @@
+"""
+Recursos estáticos del frontend (el bundle de Elm y `static/styles.css`) con huella y precomprimidos.
+
+`scripts/build_assets.py` copia cada recurso a `IA_VUELOS_ASSETS_DIR` (`static/dist`) con el hash
+de su contenido en el nombre (`main.3f9a1c0e5b.js`), junto con sus variantes `.gz` y `.br`, y
+escribe `manifest.json` (`{"main.js": "main.3f9a1c0e5b.js", ...}`). Como el nombre cambia con el
+contenido, los recursos se sirven con `Cache-Control: immutable` por un año: el navegador no los
+vuelve a pedir hasta el siguiente build.
+
+La página (`templates/app.html`) se genera una vez por proceso con los nombres del manifiesto y la
+URL base de la API (`IA_VUELOS_API_BASE`, vacía: el mismo origen), así que el mismo build sirve en
+cualquier ambiente. Se guarda en memoria también comprimida y se sirve con `Cache-Control:
+no-cache` y `ETag` (las revalidaciones se responden con 304).
+
+Los recursos se cargan en memoria al arrancar; en todos los casos se elige la variante según el
+`Accept-Encoding` de la petición y se responde con `Vary: Accept-Encoding`.
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+from typing import Callable
+
+from flask import Response, request
+
+from ia_vuelos.responses import brotli, codificacion_aceptada
+
+DIRECTORIO_DEFAULT = os.environ.get("IA_VUELOS_ASSETS_DIR", "static/dist")
+MANIFIESTO = "manifest.json"
+EXTENSIONES = {"br": ".br", "gzip": ".gz"}
+
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+
+class Recurso:
+    def __init__(self, variantes: dict[str | None, bytes], mimetype: str, huella: str) -> None:
+        # {codificación (None: sin comprimir): cuerpo}
+        self.variantes = variantes
+        self.mimetype = mimetype
+        self.huella = huella
+
+    def nbytes(self) -> int:
+        return sum(len(cuerpo) for cuerpo in self.variantes.values())
+
+    def respuesta(self, cache_control: str) -> Response:
+        codificacion = codificacion_aceptada()
+        if codificacion not in self.variantes:
+            codificacion = None
+        etag = f"{self.huella}-{codificacion or 'identity'}"
+        headers = {"Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+        else:
+            if codificacion is not None:
+                headers["Content-Encoding"] = codificacion
+            response = Response(
+                self.variantes[codificacion], mimetype=self.mimetype, headers=headers
+            )
+        response.set_etag(etag)
+        return response
+
+
+def huella(contenido: bytes) -> str:
+    return hashlib.sha256(contenido).hexdigest()[:10]
+
+
+def comprimir(contenido: bytes) -> dict[str | None, bytes]:
+    """
+    El contenido sin comprimir, con gzip y (si está instalado) con brotli, al máximo nivel.
+    """
+    variantes: dict[str | None, bytes] = {
+        None: contenido,
+        "gzip": gzip.compress(contenido, 9, mtime=0),
+    }
+    if brotli is not None:
+        variantes["br"] = brotli.compress(contenido, quality=11)
+    return variantes
+
+
+class Recursos:
+    def __init__(self, directorio: str, manifiesto: dict[str, str]) -> None:
+        self.directorio = directorio
+        # {nombre lógico: nombre con huella}
+        self.manifiesto = manifiesto
+        self.recursos: dict[str, Recurso] = {}
+        for nombre in manifiesto.values():
+            ruta = os.path.join(directorio, nombre)
+            with open(ruta, "rb") as f:
+                variantes: dict[str | None, bytes] = {None: f.read()}
+            for codificacion, extension in EXTENSIONES.items():
+                if os.path.exists(ruta + extension):
+                    with open(ruta + extension, "rb") as f:
+                        variantes[codificacion] = f.read()
+            mimetype = mimetypes.guess_type(nombre)[0] or "application/octet-stream"
+            self.recursos[nombre] = Recurso(variantes, mimetype, huella(variantes[None]))
+        self._pagina: Recurso | None = None
+
+    def url(self, nombre: str) -> str:
+        return f"/assets/{self.manifiesto[nombre]}"
+
+    def respuesta(self, nombre: str) -> Response | None:
+        """
+        El recurso con huella `nombre` (solo los del manifiesto), o `None` si no existe.
+        """
+        recurso = self.recursos.get(nombre)
+        return None if recurso is None else recurso.respuesta(CACHE_INMUTABLE)
+
+    def pagina(self, generar: Callable[[], str]) -> Response:
+        """
+        La página principal; `generar` se llama solo la primera vez.
+        """
+        if self._pagina is None:
+            contenido = generar().encode()
+            self._pagina = Recurso(comprimir(contenido), "text/html", huella(contenido))
+        return self._pagina.respuesta("no-cache")
+
+
+def cargar(directorio: str = DIRECTORIO_DEFAULT) -> Recursos | None:
+    """
+    Los recursos de `directorio`, o `None` si no hay build (no existe el manifiesto).
+    """
+    ruta = os.path.join(directorio, MANIFIESTO)
+    if not os.path.exists(ruta):
+        return None
+    with open(ruta) as f:
+        return Recursos(directorio, json.load(f))
+
+
+def api_base() -> str:
+    """
+    URL base de la API que usa el frontend (`IA_VUELOS_API_BASE`); vacía es el mismo origen.
+    """
+    return os.environ.get("IA_VUELOS_API_BASE", "").rstrip("/")
@@ -0,0 +1,67 @@
+"""
+Caché LRU de rutas ya calculadas, por proceso.
+
+La llave es `(ids de origen, ids de destino, fecha, k)` (con los ids ordenados, ya expandidos por
+radio o ciudad) y el valor es el cuerpo de la respuesta de `/get_path`, ya como diccionario, así
+que no guarda objetos del ORM ligados a una sesión. El tamaño se toma de
+`IA_VUELOS_ROUTE_CACHE_SIZE`; sin definirla (o con 0) la caché está desactivada, porque nada la
+invalida si se vuelve a llenar la tabla `flights`: al cambiar los vuelos hay que reiniciar los
+procesos.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from ia_vuelos import metrics
+
+TAMANIO_DEFAULT = int(os.environ.get("IA_VUELOS_ROUTE_CACHE_SIZE", "0"))
+
+
+def llave_ruta(origin_ids, destination_ids, fecha: str, k: int = 1) -> tuple:
+    return (tuple(sorted(origin_ids)), tuple(sorted(destination_ids)), fecha, k)
+
+
+class CacheLRU:
+    def __init__(self, tamanio: int = TAMANIO_DEFAULT) -> None:
+        self.tamanio = tamanio
+        self._lock = threading.Lock()
+        self._datos: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._datos)
+
+    def __contains__(self, llave: Hashable) -> bool:
+        return llave in self._datos
+
+    def habilitada(self) -> bool:
+        return self.tamanio > 0
+
+    def obtener(self, llave: Hashable) -> Any | None:
+        if not self.habilitada():
+            return None
+        with self._lock:
+            valor = self._datos.get(llave)
+            if valor is not None:
+                self._datos.move_to_end(llave)
+        metrics.incrementar(
+            "ia_vuelos_route_cache_total", resultado="hit" if valor is not None else "miss"
+        )
+        return valor
+
+    def guardar(self, llave: Hashable, valor: Any) -> None:
+        if not self.habilitada():
+            return
+        with self._lock:
+            self._datos[llave] = valor
+            self._datos.move_to_end(llave)
+            while len(self._datos) > self.tamanio:
+                self._datos.popitem(last=False)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._datos.clear()
+
+
+rutas = CacheLRU()
@@ -0,0 +1,143 @@
+"""
+Captura de las peticiones a la API, para dimensionar la caché de rutas y los workers con el tráfico
+real (`scripts/replay.py`).
+
+Con `IA_VUELOS_CAPTURE=1`, cada petición a `CAPTURADOS` (`/get_path`, `/get_airports`,
+`/get_countries`) deja una línea NDJSON:
+
+```json
+{"ts": 1718000000.123456, "endpoint": "get_path", "path": "/get_path",
+ "args": {"origin_id": "3", "destination_id": "26955", "date": "2024-01-02"},
+ "status": 200, "ms": 41.7}
+```
+
+`ms` es el tiempo hasta que se arma la respuesta (sin contar su envío). En la petición solo se
+arma el diccionario y se mete a una cola (`logging.handlers.QueueHandler`); un hilo aparte lo
+serializa y lo escribe. Si la cola se llena, la línea se descarta en vez de frenar la petición.
+
+Cada proceso escribe su propio archivo, `IA_VUELOS_CAPTURE_DIR/requests.<pid>.ndjson` (por
+defecto en `data/capture`), que rota al llegar a `IA_VUELOS_CAPTURE_MAX_MB` MiB (64) guardando
+`IA_VUELOS_CAPTURE_BACKUPS` archivos anteriores (10). Con `IA_VUELOS_CAPTURE_SAMPLE` (entre 0 y 1)
+se captura solo esa fracción de las peticiones. El mismo formato sirve de archivo de repetición
+para el arranque en caliente (`IA_VUELOS_WARMUP_REPLAY`).
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+import time
+
+from ia_vuelos import metrics
+
+CAPTURADOS = frozenset({"get_path", "get_airports", "get_countries"})
+
+DIRECTORIO_DEFAULT = os.environ.get("IA_VUELOS_CAPTURE_DIR", "data/capture")
+# líneas que pueden esperar a que las escriba el hilo
+TAMANIO_COLA = 10_000
+
+
+class _Encolador(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # se serializa en el hilo que escribe, no en el de la petición
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            metrics.incrementar("ia_vuelos_capture_dropped_total")
+
+
+class _FormatoNDJSON(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        return json.dumps(record.msg, separators=(",", ":"), ensure_ascii=False)
+
+
+class Captura:
+    def __init__(self, ruta: str, max_bytes: int, respaldos: int, muestreo: float = 1.0) -> None:
+        self.ruta = ruta
+        self.muestreo = muestreo
+        self.pid = os.getpid()
+        self._cerrada = False
+
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        archivo = logging.handlers.RotatingFileHandler(
+            ruta, maxBytes=max_bytes, backupCount=respaldos, encoding="utf-8"
+        )
+        archivo.setFormatter(_FormatoNDJSON())
+        cola: queue.Queue = queue.Queue(TAMANIO_COLA)
+        self._escritor = logging.handlers.QueueListener(cola, archivo)
+        self._escritor.start()
+
+        # un logger por captura (y sin propagar), para que no lo toquen los handlers de la app
+        self._logger = logging.getLogger(f"ia_vuelos.captura.{self.pid}")
+        self._logger.propagate = False
+        self._logger.setLevel(logging.INFO)
+        self._logger.handlers = [_Encolador(cola)]
+
+    def registrar(
+        self, endpoint: str, path: str, args: dict[str, str], status: int, segundos: float
+    ) -> None:
+        if self.muestreo < 1 and random.random() >= self.muestreo:
+            return
+        self._logger.info(
+            {
+                "ts": round(time.time(), 6),
+                "endpoint": endpoint,
+                "path": path,
+                "args": args,
+                "status": status,
+                "ms": round(segundos * 1000, 3),
+            }
+        )
+
+    def cerrar(self) -> None:
+        """
+        Se escriben las líneas que quedan en la cola y se cierra el archivo.
+        """
+        if self._cerrada:
+            return
+        self._cerrada = True
+        self._escritor.stop()
+        for handler in self._escritor.handlers:
+            handler.close()
+
+
+def habilitado() -> bool:
+    return os.environ.get("IA_VUELOS_CAPTURE", "") not in ("", "0")
+
+
+_captura: Captura | None = None
+_lock = threading.Lock()
+
+
+def actual() -> Captura | None:
+    """
+    La captura del proceso, si está activada (`IA_VUELOS_CAPTURE=1`). Se crea en el primer uso de
+    cada proceso, porque el hilo que escribe no sobrevive al fork de los workers de gunicorn.
+    """
+    global _captura
+    if _captura is not None and _captura.pid == os.getpid():
+        return _captura
+    if not habilitado():
+        return None
+    with _lock:
+        if _captura is None or _captura.pid != os.getpid():
+            _captura = Captura(
+                os.path.join(DIRECTORIO_DEFAULT, f"requests.{os.getpid()}.ndjson"),
+                max_bytes=int(float(os.environ.get("IA_VUELOS_CAPTURE_MAX_MB", "64")) * 2**20),
+                respaldos=int(os.environ.get("IA_VUELOS_CAPTURE_BACKUPS", "10")),
+                muestreo=float(os.environ.get("IA_VUELOS_CAPTURE_SAMPLE", "1")),
+            )
+            atexit.register(_captura.cerrar)
+    return _captura
+
+
+def usar(captura: Captura | None) -> None:
+    global _captura
+    _captura = captura
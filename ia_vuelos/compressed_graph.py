@@ -0,0 +1,428 @@
+"""
+Horario en memoria comprimido, para tener un año de vuelos residente en cada worker.
+
+Son los mismos vuelos, en las mismas posiciones (por aeropuerto de salida y hora de salida), que
+en `graph.Horario`, pero codificados por columnas:
+
+- salida: en bloques de `BLOQUE` vuelos de un mismo aeropuerto, la hora del primero (`ancla`) y,
+  por vuelo, la diferencia con el anterior (uint16 si cabe) en la unidad más grande que divide a
+  todas las horas (minutos en los datos de `scripts/populate_flights.py`);
+- tramo: por aeropuerto de salida, un diccionario de `(destino, modelo, duración)` (la duración
+  solo depende de la distancia y la velocidad del modelo) y, por vuelo, su índice en ese
+  diccionario (uint8 si cabe). La llegada es la salida más la duración del tramo;
+- precios: por tramo el mínimo y, por vuelo, la diferencia cuantizada a `paso_precio` centavos
+  (uint16; el paso es un centavo si cabe y si no se duplica hasta que quepa);
+- flight_id: como entero en base 36 (uint32) si todos son de 6 caracteres `[0-9A-Z]`.
+
+Todo es exacto salvo los precios, si el paso pasa de un centavo (error máximo `paso_precio / 2`).
+`columnas(inicio, fin)` decodifica solo los bloques del rango (una suma acumulada por bloque), que
+es lo que pide `graph.vecinos` en cada expansión, y `salidas` hace la búsqueda binaria sobre las
+anclas y decodifica un solo bloque. Las columnas (`salida`, `llegada`, `destino`, ...) también se
+pueden indexar como arreglos, decodificando los bloques necesarios, para los índices que se
+construyen sobre el horario (`direct_flights`, `reachability`).
+
+Se activa con `IA_VUELOS_GRAPH_COMPRESSED=1` (junto con `IA_VUELOS_GRAPH=1`).
+"""
+
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+
+from ia_vuelos import graph
+from ia_vuelos.graph import COLUMNAS, Horario, a_microsegundos
+from ia_vuelos.sqlalchemy import Flight
+
+BLOQUE = 64
+
+_ALFABETO = np.frombuffer(b"0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ", dtype=np.uint8)
+_LARGO_ID = 6
+_MINUTO_US = 60_000_000
+_SEGUNDO_US = 1_000_000
+
+
+def _entero_minimo(maximo: int) -> type:
+    for tipo in (np.uint8, np.uint16, np.uint32):
+        if maximo <= np.iinfo(tipo).max:
+            return tipo
+    return np.uint64
+
+
+def _minimos_compactos(centavos: np.ndarray) -> np.ndarray:
+    if len(centavos) and centavos.min() >= 0:
+        return centavos.astype(_entero_minimo(int(centavos.max())))
+    return centavos
+
+
+def _codificar_ids(flight_id: np.ndarray) -> np.ndarray | None:
+    """
+    Los ids como enteros en base 36, o `None` si alguno no es de `_LARGO_ID` caracteres
+    `[0-9A-Z]`.
+    """
+    if len(flight_id) == 0 or not (np.char.str_len(flight_id) == _LARGO_ID).all():
+        return None
+    digito = np.full(256, -1, dtype=np.int64)
+    digito[_ALFABETO] = np.arange(len(_ALFABETO))
+    caracteres = flight_id.astype(f"S{_LARGO_ID}").view(np.uint8).reshape(-1, _LARGO_ID)
+    digitos = digito[caracteres]
+    if (digitos < 0).any():
+        return None
+    potencias = len(_ALFABETO) ** np.arange(_LARGO_ID - 1, -1, -1, dtype=np.int64)
+    return (digitos @ potencias).astype(np.uint32)
+
+
+def _decodificar_ids(valores: np.ndarray) -> np.ndarray:
+    potencias = len(_ALFABETO) ** np.arange(_LARGO_ID - 1, -1, -1, dtype=np.int64)
+    digitos = (valores.astype(np.int64)[:, None] // potencias) % len(_ALFABETO)
+    return np.ascontiguousarray(_ALFABETO[digitos]).view(f"S{_LARGO_ID}").ravel()
+
+
+class _Columna:
+    """
+    Una columna del horario comprimido que se indexa como arreglo (`[i]`, `[inicio:fin]`,
+    `[posiciones]`, `[máscara]`) decodificando solo los bloques necesarios.
+    """
+
+    def __init__(self, horario: "HorarioComprimido", nombre: str) -> None:
+        self.horario = horario
+        self.nombre = nombre
+
+    def __len__(self) -> int:
+        return len(self.horario)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        arreglo = self.horario.columnas(0, len(self.horario), (self.nombre,))[self.nombre]
+        return arreglo if dtype is None else arreglo.astype(dtype)
+
+    def __getitem__(self, indice):
+        if isinstance(indice, slice):
+            inicio, fin, paso = indice.indices(len(self))
+            if paso != 1:
+                return np.asarray(self)[indice]
+            return self.horario.columnas(inicio, fin, (self.nombre,))[self.nombre]
+        if isinstance(indice, (int, np.integer)):
+            i = int(indice) + (len(self) if indice < 0 else 0)
+            return self.horario.columnas(i, i + 1, (self.nombre,))[self.nombre][0]
+        posiciones = np.asarray(indice)
+        if posiciones.dtype == bool:
+            posiciones = np.flatnonzero(posiciones)
+        return self.horario.tomar(self.nombre, posiciones)
+
+
+class HorarioComprimido:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        offsets: np.ndarray,
+        modelos: tuple[str, ...],
+        unidad: int,
+        bloque_inicio: np.ndarray,
+        bloque_origen: np.ndarray,
+        bloque_offsets: np.ndarray,
+        ancla: np.ndarray,
+        delta: np.ndarray,
+        tramo_offsets: np.ndarray,
+        tramo_destino: np.ndarray,
+        tramo_modelo: np.ndarray,
+        tramo_duracion: np.ndarray,
+        tramo_business: np.ndarray,
+        tramo_economy: np.ndarray,
+        tramo: np.ndarray,
+        paso_precio: int,
+        precio_business: np.ndarray,
+        precio_economy: np.ndarray,
+        flight_id: np.ndarray,
+    ) -> None:
+        # como en `Horario`
+        self.ids = ids
+        self.offsets = offsets
+        self.modelos = modelos
+        # µs por unidad de las horas de salida
+        self.unidad = unidad
+        # por bloque: posición del primer vuelo, aeropuerto de salida (posición en `ids`) y hora
+        # de salida del primero (en `unidad`); los bloques del aeropuerto `i` son
+        # `bloque_offsets[i]:bloque_offsets[i + 1]`
+        self.bloque_inicio = bloque_inicio
+        self.bloque_origen = bloque_origen
+        self.bloque_offsets = bloque_offsets
+        self.ancla = ancla
+        # por tramo (los del aeropuerto `i` son `tramo_offsets[i]:tramo_offsets[i + 1]`):
+        # destino, modelo, duración (µs) y precios mínimos (centavos), con el entero más chico
+        # que alcance
+        self.tramo_offsets = tramo_offsets
+        self.tramo_destino = tramo_destino
+        self.tramo_modelo = tramo_modelo
+        self.tramo_duracion = tramo_duracion
+        self.tramo_business = tramo_business
+        self.tramo_economy = tramo_economy
+        self.paso_precio = paso_precio
+        # por vuelo: diferencia con la salida anterior del bloque (0 en el primero), tramo
+        # (índice en los del aeropuerto), precios sobre el mínimo del tramo (en `paso_precio`)
+        # e id (base 36 o bytes)
+        self._delta = delta
+        self._tramo = tramo
+        self._precio_business = precio_business
+        self._precio_economy = precio_economy
+        self._flight_id = flight_id
+
+        # las columnas de `Horario`, decodificadas al indexarlas
+        self.salida = _Columna(self, "salida")
+        self.llegada = _Columna(self, "llegada")
+        self.destino = _Columna(self, "destino")
+        self.flight_id = _Columna(self, "flight_id")
+        self.modelo = _Columna(self, "modelo")
+        self.precio_business = _Columna(self, "precio_business")
+        self.precio_economy = _Columna(self, "precio_economy")
+
+    def __len__(self) -> int:
+        return len(self._delta)
+
+    def nbytes(self) -> int:
+        return sum(
+            arreglo.nbytes
+            for arreglo in (
+                self.ids,
+                self.offsets,
+                self.bloque_inicio,
+                self.bloque_origen,
+                self.bloque_offsets,
+                self.ancla,
+                self.tramo_offsets,
+                self.tramo_destino,
+                self.tramo_modelo,
+                self.tramo_duracion,
+                self.tramo_business,
+                self.tramo_economy,
+                self._delta,
+                self._tramo,
+                self._precio_business,
+                self._precio_economy,
+                self._flight_id,
+            )
+        )
+
+    def indice(self, airport_id: int) -> int:
+        i = int(np.searchsorted(self.ids, airport_id))
+        if i < len(self.ids) and self.ids[i] == airport_id:
+            return i
+        return -1
+
+    def _fin_bloque(self, bloque: int) -> int:
+        if bloque + 1 < len(self.bloque_inicio):
+            return int(self.bloque_inicio[bloque + 1])
+        return len(self)
+
+    def _primera(self, origen: int, valor: int) -> int:
+        """
+        Primera posición de los vuelos de `origen` que sale en `valor` (en `unidad`) o después.
+        """
+        primero, ultimo = self.bloque_offsets[origen], self.bloque_offsets[origen + 1]
+        k = primero + int(np.searchsorted(self.ancla[primero:ultimo], valor, side="left"))
+        if k == primero:
+            return int(self.offsets[origen])
+        # el bloque anterior sale antes de `valor`; la respuesta está en él o es el inicio de `k`
+        inicio, fin = int(self.bloque_inicio[k - 1]), self._fin_bloque(k - 1)
+        horas = self.ancla[k - 1] + np.cumsum(self._delta[inicio:fin], dtype=np.int64)
+        return inicio + int(np.searchsorted(horas, valor, side="left"))
+
+    def salidas(self, origen: int, desde: datetime, hasta: datetime) -> range:
+        """
+        Como `Horario.salidas`, decodificando a lo más dos bloques.
+        """
+        if self.offsets[origen] == self.offsets[origen + 1]:
+            return range(int(self.offsets[origen]), int(self.offsets[origen]))
+        # primera salida `>= desde`: en unidades, redondeando hacia arriba
+        desde_u = -(-a_microsegundos(desde) // self.unidad)
+        hasta_u = -(-a_microsegundos(hasta) // self.unidad)
+        return range(self._primera(origen, desde_u), self._primera(origen, hasta_u))
+
+    def columnas(
+        self, inicio: int, fin: int, nombres: tuple[str, ...] = COLUMNAS
+    ) -> dict[str, np.ndarray]:
+        """
+        Las columnas `nombres` de los vuelos en las posiciones `[inicio, fin)`, decodificando los
+        bloques que las contienen.
+        """
+        inicio = min(inicio, len(self))
+        fin = min(max(fin, inicio), len(self))
+        b0 = int(np.searchsorted(self.bloque_inicio, inicio, side="right")) - 1
+        b1 = int(np.searchsorted(self.bloque_inicio, fin - 1, side="right")) - 1
+        un_bloque = fin > inicio and b0 == b1
+        if fin == inicio:
+            b0, b1 = 0, -1
+        # desde el inicio del primer bloque, para la suma acumulada de las salidas
+        base = int(self.bloque_inicio[b0]) if b1 >= b0 else inicio
+        if un_bloque:
+            # lo usual (las salidas de un aeropuerto en una ventana): sin arreglos por bloque
+            bloques = b0
+            inicios = np.zeros(1, dtype=np.int64)
+        else:
+            inicios = self.bloque_inicio[b0 : b1 + 1] - base
+            bloques = np.repeat(np.arange(b0, b1 + 1), np.diff(np.append(inicios, fin - base)))
+            bloques = bloques[inicio - base :]
+
+        resultado = {}
+        tramo = None
+        if {"destino", "modelo", "llegada", "precio_business", "precio_economy"} & set(nombres):
+            tramo = self.tramo_offsets[self.bloque_origen[bloques]] + self._tramo[inicio:fin]
+        if "salida" in nombres or "llegada" in nombres:
+            acumulado = np.cumsum(self._delta[base:fin], dtype=np.int64)
+            # el delta del primer vuelo de cada bloque es 0: se resta lo acumulado hasta ahí
+            salida = self.ancla[bloques] - acumulado[inicios][np.subtract(bloques, b0)]
+            salida = (salida + acumulado[inicio - base :]) * self.unidad
+            resultado["salida"] = salida
+            if "llegada" in nombres:
+                resultado["llegada"] = salida + self.tramo_duracion[tramo]
+        if "destino" in nombres:
+            resultado["destino"] = self.tramo_destino[tramo].astype(np.int32)
+        if "modelo" in nombres:
+            resultado["modelo"] = self.tramo_modelo[tramo]
+        for nombre, minimo, cuantizado in (
+            ("precio_business", self.tramo_business, self._precio_business),
+            ("precio_economy", self.tramo_economy, self._precio_economy),
+        ):
+            if nombre in nombres:
+                centavos = (
+                    minimo[tramo] + cuantizado[inicio:fin].astype(np.int64) * self.paso_precio
+                )
+                resultado[nombre] = centavos / 100
+        if "flight_id" in nombres:
+            if self._flight_id.dtype.kind == "S":
+                resultado["flight_id"] = self._flight_id[inicio:fin]
+            else:
+                resultado["flight_id"] = _decodificar_ids(self._flight_id[inicio:fin])
+        return {nombre: resultado[nombre] for nombre in nombres}
+
+    def tomar(self, nombre: str, posiciones: np.ndarray) -> np.ndarray:
+        """
+        La columna `nombre` en `posiciones` (en cualquier orden), decodificando un bloque por cada
+        bloque distinto; si son muchos, se decodifica toda la columna.
+        """
+        if len(posiciones) == 0:
+            return self.columnas(0, 0, (nombre,))[nombre]
+        bloques = np.searchsorted(self.bloque_inicio, posiciones, side="right") - 1
+        distintos = np.unique(bloques)
+        if len(distintos) * BLOQUE * 4 >= len(self):
+            return self.columnas(0, len(self), (nombre,))[nombre][posiciones]
+        resultado = None
+        for bloque in distintos.tolist():
+            inicio = int(self.bloque_inicio[bloque])
+            valores = self.columnas(inicio, self._fin_bloque(bloque), (nombre,))[nombre]
+            if resultado is None:
+                resultado = np.empty(len(posiciones), dtype=valores.dtype)
+            de_bloque = bloques == bloque
+            resultado[de_bloque] = valores[posiciones[de_bloque] - inicio]
+        return resultado
+
+    def vuelo(self, posicion: int) -> Flight:
+        return graph.vuelos(self, posicion, posicion + 1)[0]
+
+    def descomprimir(self) -> Horario:
+        return Horario(
+            ids=self.ids,
+            offsets=self.offsets,
+            modelos=self.modelos,
+            **self.columnas(0, len(self)),
+        )
+
+
+def comprimir(horario: Horario) -> HorarioComprimido:
+    n = len(horario.ids)
+    total = len(horario)
+    origen = np.repeat(np.arange(n, dtype=np.int64), np.diff(horario.offsets))
+
+    # bloques de `BLOQUE` vuelos, sin mezclar aeropuertos
+    bloque_inicio = np.flatnonzero((np.arange(total) - horario.offsets[origen]) % BLOQUE == 0)
+    bloque_origen = origen[bloque_inicio].astype(np.int32)
+    bloque_offsets = np.searchsorted(bloque_origen, np.arange(n + 1)).astype(np.int64)
+
+    unidad = 1
+    for candidata in (_MINUTO_US, _SEGUNDO_US):
+        if not (horario.salida % candidata).any():
+            unidad = candidata
+            break
+    salida = horario.salida // unidad
+    delta = np.diff(salida, prepend=salida[:1])
+    delta[bloque_inicio] = 0
+
+    # tramos (destino, modelo, duración) por aeropuerto de salida
+    duracion = horario.llegada - horario.salida
+    orden = np.lexsort((duracion, horario.modelo, horario.destino, origen))
+    llaves = np.stack(
+        (origen[orden], horario.destino[orden], horario.modelo[orden], duracion[orden])
+    )
+    nuevo = np.ones(total, dtype=bool)
+    nuevo[1:] = (llaves[:, 1:] != llaves[:, :-1]).any(axis=0)
+    tramo_global = np.empty(total, dtype=np.int64)
+    tramo_global[orden] = np.cumsum(nuevo) - 1
+    primeros = orden[nuevo]
+    tramo_offsets = np.searchsorted(origen[primeros], np.arange(n + 1)).astype(np.int64)
+    tramo = tramo_global - tramo_offsets[origen]
+
+    # precios: mínimo por tramo y diferencia cuantizada
+    num_tramos = len(primeros)
+    centavos = {
+        nombre: np.round(getattr(horario, nombre) * 100).astype(np.int64)
+        for nombre in ("precio_business", "precio_economy")
+    }
+    minimos = {}
+    for nombre, valores in centavos.items():
+        minimos[nombre] = np.full(num_tramos, np.iinfo(np.int64).max, dtype=np.int64)
+        np.minimum.at(minimos[nombre], tramo_global, valores)
+    rango = max(
+        int((valores - minimos[nombre][tramo_global]).max(initial=0))
+        for nombre, valores in centavos.items()
+    )
+    # con el mismo redondeo que la cuantización (np.round lleva x.5 al par, p.ej. 65535.5 a 65536)
+    paso_precio = 1
+    while (rango + paso_precio // 2) // paso_precio > np.iinfo(np.uint16).max:
+        paso_precio *= 2
+    cuantizados = {
+        nombre: np.round((valores - minimos[nombre][tramo_global]) / paso_precio).astype(np.uint16)
+        for nombre, valores in centavos.items()
+    }
+
+    flight_id = _codificar_ids(horario.flight_id)
+    return HorarioComprimido(
+        ids=horario.ids,
+        offsets=horario.offsets,
+        modelos=horario.modelos,
+        unidad=unidad,
+        bloque_inicio=bloque_inicio.astype(np.int64),
+        bloque_origen=bloque_origen,
+        bloque_offsets=bloque_offsets,
+        ancla=salida[bloque_inicio],
+        delta=delta.astype(_entero_minimo(int(delta.max(initial=0)))),
+        tramo_offsets=tramo_offsets,
+        tramo_destino=horario.destino[primeros].astype(_entero_minimo(max(n - 1, 0))),
+        tramo_modelo=horario.modelo[primeros],
+        tramo_duracion=duracion[primeros],
+        tramo_business=_minimos_compactos(minimos["precio_business"]),
+        tramo_economy=_minimos_compactos(minimos["precio_economy"]),
+        tramo=tramo.astype(_entero_minimo(int(tramo.max(initial=0)))),
+        paso_precio=paso_precio,
+        precio_business=cuantizados["precio_business"],
+        precio_economy=cuantizados["precio_economy"],
+        flight_id=horario.flight_id if flight_id is None else flight_id,
+    )
+
+
+def habilitado() -> bool:
+    return os.environ.get("IA_VUELOS_GRAPH_COMPRESSED", "") not in ("", "0")
+
+
+def cargar_global(horario: Horario) -> HorarioComprimido:
+    """
+    Se comprime el horario cargado (`graph.cargar_global`) y se usa en su lugar para todo el
+    proceso; el horario sin comprimir se libera.
+    """
+    inicio = time.perf_counter()
+    comprimido = comprimir(horario)
+    print(
+        f"Horario comprimido: {len(comprimido)} vuelos, {horario.nbytes() / 2**20:.1f} MiB -> "
+        f"{comprimido.nbytes() / 2**20:.1f} MiB ({time.perf_counter() - inicio:.2f} s)"
+    )
+    graph.usar(comprimido)  # pyright: ignore [reportArgumentType]
+    graph.preparar_fork()
+    return comprimido
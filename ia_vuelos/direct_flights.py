@@ -0,0 +1,172 @@
+"""
+Índice de vuelos directos por par de aeropuertos (origen, destino), sobre el horario en memoria.
+
+Los vuelos del horario están ordenados por (origen, salida); aquí se guarda además una permutación
+que los ordena por (origen, destino, salida), junto con las horas de salida en ese orden, así que
+"los próximos vuelos de A a B después de T" son dos búsquedas binarias: una para el par y otra
+para la hora dentro del par.
+
+Las horas se guardan como uint32 desde la primera salida, en la unidad más grande que divide a
+todas (minutos en los datos de `scripts/populate_flights.py`), así que el índice ocupa 8 bytes por
+vuelo más 8 por par. Con el horario comprimido se decodifican por trozos de `TROZO` vuelos, sin
+pasar por la columna completa de int64.
+
+Sin horario en memoria, `proximas_salidas_db` hace la misma consulta en la base, que la resuelve
+con el índice compuesto `ix_flights_route_departure` de `Flight`.
+"""
+
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ia_vuelos.graph import Horario, a_microsegundos
+from ia_vuelos.sqlalchemy import Flight
+
+# vuelos que se decodifican a la vez al construir el índice
+TROZO = 1 << 20
+# unidades (µs) en que se pueden guardar las horas de salida, de la más grande a la más chica
+_UNIDADES = (60_000_000, 1_000_000)
+
+
+def _trozos(columna, total: int):
+    for inicio in range(0, total, TROZO):
+        yield np.asarray(columna[inicio : min(inicio + TROZO, total)], dtype=np.int64)
+
+
+def _salidas_compactas(horario: Horario) -> tuple[int, int, np.ndarray]:
+    """
+    `(base, unidad, salidas)`: las horas de salida del horario como `base + salidas * unidad`
+    (µs), con `salidas` en uint32 si caben y si no en int64 (con base 0 y unidad 1).
+    """
+    total = len(horario)
+    minimo, maximo = np.iinfo(np.int64).max, np.iinfo(np.int64).min
+    divide = dict.fromkeys(_UNIDADES, True)
+    for trozo in _trozos(horario.salida, total):
+        minimo, maximo = min(minimo, int(trozo.min())), max(maximo, int(trozo.max()))
+        for unidad in _UNIDADES:
+            divide[unidad] = divide[unidad] and not (trozo % unidad).any()
+    # estrictamente menor que el máximo: así una consulta recortada al máximo no excluye nada
+    unidades = [
+        u for u in _UNIDADES if divide[u] and (maximo - minimo) // u < np.iinfo(np.uint32).max
+    ]
+    if total == 0 or not unidades:
+        return 0, 1, np.asarray(horario.salida, dtype=np.int64)
+    base, unidad = minimo, unidades[0]
+    salidas = np.empty(total, dtype=np.uint32)
+    for i, trozo in enumerate(_trozos(horario.salida, total)):
+        salidas[i * TROZO : i * TROZO + len(trozo)] = (trozo - base) // unidad
+    return base, unidad, salidas
+
+
+class IndiceDirectos:
+    def __init__(self, horario: Horario) -> None:
+        self.horario = horario
+        n = len(horario.ids)
+        origen = np.repeat(np.arange(n, dtype=np.int64), np.diff(horario.offsets))
+        pares = origen * n + np.asarray(horario.destino, dtype=np.int64)
+        # estable: dentro de cada par se conserva el orden por hora de salida
+        orden = np.argsort(pares, kind="stable")
+        pares = pares[orden]
+        # llave `origen * n + destino` de cada par con vuelos; los del par `i` son
+        # `orden[inicios[i]:inicios[i + 1]]`
+        pares, inicios = np.unique(pares, return_index=True)
+        self.pares = pares.astype(np.int32 if n * n < 2**31 else np.int64)
+        entero = np.int32 if len(orden) < 2**31 else np.int64
+        self.inicios = np.append(inicios, len(orden)).astype(entero)
+        self.orden = orden.astype(entero)
+        # horas de salida en el orden del índice, en `unidad` desde `base` (ver `_en_unidades`)
+        self.base, self.unidad, salidas = _salidas_compactas(horario)
+        self.salida = salidas[orden]
+
+    def __len__(self) -> int:
+        return len(self.pares)
+
+    def nbytes(self) -> int:
+        return self.pares.nbytes + self.inicios.nbytes + self.orden.nbytes + self.salida.nbytes
+
+    def _en_unidades(self, microsegundos: int) -> int:
+        """
+        La primera hora del índice que no es anterior a `microsegundos`, recortada al rango del
+        tipo de `salida`.
+        """
+        valor = -(-(microsegundos - self.base) // self.unidad)
+        return min(max(valor, 0), int(np.iinfo(self.salida.dtype).max))
+
+    def _par(self, origen: int, destino: int) -> tuple[int, int]:
+        llave = origen * len(self.horario.ids) + destino
+        i = int(np.searchsorted(self.pares, llave))
+        if i == len(self.pares) or self.pares[i] != llave:
+            return 0, 0
+        return int(self.inicios[i]), int(self.inicios[i + 1])
+
+    def grados(self) -> np.ndarray:
+        """
+        Número de destinos directos de cada aeropuerto (por posición en `ids`).
+        """
+        n = len(self.horario.ids)
+        return np.bincount(self.pares // n, minlength=n)
+
+    def rango(self, origen: int, destino: int, desde: int, hasta: int) -> np.ndarray:
+        """
+        Posiciones en el horario de los vuelos de `origen` a `destino` (posiciones en `ids`) que
+        salen en `[desde, hasta)` (µs), ordenadas por hora de salida.
+        """
+        inicio, fin = self._par(origen, destino)
+        horas = self.salida[inicio:fin]
+        primero = inicio + int(np.searchsorted(horas, self._en_unidades(desde), side="left"))
+        ultimo = inicio + int(np.searchsorted(horas, self._en_unidades(hasta), side="left"))
+        return self.orden[primero:ultimo]
+
+    def siguientes(self, origen: int, destino: int, desde: datetime, n: int) -> list[int]:
+        """
+        Posiciones de los `n` primeros vuelos de `origen` a `destino` que salen desde `desde`.
+        """
+        inicio, fin = self._par(origen, destino)
+        desde_u = self._en_unidades(a_microsegundos(desde))
+        primero = inicio + int(np.searchsorted(self.salida[inicio:fin], desde_u))
+        return self.orden[primero : min(primero + n, fin)].tolist()
+
+    def mejor_llegada(self, origen: int, destino: int, desde: int, hasta: int) -> int:
+        """
+        Posición del vuelo de `origen` a `destino` que sale en `[desde, hasta)` (µs) y llega más
+        temprano, o -1 si no hay.
+        """
+        posiciones = self.rango(origen, destino, desde, hasta)
+        if len(posiciones) == 0:
+            return -1
+        return int(posiciones[np.argmin(self.horario.llegada[posiciones])])
+
+
+_indice: IndiceDirectos | None = None
+
+
+def para(horario: Horario) -> IndiceDirectos:
+    """
+    El índice del `horario`; se construye la primera vez (o si cambió el horario).
+    """
+    global _indice
+    if _indice is None or _indice.horario is not horario:
+        _indice = IndiceDirectos(horario)
+    return _indice
+
+
+def proximas_salidas_db(
+    session: Session, origen_id: int, destino_id: int, desde: datetime, n: int
+) -> list[Flight]:
+    """
+    Los `n` primeros vuelos de `origen_id` a `destino_id` que salen desde `desde`, de la base.
+    """
+    return list(
+        session.scalars(
+            select(Flight)
+            .where(
+                Flight.departure_airport_id == origen_id,
+                Flight.arrival_airport_id == destino_id,
+                Flight.departure_time >= desde,
+            )
+            .order_by(Flight.departure_time)
+            .limit(n)
+        )
+    )
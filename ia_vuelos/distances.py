@@ -0,0 +1,167 @@
+"""
+Matriz precalculada de distancias (km) entre los aeropuertos con servicio regular.
+
+Se calcula una sola vez con NumPy (fórmula del haversine, en `float32` y por bloques de filas), se
+guarda en un directorio como archivos `.npy` y al cargarse se abre con `mmap_mode="r"`, así que
+varios procesos comparten las mismas páginas. De la matriz se derivan, para cada modelo de avión,
+bitsets (`np.packbits`) con los destinos que están dentro de su rango.
+
+La usan el generador de vuelos (`scripts/populate_flights.py`) y la heurística de la búsqueda
+(`Airport.calc_distance_airports`); si no hay matriz cargada, ambos siguen usando `geodesic`.
+
+```sh
+python3 scripts/build_distance_matrix.py  # escribe data/distances/
+```
+"""
+
+import os
+
+import numpy as np
+
+# Radio medio de la Tierra (IUGG)
+RADIO_TIERRA_KM = 6371.0088
+
+# Rango máximo (km) de cada modelo de avión, el mismo que en `scripts/populate_flights.py`
+RANGOS_KM = {"Boeing 787-9": 14140, "Airbus A320neo": 6500}
+
+DIRECTORIO_DEFAULT = os.environ.get("IA_VUELOS_DISTANCES_DIR", "data/distances")
+
+_BLOQUE_FILAS = 512
+
+
+class MatrizDistancias:
+    def __init__(self, ids: np.ndarray, km: np.ndarray, factibles: dict[str, np.ndarray]) -> None:
+        # ids ordenados de los aeropuertos; la fila/columna i de `km` es el aeropuerto `ids[i]`
+        self.ids = ids
+        self.km = km
+        # {modelo: bits (n x ceil(n/8)), bit j de la fila i = el destino j está en rango desde i}
+        self.factibles = factibles
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def indice(self, airport_id: int) -> int:
+        """
+        Fila de la matriz del aeropuerto, o -1 si no está en ella.
+        """
+        i = int(np.searchsorted(self.ids, airport_id))
+        if i < len(self.ids) and self.ids[i] == airport_id:
+            return i
+        return -1
+
+    def distancia(self, airport_id1: int, airport_id2: int) -> float | None:
+        i, j = self.indice(airport_id1), self.indice(airport_id2)
+        if i < 0 or j < 0:
+            return None
+        return float(self.km[i, j])
+
+    def destinos_factibles(self, airport_id: int, modelo: str) -> np.ndarray:
+        """
+        Ids de los aeropuertos (distintos al de origen) dentro del rango del modelo.
+        """
+        return self.factibles_con_distancia(airport_id, modelo)[0]
+
+    def factibles_con_distancia(self, airport_id: int, modelo: str) -> tuple:
+        """
+        `(ids, km)` de los aeropuertos (distintos al de origen) dentro del rango del modelo, con
+        las distancias leídas de la fila del origen de una sola vez.
+        """
+        i = self.indice(airport_id)
+        if i < 0:
+            return np.empty(0, dtype=self.ids.dtype), np.empty(0, dtype=self.km.dtype)
+        en_rango = np.unpackbits(self.factibles[modelo][i], count=len(self.ids)).astype(bool)
+        en_rango[i] = False
+        posiciones = np.flatnonzero(en_rango)
+        return self.ids[posiciones], np.asarray(self.km[i])[posiciones]
+
+    def guardar(self, directorio: str) -> None:
+        os.makedirs(directorio, exist_ok=True)
+        np.save(os.path.join(directorio, "ids.npy"), self.ids)
+        np.save(os.path.join(directorio, "km.npy"), self.km)
+        for modelo, bits in self.factibles.items():
+            np.save(os.path.join(directorio, f"factibles_{_nombre_archivo(modelo)}.npy"), bits)
+
+    @classmethod
+    def cargar(cls, directorio: str) -> "MatrizDistancias":
+        ids = np.load(os.path.join(directorio, "ids.npy"))
+        km = np.load(os.path.join(directorio, "km.npy"), mmap_mode="r")
+        factibles = {
+            modelo: np.load(
+                os.path.join(directorio, f"factibles_{_nombre_archivo(modelo)}.npy"), mmap_mode="r"
+            )
+            for modelo in RANGOS_KM
+        }
+        return cls(ids, km, factibles)
+
+
+def _nombre_archivo(modelo: str) -> str:
+    return "".join(c if c.isalnum() else "_" for c in modelo)
+
+
+def haversine_km(
+    lat1_deg: np.ndarray | float,
+    lon1_deg: np.ndarray | float,
+    lat2_deg: np.ndarray | float,
+    lon2_deg: np.ndarray | float,
+) -> np.ndarray:
+    """
+    Distancia de gran círculo (km) con broadcasting entre los argumentos.
+    """
+    lat1, lon1 = np.radians(lat1_deg), np.radians(lon1_deg)
+    lat2, lon2 = np.radians(lat2_deg), np.radians(lon2_deg)
+    a = (
+        np.sin((lat2 - lat1) / 2) ** 2
+        + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def construir(ids: np.ndarray, lat_deg: np.ndarray, lon_deg: np.ndarray) -> MatrizDistancias:
+    """
+    Se calcula la matriz completa (n x n, float32) y los bitsets de rango de cada modelo.
+    """
+    orden = np.argsort(ids)
+    ids = np.asarray(ids, dtype=np.int64)[orden]
+    lat = np.asarray(lat_deg, dtype=np.float32)[orden]
+    lon = np.asarray(lon_deg, dtype=np.float32)[orden]
+
+    n = len(ids)
+    km = np.empty((n, n), dtype=np.float32)
+    # por bloques de filas, para no tener intermedios de n x n en float64
+    for inicio in range(0, n, _BLOQUE_FILAS):
+        fin = min(inicio + _BLOQUE_FILAS, n)
+        km[inicio:fin] = haversine_km(
+            lat[inicio:fin, None], lon[inicio:fin, None], lat[None, :], lon[None, :]
+        )
+
+    factibles = {modelo: np.packbits(km <= rango, axis=1) for modelo, rango in RANGOS_KM.items()}
+    return MatrizDistancias(ids, km, factibles)
+
+
+_matriz: MatrizDistancias | None = None
+
+
+def actual() -> MatrizDistancias | None:
+    """
+    La matriz cargada en el proceso (ver `cargar_global`), si hay.
+    """
+    return _matriz
+
+
+def usar(matriz: MatrizDistancias | None) -> None:
+    """
+    Se fija la matriz de todo el proceso (`None` para volver a `geodesic`).
+    """
+    global _matriz
+    _matriz = matriz
+
+
+def cargar_global(directorio: str = DIRECTORIO_DEFAULT) -> MatrizDistancias | None:
+    """
+    Se carga (con mmap) la matriz de `directorio` para todo el proceso; si no existe, no se hace
+    nada y se regresa `None`.
+    """
+    if not os.path.exists(os.path.join(directorio, "km.npy")):
+        return None
+    usar(MatrizDistancias.cargar(directorio))
+    return _matriz
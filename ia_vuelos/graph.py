@@ -0,0 +1,338 @@
+"""
+Horario de vuelos en memoria, como arreglos planos de NumPy (sin un objeto de Python por vuelo).
+
+Los vuelos se ordenan por aeropuerto de salida y hora de salida, en formato CSR: los vuelos que
+salen del aeropuerto `i` (posición en `ids`) son `offsets[i]:offsets[i + 1]`, y dentro de ese
+rango están ordenados por hora, así que los que salen en una ventana de tiempo se encuentran con
+una búsqueda binaria (`Horario.salidas`).
+
+Como todo son unos cuantos buffers grandes, cuando el servidor carga el horario antes de hacer
+fork (`preload_app` de gunicorn, ver `gunicorn.conf.py`), los workers comparten esas páginas: los
+cambios de los contadores de referencias solo tocan las cabeceras de los arreglos, no los datos.
+Además se llama a `gc.freeze()` para que el recolector no recorra (y escriba) los objetos que ya
+existían antes del fork.
+
+Se activa con `IA_VUELOS_GRAPH=1`; con el horario cargado, la búsqueda (`ia_vuelos.lib.a_star`)
+toma de ahí los vuelos vecinos en vez de consultar la base.
+"""
+
+import gc
+import hashlib
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.engine import Engine
+
+from ia_vuelos.sqlalchemy import Airport, Flight
+
+# Las horas se guardan como microsegundos desde esta fecha
+EPOCA = datetime(2024, 1, 1)
+
+_BLOQUE_FILAS = 100_000
+
+
+def a_microsegundos(fecha: datetime) -> int:
+    return (fecha - EPOCA) // timedelta(microseconds=1)
+
+
+def de_microsegundos(valor: int) -> datetime:
+    return EPOCA + timedelta(microseconds=int(valor))
+
+
+# columnas por vuelo, en el orden de `Horario` (ver `Horario.columnas`)
+COLUMNAS = (
+    "salida",
+    "llegada",
+    "destino",
+    "flight_id",
+    "modelo",
+    "precio_business",
+    "precio_economy",
+)
+
+
+class Horario:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        offsets: np.ndarray,
+        salida: np.ndarray,
+        llegada: np.ndarray,
+        destino: np.ndarray,
+        flight_id: np.ndarray,
+        modelo: np.ndarray,
+        modelos: tuple[str, ...],
+        precio_business: np.ndarray,
+        precio_economy: np.ndarray,
+    ) -> None:
+        # ids ordenados de los aeropuertos con vuelos (de salida o de llegada)
+        self.ids = ids
+        self.offsets = offsets
+        # por vuelo: horas (µs desde `EPOCA`), posición del destino en `ids`, id (bytes),
+        # modelo (índice en `modelos`) y precios
+        self.salida = salida
+        self.llegada = llegada
+        self.destino = destino
+        self.flight_id = flight_id
+        self.modelo = modelo
+        self.modelos = modelos
+        self.precio_business = precio_business
+        self.precio_economy = precio_economy
+
+    def __len__(self) -> int:
+        return len(self.salida)
+
+    def nbytes(self) -> int:
+        return sum(
+            arreglo.nbytes
+            for arreglo in (
+                self.ids,
+                self.offsets,
+                self.salida,
+                self.llegada,
+                self.destino,
+                self.flight_id,
+                self.modelo,
+                self.precio_business,
+                self.precio_economy,
+            )
+        )
+
+    def indice(self, airport_id: int) -> int:
+        """
+        Posición del aeropuerto en `ids`, o -1 si no tiene vuelos.
+        """
+        i = int(np.searchsorted(self.ids, airport_id))
+        if i < len(self.ids) and self.ids[i] == airport_id:
+            return i
+        return -1
+
+    def salidas(self, origen: int, desde: datetime, hasta: datetime) -> range:
+        """
+        Posiciones de los vuelos que salen del aeropuerto `origen` (posición en `ids`) en
+        `[desde, hasta)`, ordenados por hora de salida.
+        """
+        inicio, fin = self.offsets[origen], self.offsets[origen + 1]
+        horas = self.salida[inicio:fin]
+        primero = np.searchsorted(horas, a_microsegundos(desde), side="left")
+        ultimo = np.searchsorted(horas, a_microsegundos(hasta), side="left")
+        return range(int(inicio + primero), int(inicio + ultimo))
+
+    def columnas(
+        self, inicio: int, fin: int, nombres: tuple[str, ...] = COLUMNAS
+    ) -> dict[str, np.ndarray]:
+        """
+        Las columnas `nombres` de los vuelos en las posiciones `[inicio, fin)`.
+        """
+        return {nombre: getattr(self, nombre)[inicio:fin] for nombre in nombres}
+
+    def vuelo(self, posicion: int) -> Flight:
+        """
+        El vuelo como objeto `Flight` (transitorio, no ligado a ninguna sesión).
+        """
+        return vuelos(self, posicion, posicion + 1)[0]
+
+
+def huella(horario) -> np.ndarray:
+    """
+    Resumen (blake2b, 16 bytes) de los aeropuertos y los vuelos (salida, llegada y destino) del
+    horario (también del comprimido), para no usar lo precalculado sobre otro horario.
+    """
+    resumen = hashlib.blake2b(digest_size=16)
+    for columna in (horario.ids, horario.offsets, horario.salida, horario.llegada, horario.destino):
+        resumen.update(np.ascontiguousarray(np.asarray(columna), dtype=np.int64).tobytes())
+    return np.frombuffer(resumen.digest(), dtype=np.uint8).copy()
+
+
+def vuelos(horario, inicio: int, fin: int) -> list[Flight]:
+    """
+    Los vuelos en las posiciones `[inicio, fin)` del horario (`Horario` o
+    `compressed_graph.HorarioComprimido`) como objetos `Flight` transitorios, decodificando las
+    columnas una sola vez para todo el rango.
+    """
+    columnas = horario.columnas(inicio, fin)
+    origenes = np.searchsorted(horario.offsets, np.arange(inicio, fin), "right") - 1
+    return [
+        Flight(
+            flight_id=flight_id.decode(),
+            model=horario.modelos[modelo],
+            price_business=business,
+            price_economy=economy,
+            departure_time=de_microsegundos(salida),
+            arrival_time=de_microsegundos(llegada),
+            departure_airport_id=origen_id,
+            arrival_airport_id=destino_id,
+        )
+        for salida, llegada, destino_id, flight_id, modelo, business, economy, origen_id in zip(
+            columnas["salida"].tolist(),
+            columnas["llegada"].tolist(),
+            horario.ids[columnas["destino"]].tolist(),
+            columnas["flight_id"].tolist(),
+            columnas["modelo"].tolist(),
+            columnas["precio_business"].tolist(),
+            columnas["precio_economy"].tolist(),
+            horario.ids[origenes].tolist(),
+        )
+    ]
+
+
+def construir_desde_db(engine: Engine) -> Horario:
+    """
+    Se lee la tabla `flights` por bloques y se arman los arreglos; las filas de cada bloque se
+    descartan al pasar a arreglos, así que no quedan objetos por vuelo.
+    """
+    columnas = {
+        "salida": [],
+        "llegada": [],
+        "origen": [],
+        "destino": [],
+        "flight_id": [],
+        "modelo": [],
+        "precio_business": [],
+        "precio_economy": [],
+    }
+    modelos: dict[str, int] = {}
+    consulta = select(
+        Flight.departure_time,
+        Flight.arrival_time,
+        Flight.departure_airport_id,
+        Flight.arrival_airport_id,
+        Flight.flight_id,
+        Flight.model,
+        Flight.price_business,
+        Flight.price_economy,
+    ).execution_options(yield_per=_BLOQUE_FILAS)
+    with engine.connect() as connection:
+        existentes = np.array(connection.scalars(select(Airport.id)).all(), dtype=np.int64)
+        for filas in connection.execute(consulta).partitions():
+            salida, llegada, origen, destino, flight_id, modelo, business, economy = zip(*filas)
+            columnas["salida"].append(np.array([a_microsegundos(f) for f in salida], np.int64))
+            columnas["llegada"].append(np.array([a_microsegundos(f) for f in llegada], np.int64))
+            columnas["origen"].append(np.array(origen, dtype=np.int64))
+            columnas["destino"].append(np.array(destino, dtype=np.int64))
+            columnas["flight_id"].append(np.array(flight_id, dtype="S11"))
+            codigos = [modelos.setdefault(m, len(modelos)) for m in modelo]
+            columnas["modelo"].append(np.array(codigos, dtype=np.uint8))
+            columnas["precio_business"].append(np.array(business, dtype=np.float64))
+            columnas["precio_economy"].append(np.array(economy, dtype=np.float64))
+
+    if not columnas["salida"]:
+        vacio = np.empty(0, dtype=np.int64)
+        return Horario(
+            vacio,
+            np.zeros(1, np.int64),
+            vacio,
+            vacio,
+            np.empty(0, np.int32),
+            np.empty(0, "S11"),
+            np.empty(0, np.uint8),
+            (),
+            np.empty(0, np.float64),
+            np.empty(0, np.float64),
+        )
+    arreglos = {nombre: np.concatenate(partes) for nombre, partes in columnas.items()}
+    del columnas
+
+    # como en la búsqueda sobre la base (que une los vuelos con `airports`), se descartan los
+    # vuelos de o a aeropuertos que no están en la tabla
+    validos = np.isin(arreglos["origen"], existentes) & np.isin(arreglos["destino"], existentes)
+    if not validos.all():
+        print(f"{int((~validos).sum())} vuelos con aeropuertos que no existen; se descartan")
+        arreglos = {nombre: arreglo[validos] for nombre, arreglo in arreglos.items()}
+
+    ids = np.unique(np.concatenate((arreglos["origen"], arreglos["destino"])))
+    origen = np.searchsorted(ids, arreglos.pop("origen"))
+    destino = np.searchsorted(ids, arreglos.pop("destino")).astype(np.int32)
+    orden = np.lexsort((arreglos["salida"], origen))
+    offsets = np.searchsorted(origen[orden], np.arange(len(ids) + 1)).astype(np.int64)
+
+    return Horario(
+        ids=ids,
+        offsets=offsets,
+        salida=arreglos["salida"][orden],
+        llegada=arreglos["llegada"][orden],
+        destino=destino[orden],
+        flight_id=arreglos["flight_id"][orden],
+        modelo=arreglos["modelo"][orden],
+        modelos=tuple(modelos),
+        precio_business=arreglos["precio_business"][orden],
+        precio_economy=arreglos["precio_economy"][orden],
+    )
+
+
+def habilitado() -> bool:
+    return os.environ.get("IA_VUELOS_GRAPH", "") not in ("", "0")
+
+
+_horario: Horario | None = None
+
+
+def actual() -> Horario | None:
+    """
+    El horario cargado en el proceso (ver `cargar_global`), si hay.
+    """
+    return _horario
+
+
+def usar(horario: Horario | None) -> None:
+    global _horario
+    _horario = horario
+
+
+def preparar_fork() -> None:
+    """
+    Para llamar en el proceso padre justo antes de hacer fork (p.ej. el `pre_fork` de gunicorn):
+    se recolecta la basura y los objetos que quedan se mueven a la generación permanente, para que
+    los workers no escriban en esas páginas al recolectar.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def cargar_global(engine: Engine) -> Horario:
+    """
+    Se carga el horario de la base para todo el proceso.
+    """
+    horario = construir_desde_db(engine)
+    usar(horario)
+    preparar_fork()
+    return horario
+
+
+def vecinos(
+    session, horario: Horario, airport: Airport, desde: datetime, hasta: datetime
+) -> list[tuple[Flight, Airport]]:
+    """
+    Lo mismo que `Airport.get_neighboring_flights`, pero desde el horario: `(Flight, Airport)`
+    de los vuelos que salen de `airport` en `[desde, hasta)`. Los aeropuertos de destino que no
+    están ya en la sesión se cargan con una sola consulta.
+    """
+    origen = horario.indice(int(airport.id))
+    if origen < 0:
+        return []
+    posiciones = horario.salidas(origen, desde, hasta)
+    if not posiciones:
+        return []
+
+    encontrados = vuelos(horario, posiciones.start, posiciones.stop)
+    destino_ids = [vuelo.arrival_airport_id for vuelo in encontrados]
+    aeropuertos = {}
+    faltantes = []
+    for airport_id in set(destino_ids):
+        cargado = session.identity_map.get(session.identity_key(Airport, airport_id))
+        if cargado is not None:
+            aeropuertos[airport_id] = cargado
+        else:
+            faltantes.append(airport_id)
+    if faltantes:
+        for cargado in session.scalars(select(Airport).where(Airport.id.in_(faltantes))):
+            aeropuertos[cargado.id] = cargado
+
+    # un destino que no está en `airports` no es vecino (como en la consulta, que une las tablas)
+    return [
+        (vuelo, aeropuertos[airport_id])
+        for vuelo, airport_id in zip(encontrados, destino_ids)
+        if airport_id in aeropuertos
+    ]
@@ -1,8 +1,14 @@
+import heapq
+import itertools
+import time
 from collections import OrderedDict
 from datetime import datetime, timedelta
+from typing import Callable, Iterable
 
+import numpy as np
 from sqlalchemy.orm import Session
 
+from ia_vuelos import direct_flights, distances, graph, metrics, rules
 from ia_vuelos.sqlalchemy import Airport, Flight
 
 
@@ -31,12 +37,133 @@ def print_camino(airport_flight_history: list[tuple[Airport, Flight]], aeropuert
     print("=" * 10)
 
 
+def _como_lista(aeropuertos: Airport | Iterable[Airport]) -> list[Airport]:
+    if isinstance(aeropuertos, Airport):
+        return [aeropuertos]
+    # sin repetidos, conservando el orden
+    return list(dict.fromkeys(aeropuertos))
+
+
+def heuristica_a_objetivos(objetivos: list[Airport]) -> Callable[[Airport], float]:
+    """
+    Distancia (km) de un aeropuerto al más cercano de los `objetivos`: el mínimo sobre todos ellos,
+    que sigue siendo admisible. Con varios objetivos se calcula en una sola pasada vectorizada, con
+    la matriz de distancias si todos están en ella o con el haversine si no.
+    """
+    if len(objetivos) == 1:
+        objetivo = objetivos[0]
+        return lambda aeropuerto: aeropuerto.calc_distance_airports(objetivo)
+
+    lat = np.array([objetivo.latitude_deg for objetivo in objetivos], dtype=np.float64)
+    lon = np.array([objetivo.longitude_deg for objetivo in objetivos], dtype=np.float64)
+    matriz = distances.actual()
+    columnas = None
+    if matriz is not None:
+        columnas = np.array([matriz.indice(int(objetivo.id)) for objetivo in objetivos])
+        if (columnas < 0).any():
+            columnas = None
+
+    def heuristica(aeropuerto: Airport) -> float:
+        if matriz is not None and columnas is not None:
+            fila = matriz.indice(int(aeropuerto.id))
+            if fila >= 0:
+                return float(matriz.km[fila, columnas].min())
+        km = distances.haversine_km(aeropuerto.latitude_deg, aeropuerto.longitude_deg, lat, lon)
+        return float(km.min())
+
+    return heuristica
+
+
+def vecinos_conectables(
+    session: Session,
+    horario: graph.Horario | None,
+    reglas: rules.Reglas,
+    airport: Airport,
+    vuelo_origen: datetime | Flight,
+    estadisticas: dict[str, int],
+) -> list[tuple[Flight, Airport]]:
+    """
+    Vuelos de `airport` a los que se puede conectar llegando en `vuelo_origen` (o, si es la fecha
+    de salida, los del día), del horario en memoria si está cargado o de la base.
+    """
+    # solo los vuelos a los que se puede conectar (tiempo mínimo de conexión y escala
+    # máxima), así que las conexiones imposibles no entran a la lista abierta
+    if isinstance(vuelo_origen, datetime):
+        desde, hasta = rules.ventana_salida(vuelo_origen)
+    else:
+        desde, hasta = reglas.ventana_conexion(
+            airport, vuelo_origen.arrival_time  # pyright: ignore [reportArgumentType]
+        )
+    if horario is not None:
+        with metrics.fase("graph"):
+            neighbors = graph.vecinos(session, horario, airport, desde, hasta)
+    else:
+        with metrics.fase("sql"):
+            neighbors = airport.get_neighboring_flights(session, desde, hasta)
+    estadisticas["consultas_vecinos"] += 1
+    estadisticas["filas"] += len(neighbors)
+    return neighbors
+
+
+def costo_tramo(
+    flight_to_current_airport: datetime | Flight, flight_to_next_airport: Flight
+) -> timedelta:
+    """
+    Costo real g de tomar `flight_to_next_airport` después de `flight_to_current_airport`: el
+    tiempo de espera más la duración del vuelo.
+    """
+    # si es datetime, estamos en los vecinos del primer aeropuerto de origen
+    if isinstance(flight_to_current_airport, datetime):
+        tiempo_espera_a_siguiente_vuelo: timedelta = timedelta(0)
+        duracion_vuelo: timedelta = timedelta(0)
+    else:
+        tiempo_espera_a_siguiente_vuelo: timedelta = (
+            flight_to_next_airport.departure_time
+            - flight_to_current_airport.arrival_time  # pyright: ignore [reportAssignmentType]
+        )
+        duracion_vuelo: timedelta = (
+            flight_to_next_airport.arrival_time
+            - flight_to_next_airport.departure_time  # pyright: ignore [reportAssignmentType]
+        )
+    return tiempo_espera_a_siguiente_vuelo + duracion_vuelo
+
+
+def vuelo_directo(
+    horario: graph.Horario,
+    origenes: list[Airport],
+    objetivos: list[Airport],
+    salida_primer_vuelo: datetime,
+) -> tuple[Airport, Flight, Airport] | None:
+    """
+    El primer vuelo directo (por hora de salida) de algún origen a algún objetivo el día de
+    `salida_primer_vuelo`, con el índice por par de aeropuertos del horario.
+    """
+    directos = direct_flights.para(horario)
+    desde, hasta = (graph.a_microsegundos(f) for f in rules.ventana_salida(salida_primer_vuelo))
+    mejor = None
+    for origen in origenes:
+        i = horario.indice(int(origen.id))
+        for objetivo in objetivos:
+            j = horario.indice(int(objetivo.id))
+            if i < 0 or j < 0:
+                continue
+            posiciones = directos.rango(i, j, desde, hasta)
+            if len(posiciones) and (mejor is None or horario.salida[posiciones[0]] < mejor[0]):
+                mejor = (horario.salida[posiciones[0]], origen, int(posiciones[0]), objetivo)
+    if mejor is None:
+        return None
+    return mejor[1], horario.vuelo(mejor[2]), mejor[3]
+
+
 def a_star(
     sqlalchemy_session: Session,
-    aeropuerto_inical: Airport,
-    aeropuerto_objetivo: Airport,
+    aeropuerto_inical: Airport | Iterable[Airport],
+    aeropuerto_objetivo: Airport | Iterable[Airport],
     salida_primer_vuelo: datetime = datetime(year=2024, month=1, day=1),
     imprimir=False,
+    estadisticas: dict[str, int] | None = None,
+    max_expansiones: int | None = None,
+    reglas: rules.Reglas | None = None,
 ) -> tuple[list[tuple[Airport, Flight]], Airport]:
     """
     Se devuelve el camino del aeropuerto inicial al final de forma:
@@ -44,32 +171,53 @@ def a_star(
 
     Además de esta lista, se regresa también el aeropuerto objetivo (final/último), en una tupla:
     - `([(Airport, Flight)], Airport)`
+
+    Tanto el origen como el objetivo pueden ser varios aeropuertos (p.ej. los de una misma ciudad
+    o los que están dentro de un radio): la búsqueda empieza desde todos los orígenes a la vez y
+    termina en el primer objetivo al que llega, que es el que se regresa. Si no hay camino, se
+    regresa el primero de los objetivos.
+
+    Si se pasa `estadisticas`, se acumulan ahí los nodos expandidos (`"expansiones"`) y las
+    relajaciones de vecinos (`"relajaciones"`), además de las consultas de vecinos
+    (`"consultas_vecinos"`) y las filas que regresaron (`"filas"`).
+
+    Las conexiones siguen las `reglas` (por defecto `rules.actuales()`): el siguiente vuelo sale
+    al menos el tiempo mínimo de conexión del aeropuerto después de la llegada y a lo más la escala
+    máxima después; el primer vuelo puede salir a cualquier hora del día de `salida_primer_vuelo`.
+
+    Como el primer tramo cuesta 0, un vuelo directo siempre es óptimo: con el horario en memoria
+    se revisa primero con el índice por par de aeropuertos y, si hay, no se expande nada.
+
+    Con `max_expansiones` se acota la búsqueda: al rebasarlo se regresa un camino vacío, como si
+    no hubiera ruta, y se marca `"truncada"` en `estadisticas`.
     """
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas.setdefault("expansiones", 0)
+    estadisticas.setdefault("relajaciones", 0)
+    estadisticas.setdefault("consultas_vecinos", 0)
+    estadisticas.setdefault("filas", 0)
 
-    def fun_costo_heuristico_h(orig_airport: Airport, destination_airport: Airport) -> float:
-        return orig_airport.calc_distance_airports(destination_airport)
-
-    def fun_costo_real_g(
-        flight_to_current_airport: datetime | Flight, flight_to_next_airport: Flight
-    ) -> timedelta:
-        # si es datetime, estamos en los vecinos del primer aeropuerto de origen
-        if isinstance(flight_to_current_airport, datetime):
-            tiempo_espera_a_siguiente_vuelo: timedelta = timedelta(0)
-            duracion_vuelo: timedelta = timedelta(0)
-        else:
-            tiempo_espera_a_siguiente_vuelo: timedelta = (
-                flight_to_next_airport.departure_time
-                - flight_to_current_airport.arrival_time  # pyright: ignore [reportAssignmentType]
-            )
-            duracion_vuelo: timedelta = (
-                flight_to_next_airport.arrival_time
-                - flight_to_next_airport.departure_time  # pyright: ignore [reportAssignmentType]
-            )
-        costo_g_adicional_actual = tiempo_espera_a_siguiente_vuelo + duracion_vuelo
-        return costo_g_adicional_actual
+    horario = graph.actual()
+    if reglas is None:
+        reglas = rules.actuales()
+    origenes = _como_lista(aeropuerto_inical)
+    objetivos = _como_lista(aeropuerto_objetivo)
+    if horario is not None:
+        directo = vuelo_directo(horario, origenes, objetivos, salida_primer_vuelo)
+        if directo is not None:
+            origen, vuelo, objetivo = directo
+            metrics.registrar_busqueda(estadisticas)
+            return ([(origen, vuelo)], objetivo)
+
+    distancia_a_objetivos = heuristica_a_objetivos(objetivos)
+
+    def fun_costo_heuristico_h(orig_airport: Airport) -> float:
+        with metrics.fase("geodesic"):
+            return distancia_a_objetivos(orig_airport)
 
     def make_ordered_list_of_states(
-        origin_airport: Airport,
+        origin_airports: list[Airport],
         destination_airport: Airport,
         # last_flight_to_destination_airport: Flight,
         came_from_dict: dict[Airport, tuple[Airport, Flight]],
@@ -84,15 +232,16 @@ def a_star(
         """
         airport_origin_dest_list: list[tuple[Airport, Flight]] = []
         last_airport = destination_airport
-        while last_airport != origin_airport:
+        while last_airport not in origin_airports:
             last_airport, flight = came_from_dict[last_airport]
             airport_origin_dest_list.append((last_airport, flight))
+            # con tiempos de espera negativos `came_from` puede tener ciclos: un camino nunca
+            # tiene más vuelos que aeropuertos con procedencia
+            if len(airport_origin_dest_list) > len(came_from_dict):
+                return ([], destination_airport)
         airport_origin_dest_list = list(reversed(airport_origin_dest_list))
         return (airport_origin_dest_list, destination_airport)
 
-    aeropuerto_inical = aeropuerto_inical
-    aeropuerto_objetivo = aeropuerto_objetivo
-
     """
     Las llaves son los aeropuertos, y sus valores son:
     - Costo g: costo real, tiempo para llegar a ese aeropuerto
@@ -102,29 +251,29 @@ def a_star(
     """
     open_list: OrderedDict[Airport, tuple[timedelta, float, datetime | Flight]] = OrderedDict(
         {
-            aeropuerto_inical: (
+            origen: (
                 timedelta(0),  # g_score: costo real, timedelta
-                0
-                + fun_costo_heuristico_h(
-                    aeropuerto_inical, aeropuerto_objetivo
-                ),  # f_score (g + h score)
+                0 + fun_costo_heuristico_h(origen),  # f_score (g + h score)
                 salida_primer_vuelo,
             )
+            for origen in origenes
         }
     )
 
     # Diccionario de los costos reales (número de movientos, desde el tablero inicial) para llegar a cierto estado.
     # el costo real es el tiempo tomado
-    g_scores: dict[Airport, timedelta] = {aeropuerto_inical: timedelta(0)}
+    g_scores: dict[Airport, timedelta] = {origen: timedelta(0) for origen in origenes}
 
     # Diccionario que almacena que airport es el anterior: {airport1: airport2}, el airport1 viene del airport2
     came_from: dict[Airport, tuple[Airport, Flight]] = {}
 
+    camino: tuple[list[tuple[Airport, Flight]], Airport] = ([], objetivos[0])
     while open_list:
         # Se ordena para que los elementos con menor coste estén al final del diccionario: {estado1: (1,1), estado2: (1,3)} -> {estado2: (1,3), estado1: (1,1)}
-        open_list = OrderedDict(
-            sorted(open_list.items(), key=lambda estado: estado[1][1], reverse=True)
-        )
+        with metrics.fase("open_list_sort"):
+            open_list = OrderedDict(
+                sorted(open_list.items(), key=lambda estado: estado[1][1], reverse=True)
+            )
 
         current_airport, _current_airport_cost = open_list.popitem()
         _current_costo_g, _current_costo_h, current_vuelo_origen = _current_airport_cost
@@ -134,20 +283,18 @@ def a_star(
             print("Estado actual:")
             print(current_airport.pretty_str())
 
-        if current_airport == aeropuerto_objetivo:
+        if current_airport in objetivos:
             # Se reconstruye el caminio, terminando la iteración y regresamos el resultado final de la búsqueda
-            return make_ordered_list_of_states(aeropuerto_inical, aeropuerto_objetivo, came_from)
+            camino = make_ordered_list_of_states(origenes, current_airport, came_from)
+            break
 
-        neighbors = map(
-            lambda available_flight: available_flight,
-            current_airport.get_neighboring_flights(
-                sqlalchemy_session,
-                (
-                    current_vuelo_origen  # pyright: ignore [reportArgumentType]
-                    if (isinstance(current_vuelo_origen, datetime))
-                    else current_vuelo_origen.arrival_time
-                ),
-            ),
+        estadisticas["expansiones"] += 1
+        if max_expansiones is not None and estadisticas["expansiones"] > max_expansiones:
+            estadisticas["truncada"] = 1
+            break
+
+        neighbors = vecinos_conectables(
+            sqlalchemy_session, horario, reglas, current_airport, current_vuelo_origen, estadisticas
         )
 
         for flight_to_neighbor_airport, current_neighbor_airport in neighbors:
@@ -155,7 +302,7 @@ def a_star(
             # el costo es tomado como el tiempo de llegada
 
             # si es datetime, estamos en los vecinos del primer aeropuerto de origen
-            costo_g_adicional: timedelta = fun_costo_real_g(
+            costo_g_adicional: timedelta = costo_tramo(
                 current_vuelo_origen, flight_to_neighbor_airport
             )
 
@@ -168,6 +315,7 @@ def a_star(
             ):
                 # si (no se ha llegado a este estado antes) o (el costo de este camino
                 # a esete estado es menor a costos encontrados antes), entonces:
+                estadisticas["relajaciones"] += 1
 
                 # añadimos a la lista de procedencia a los aeropuertos vecinos, indicando
                 # que vendrían del current_airport y aunque compartan el mismo aeropuerto
@@ -181,7 +329,7 @@ def a_star(
                 f_score: (
                     float
                 ) = tentative_g_score_of_current_neighbor_airport.total_seconds() + fun_costo_heuristico_h(
-                    current_neighbor_airport, aeropuerto_objetivo
+                    current_neighbor_airport
                 )
                 open_list[current_neighbor_airport] = (
                     tentative_g_score_of_current_neighbor_airport,
@@ -193,4 +341,140 @@ def a_star(
                     print("Estado vecino")
                     print(current_neighbor_airport.pretty_str())
                     print("Costo", f_score)
-    return ([], aeropuerto_objetivo)
+
+    metrics.registrar_busqueda(estadisticas)
+    return camino
+
+
+def a_star_k(
+    sqlalchemy_session: Session,
+    aeropuerto_inical: Airport | Iterable[Airport],
+    aeropuerto_objetivo: Airport | Iterable[Airport],
+    salida_primer_vuelo: datetime = datetime(year=2024, month=1, day=1),
+    k: int = 3,
+    limite_segundos: float | None = None,
+    max_etiquetas: int | None = None,
+    estadisticas: dict[str, int] | None = None,
+    max_expansiones: int | None = None,
+    reglas: rules.Reglas | None = None,
+) -> list[tuple[list[tuple[Airport, Flight]], Airport]]:
+    """
+    Hasta `k` itinerarios alternativos, del mejor al peor según el mismo costo y la misma
+    heurística que `a_star`, en una sola búsqueda: cada itinerario es un camino como los que
+    regresa `a_star`.
+
+    En vez de repetir la búsqueda excluyendo los caminos ya encontrados (Yen), la lista abierta
+    tiene etiquetas (caminos parciales) en lugar de aeropuertos, y cada aeropuerto se puede
+    expandir hasta `max_etiquetas` veces (por defecto `k`), así que la misma frontera y los
+    mismos vecinos sirven para las `k` rutas. Para que las alternativas sean distintas, dos
+    etiquetas con la misma secuencia de aeropuertos no se expanden (queda la de menor costo), y
+    un camino no repite aeropuertos.
+
+    La búsqueda se corta al encontrar `k` caminos, al pasar `limite_segundos` o al rebasar
+    `max_expansiones`; en los dos últimos casos se regresan los que haya y se marca `"truncada"`
+    en `estadisticas`.
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    estadisticas.setdefault("expansiones", 0)
+    estadisticas.setdefault("relajaciones", 0)
+    estadisticas.setdefault("consultas_vecinos", 0)
+    estadisticas.setdefault("filas", 0)
+
+    inicio = time.perf_counter()
+    horario = graph.actual()
+    if reglas is None:
+        reglas = rules.actuales()
+    if max_etiquetas is None:
+        max_etiquetas = k
+    origenes = _como_lista(aeropuerto_inical)
+    objetivos = _como_lista(aeropuerto_objetivo)
+    distancia_a_objetivos = heuristica_a_objetivos(objetivos)
+
+    # un aeropuerto aparece en muchas etiquetas: su heurística se calcula una vez
+    heuristicas: dict[Airport, float] = {}
+
+    def fun_costo_heuristico_h(airport: Airport) -> float:
+        if airport not in heuristicas:
+            with metrics.fase("geodesic"):
+                heuristicas[airport] = distancia_a_objetivos(airport)
+        return heuristicas[airport]
+
+    # etiqueta: (f, desempate, g, aeropuerto, vuelo con el que se llegó, etiqueta anterior,
+    # ids de los aeropuertos del camino)
+    desempate = itertools.count()
+    open_heap: list[tuple] = [
+        (
+            fun_costo_heuristico_h(origen),
+            next(desempate),
+            timedelta(0),
+            origen,
+            salida_primer_vuelo,
+            None,
+            (origen.id,),
+        )
+        for origen in origenes
+    ]
+    heapq.heapify(open_heap)
+    expandidas: dict[Airport, int] = {}
+    secuencias_vistas: set[tuple] = set()
+
+    caminos: list[tuple[list[tuple[Airport, Flight]], Airport]] = []
+    while open_heap and len(caminos) < k:
+        etiqueta = heapq.heappop(open_heap)
+        _f, _, costo_g, airport, vuelo_origen, _anterior, secuencia = etiqueta
+        if secuencia in secuencias_vistas:
+            continue
+        secuencias_vistas.add(secuencia)
+
+        if airport in objetivos:
+            camino = []
+            while etiqueta[5] is not None:
+                anterior = etiqueta[5]
+                camino.append((anterior[3], etiqueta[4]))
+                etiqueta = anterior
+            caminos.append((list(reversed(camino)), airport))
+            continue
+
+        if expandidas.get(airport, 0) >= max_etiquetas:
+            continue
+        expandidas[airport] = expandidas.get(airport, 0) + 1
+
+        estadisticas["expansiones"] += 1
+        if (max_expansiones is not None and estadisticas["expansiones"] > max_expansiones) or (
+            limite_segundos is not None and time.perf_counter() - inicio > limite_segundos
+        ):
+            estadisticas["truncada"] = 1
+            break
+
+        neighbors = vecinos_conectables(
+            sqlalchemy_session, horario, reglas, airport, vuelo_origen, estadisticas
+        )
+        # por cada destino solo el vuelo de menor costo: otro vuelo a la misma escala no es una
+        # alternativa distinta
+        mejores: dict[Airport, tuple[timedelta, Flight]] = {}
+        for vuelo, vecino in neighbors:
+            if vecino.id in secuencia:
+                continue
+            costo = costo_g + costo_tramo(vuelo_origen, vuelo)
+            if vecino not in mejores or costo < mejores[vecino][0]:
+                mejores[vecino] = (costo, vuelo)
+
+        for vecino, (costo, vuelo) in mejores.items():
+            estadisticas["relajaciones"] += 1
+            f_score = costo.total_seconds() + fun_costo_heuristico_h(vecino)
+            heapq.heappush(
+                open_heap,
+                (
+                    f_score,
+                    next(desempate),
+                    costo,
+                    vecino,
+                    vuelo,
+                    etiqueta,
+                    secuencia + (vecino.id,),
+                ),
+            )
+
+    metrics.registrar_busqueda(estadisticas)
+    return caminos
@@ -0,0 +1,271 @@
+"""
+Métricas de la búsqueda y de los endpoints, exportadas en el formato de texto de Prometheus.
+
+Se registran, por petición, los tiempos de cada fase (`sql`, `geodesic`, `open_list_sort`,
+`json`, ...) y contadores de la búsqueda (expansiones, relajaciones, consultas de vecinos, filas
+leídas). Todo está desactivado por defecto (`IA_VUELOS_METRICS=1` lo activa): desactivado,
+`fase()` regresa un contexto nulo compartido e `incrementar()` sale de inmediato.
+
+También hay un perfilador opcional por muestreo: con `IA_VUELOS_PROFILE_EVERY=N` se perfila una
+de cada N peticiones con `cProfile` y se guardan sus estadísticas en `IA_VUELOS_PROFILE_DIR`.
+"""
+
+import cProfile
+import itertools
+import os
+import threading
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+
+# Límites superiores (segundos) de las cubetas de los histogramas
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"))
+
+_habilitado: bool = os.environ.get("IA_VUELOS_METRICS", "") not in ("", "0")
+
+_lock = threading.Lock()
+# {(nombre, (("etiqueta", "valor"), ...)): valor}
+_contadores: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+_gauges: dict[tuple[str, tuple[tuple[str, str], ...]], float] = {}
+# {(nombre, etiquetas): [conteos por cubeta..., suma, total]}
+_histogramas: dict[tuple[str, tuple[tuple[str, str], ...]], list[float]] = {}
+_descripciones: dict[str, str] = {
+    "ia_vuelos_request_seconds": "Duración de las peticiones por endpoint.",
+    "ia_vuelos_request_phase_seconds": "Tiempo de cada fase dentro de una petición.",
+    "ia_vuelos_search_expansions_total": "Aeropuertos expandidos por la búsqueda.",
+    "ia_vuelos_search_relaxations_total": "Relajaciones de vecinos en la búsqueda.",
+    "ia_vuelos_neighbor_queries_total": "Consultas de vuelos vecinos.",
+    "ia_vuelos_rows_fetched_total": "Filas (vuelo, aeropuerto) leídas por las consultas de vecinos.",
+    "ia_vuelos_route_cache_total": "Consultas a la caché de rutas, por resultado (hit/miss).",
+    "ia_vuelos_unreachable_total": "Búsquedas descartadas sin buscar porque no hay ruta posible.",
+    "ia_vuelos_admission_total": "Búsquedas por resultado de la admisión.",
+    "ia_vuelos_admission_queue_depth": "Búsquedas esperando presupuesto en el worker.",
+    "ia_vuelos_admission_in_flight_cost": "Costo estimado de las búsquedas en curso en el worker.",
+    "ia_vuelos_parallel_search_total": "Búsquedas caras por resultado (paralela u ocupado).",
+    "ia_vuelos_capture_dropped_total": "Peticiones sin capturar porque la cola estaba llena.",
+}
+
+# Tiempos por fase de la petición en curso: {fase: segundos}
+_peticion: ContextVar[dict[str, float] | None] = ContextVar("ia_vuelos_peticion", default=None)
+_fase_actual: ContextVar[str | None] = ContextVar("ia_vuelos_fase", default=None)
+
+_FASE_NULA = nullcontext()
+
+
+def habilitar(valor: bool = True) -> None:
+    global _habilitado
+    _habilitado = valor
+
+
+def habilitado() -> bool:
+    return _habilitado
+
+
+def fase_actual() -> str | None:
+    """
+    Nombre de la fase en curso (solo se rastrea con las métricas habilitadas).
+    """
+    return _fase_actual.get()
+
+
+def _llave(nombre: str, etiquetas: dict[str, str]) -> tuple[str, tuple[tuple[str, str], ...]]:
+    return (nombre, tuple(sorted(etiquetas.items())))
+
+
+def incrementar(nombre: str, valor: float = 1, **etiquetas: str) -> None:
+    if not _habilitado:
+        return
+    llave = _llave(nombre, etiquetas)
+    with _lock:
+        _contadores[llave] = _contadores.get(llave, 0) + valor
+
+
+def fijar(nombre: str, valor: float, **etiquetas: str) -> None:
+    """
+    Fija el valor de un gauge.
+    """
+    if not _habilitado:
+        return
+    with _lock:
+        _gauges[_llave(nombre, etiquetas)] = valor
+
+
+def observar(nombre: str, segundos: float, **etiquetas: str) -> None:
+    if not _habilitado:
+        return
+    llave = _llave(nombre, etiquetas)
+    with _lock:
+        histograma = _histogramas.get(llave)
+        if histograma is None:
+            histograma = _histogramas[llave] = [0.0] * (len(BUCKETS) + 2)
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                histograma[i] += 1
+        histograma[-2] += segundos
+        histograma[-1] += 1
+
+
+class _Fase:
+    __slots__ = ("nombre", "inicio", "token")
+
+    def __init__(self, nombre: str) -> None:
+        self.nombre = nombre
+
+    def __enter__(self) -> "_Fase":
+        self.token = _fase_actual.set(self.nombre)
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, *_exc) -> None:
+        duracion = time.perf_counter() - self.inicio
+        _fase_actual.reset(self.token)
+        tiempos = _peticion.get()
+        if tiempos is None:
+            # fuera de una petición (por ejemplo `main_alt`) se registra directamente
+            observar("ia_vuelos_request_phase_seconds", duracion, endpoint="", phase=self.nombre)
+        else:
+            tiempos[self.nombre] = tiempos.get(self.nombre, 0.0) + duracion
+
+
+def fase(nombre: str) -> "_Fase | nullcontext":
+    """
+    Contexto que mide el tiempo de una fase (`with metrics.fase("sql"): ...`).
+    """
+    if not _habilitado:
+        return _FASE_NULA
+    return _Fase(nombre)
+
+
+def registrar_busqueda(estadisticas: dict[str, int]) -> None:
+    """
+    Se pasan los contadores de una búsqueda (ver `a_star`) a las métricas globales.
+    """
+    if not _habilitado:
+        return
+    incrementar("ia_vuelos_search_expansions_total", estadisticas.get("expansiones", 0))
+    incrementar("ia_vuelos_search_relaxations_total", estadisticas.get("relajaciones", 0))
+    incrementar("ia_vuelos_neighbor_queries_total", estadisticas.get("consultas_vecinos", 0))
+    incrementar("ia_vuelos_rows_fetched_total", estadisticas.get("filas", 0))
+
+
+class Perfilador:
+    """
+    Perfila una de cada `cada` peticiones y guarda las estadísticas (`.prof`, legibles con
+    `pstats` o `snakeviz`) en `directorio`.
+
+    Solo se perfila una petición a la vez por proceso: `cProfile` no se puede activar en dos hilos
+    a la vez (en Python 3.12+ falla), así que si ya hay un perfil corriendo (p.ej. en otro de los
+    hilos de gunicorn) esa petición no se perfila.
+    """
+
+    def __init__(self, cada: int, directorio: str) -> None:
+        self.cada = cada
+        self.directorio = directorio
+        self._contador = itertools.count()
+        self._ocupado = threading.Lock()
+        os.makedirs(directorio, exist_ok=True)
+
+    def iniciar(self) -> cProfile.Profile | None:
+        if next(self._contador) % self.cada != 0:
+            return None
+        if not self._ocupado.acquire(blocking=False):
+            return None
+        perfil = cProfile.Profile()
+        try:
+            perfil.enable()
+        except ValueError:
+            # otro perfilador (ajeno a este) ya está activo
+            self._ocupado.release()
+            return None
+        return perfil
+
+    def terminar(self, perfil: cProfile.Profile, endpoint: str) -> None:
+        """
+        Se detiene `perfil` (el de `iniciar`) y se guarda; hay que llamarlo aunque la petición
+        haya fallado, para liberar el perfilador.
+        """
+        try:
+            perfil.disable()
+            nombre = f"{endpoint}-{time.strftime('%Y%m%dT%H%M%S')}-{time.perf_counter_ns()}.prof"
+            perfil.dump_stats(os.path.join(self.directorio, nombre))
+        finally:
+            self._ocupado.release()
+
+
+def perfilador_desde_entorno() -> Perfilador | None:
+    cada = int(os.environ.get("IA_VUELOS_PROFILE_EVERY", "0"))
+    if cada <= 0:
+        return None
+    return Perfilador(cada, os.environ.get("IA_VUELOS_PROFILE_DIR", "profiles"))
+
+
+def iniciar_peticion() -> object | None:
+    """
+    Se empiezan a acumular los tiempos por fase de una petición; el token resultante se pasa a
+    `terminar_peticion`.
+    """
+    if not _habilitado:
+        return None
+    return (_peticion.set({}), time.perf_counter())
+
+
+def terminar_peticion(token: object | None, endpoint: str) -> None:
+    if token is None:
+        return
+    token_peticion, inicio = token  # pyright: ignore [reportGeneralTypeIssues]
+    tiempos = _peticion.get() or {}
+    _peticion.reset(token_peticion)
+    observar("ia_vuelos_request_seconds", time.perf_counter() - inicio, endpoint=endpoint)
+    for nombre_fase, segundos in tiempos.items():
+        observar("ia_vuelos_request_phase_seconds", segundos, endpoint=endpoint, phase=nombre_fase)
+
+
+def _escapar(valor: str) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _formatear_etiquetas(etiquetas: tuple[tuple[str, str], ...]) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas) + "}"
+
+
+def exportar() -> str:
+    """
+    Todas las métricas en el formato de texto de Prometheus (versión 0.0.4).
+    """
+    with _lock:
+        contadores = sorted(_contadores.items())
+        gauges = sorted(_gauges.items())
+        histogramas = sorted((k, list(v)) for k, v in _histogramas.items())
+
+    lineas: list[str] = []
+    vistos: set[str] = set()
+
+    def cabecera(nombre: str, tipo: str) -> None:
+        if nombre in vistos:
+            return
+        vistos.add(nombre)
+        if nombre in _descripciones:
+            lineas.append(f"# HELP {nombre} {_descripciones[nombre]}")
+        lineas.append(f"# TYPE {nombre} {tipo}")
+
+    for (nombre, etiquetas), valor in contadores:
+        cabecera(nombre, "counter")
+        lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+
+    for (nombre, etiquetas), valor in gauges:
+        cabecera(nombre, "gauge")
+        lineas.append(f"{nombre}{_formatear_etiquetas(etiquetas)} {valor}")
+
+    for (nombre, etiquetas), valores in histogramas:
+        cabecera(nombre, "histogram")
+        for limite, conteo in zip(BUCKETS, valores):
+            le = "+Inf" if limite == float("inf") else repr(limite)
+            lineas.append(
+                f"{nombre}_bucket{_formatear_etiquetas(etiquetas + (('le', le),))} {conteo}"
+            )
+        lineas.append(f"{nombre}_sum{_formatear_etiquetas(etiquetas)} {valores[-2]}")
+        lineas.append(f"{nombre}_count{_formatear_etiquetas(etiquetas)} {valores[-1]}")
+
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,604 @@
+"""
+A* paralelo con los aeropuertos repartidos por hash (HDA*, "hash distributed A*"), para las
+búsquedas muy caras.
+
+Cada aeropuerto del horario en memoria tiene un dueño entre `IA_VUELOS_PARALLEL_WORKERS` procesos,
+según un hash de su id: solo el dueño guarda su mejor costo g, lo mete a su lista abierta y lo
+expande. Al expandir, los vecinos de otro proceso se le mandan a su dueño por su buzón, un buffer
+circular en memoria compartida; cada proceso vacía su buzón entre un lote de expansiones y el
+siguiente.
+
+El costo y las ventanas de conexión son los de `ia_vuelos.lib.a_star`, con g en microsegundos
+(el primer tramo cuesta 0). La heurística no es la de `a_star` (kilómetros sumados a segundos),
+sino una cota admisible en las mismas unidades que g: la distancia al objetivo más cercano entre
+la mayor velocidad de los vuelos del horario (por la desigualdad del triángulo, ningún camino
+vuela menos), y 0 en los orígenes, porque el primer vuelo no cuenta. Un objetivo que sale de la
+lista abierta se vuelve el incumbente si mejora al anterior, y los procesos siguen expandiendo
+solo los nodos con f menor que el incumbente. La búsqueda termina cuando ningún proceso tiene
+nodos con f menor y no hay mensajes en camino, es decir, cuando en dos lecturas seguidas del
+estado de todos los procesos los mensajes enviados y recibidos suman lo mismo y ningún proceso
+trabajó entre una y otra (el algoritmo de los cuatro contadores de Mattern).
+
+Limitación conocida: el resultado no es determinista ni es siempre el de `a_star`. Como `a_star`,
+guarda una sola etiqueta (costo y vuelo de llegada) por aeropuerto, y con qué vuelo se llega decide
+qué conexiones quedan; así que el camino depende del orden de las expansiones, y ese orden depende
+de la heurística (esta no es la de `a_star`), del número de procesos y de cuándo llega cada
+mensaje. En 60 consultas sobre el horario sintético de `scripts/benchmark.py busqueda` (150
+aeropuertos, 3 días) el costo difiere del de `a_star` en 2 o 3 (a veces menor, a veces mayor), y
+con 4 procesos alguna cambia de una corrida a otra. Desempatar en el tope de la lista abierta no lo arregla: haría falta
+una etiqueta por vuelo de llegada (mucho más trabajo por búsqueda) o rondas sincronizadas. Por eso
+está apagada por defecto y es para medir, no para servir: `benchmark_paralelo` reporta el costo
+contra `a_star` y las consultas que cambian entre dos corridas.
+
+Los procesos se crean con fork la primera vez que se piden (`para`), nunca al importar `app`: con
+gunicorn, en el `post_fork` de cada worker, antes de que arranque sus hilos; con el servidor de
+Flask, en la primera búsqueda. Comparten el horario con las reglas de conexión
+(`transfer_patterns.limites_conexion`) y las coordenadas de los aeropuertos. Cada worker tiene su
+grupo, que atiende una búsqueda a la vez: si ya hay una en curso, la petición busca con `a_star`.
+
+Se activa con `IA_VUELOS_PARALLEL_WORKERS=N` (N >= 2), y solo se usa en las búsquedas cuyo costo
+estimado por el control de admisión (`ia_vuelos.admission`) es de al menos
+`IA_VUELOS_PARALLEL_MIN_COST` búsquedas típicas (con 0, en todas, aun sin control de admisión).
+"""
+
+import heapq
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ia_vuelos import distances, graph, metrics, rules
+from ia_vuelos.graph import Horario, de_microsegundos
+from ia_vuelos.lib import vuelo_directo
+from ia_vuelos.sqlalchemy import Airport, Flight
+from ia_vuelos.transfer_patterns import limites_conexion
+
+# mensajes (aeropuerto, g, llegada, vuelo, padre) que caben en el buzón de cada proceso
+CAPACIDAD_BUZON = 1 << 16
+# expansiones entre dos revisiones del buzón
+LOTE = 16
+# pausa de un proceso sin nada que hacer y del coordinador entre dos revisiones del estado
+ESPERA_S = 0.0002
+
+_INFINITO = np.iinfo(np.int64).max
+_CAMPOS_MENSAJE = 5
+
+# posiciones en `Grupo.control`
+_TERMINAR, _CERRAR, _DESDE, _HASTA, _NUM_ORIGENES, _INCUMBENTE, _INCUMBENTE_G = range(7)
+# columnas de `Grupo.estado` (una fila por proceso); la versión es par salvo mientras se escribe
+_ENVIADOS, _RECIBIDOS, _PENDIENTES, _EXPANSIONES, _RELAJACIONES, _FILAS, _VERSION = range(7)
+
+
+def duenios(ids: np.ndarray, procesos: int) -> np.ndarray:
+    """
+    Proceso dueño de cada aeropuerto: hash multiplicativo (Fibonacci) del id, para que los
+    aeropuertos cercanos (ids consecutivos) no caigan en el mismo proceso.
+    """
+    mezcla = (ids.astype(np.uint64) * np.uint64(0x9E3779B97F4A7C15)) >> np.uint64(32)
+    return (mezcla % np.uint64(procesos)).astype(np.int64)
+
+
+def _compartido(ctx, tipo: str, tamanio: int, dtype) -> np.ndarray:
+    return np.frombuffer(ctx.RawArray(tipo, max(tamanio, 1)), dtype=dtype)[:tamanio]
+
+
+class Grupo:
+    def __init__(
+        self,
+        horario: Horario,
+        lat_deg: np.ndarray,
+        lon_deg: np.ndarray,
+        mct_us: np.ndarray,
+        escala_us: np.ndarray,
+        procesos: int,
+        costo_minimo: float = 0.0,
+        limite_segundos: float = 60.0,
+    ) -> None:
+        self.horario = horario
+        self.n = len(horario.ids)
+        # coordenadas de cada aeropuerto del horario, para la heurística
+        self.lat_deg = lat_deg
+        self.lon_deg = lon_deg
+        self.mct_us = mct_us
+        self.escala_us = escala_us
+        self.procesos = procesos
+        self.costo_minimo = costo_minimo
+        self.limite_segundos = limite_segundos
+        self.duenio = duenios(horario.ids, procesos)
+        # la mayor velocidad (km/µs) de los vuelos del horario, para la heurística
+        origen = np.repeat(np.arange(self.n), np.diff(horario.offsets))
+        destino = np.asarray(horario.destino)
+        km = distances.haversine_km(
+            lat_deg[origen], lon_deg[origen], lat_deg[destino], lon_deg[destino]
+        )
+        duracion = np.asarray(horario.llegada) - np.asarray(horario.salida)
+        self.velocidad = float((km / np.maximum(duracion, 1)).max(initial=0.0))
+        # si un proceso no responde, el grupo deja de usarse
+        self.roto = False
+
+        ctx = multiprocessing.get_context("fork")
+        self.control = _compartido(ctx, "q", 7, np.int64)
+        self.estado = _compartido(ctx, "q", procesos * 7, np.int64).reshape(procesos, 7)
+        # f mínima de la lista abierta de cada proceso (-inf: todavía no empieza)
+        self.minimos = _compartido(ctx, "d", procesos, np.float64)
+        # de la búsqueda en curso: heurística, objetivos y orígenes (posiciones en `ids`)
+        self.h = _compartido(ctx, "d", self.n, np.float64)
+        self.objetivo = _compartido(ctx, "b", self.n, np.int8)
+        self.origenes = _compartido(ctx, "q", self.n, np.int64)
+        # la mejor etiqueta de cada aeropuerto, que solo escribe su dueño
+        self.padre = _compartido(ctx, "q", self.n, np.int64)
+        self.vuelo = _compartido(ctx, "q", self.n, np.int64)
+        self.buzones = _compartido(
+            ctx, "q", procesos * CAPACIDAD_BUZON * _CAMPOS_MENSAJE, np.int64
+        ).reshape(procesos, CAPACIDAD_BUZON, _CAMPOS_MENSAJE)
+        # (cabeza, cola) de cada buzón: mensajes leídos y escritos desde el inicio de la búsqueda
+        self.punteros = _compartido(ctx, "q", procesos * 2, np.int64).reshape(procesos, 2)
+        self._candados = [ctx.Lock() for _ in range(procesos)]
+        self._candado_incumbente = ctx.Lock()
+        self._inicio = [ctx.Semaphore(0) for _ in range(procesos)]
+        self._listos = ctx.Semaphore(0)
+        self._ocupado = ctx.Lock()
+
+        # sin `multiprocessing.Process`: los workers de gunicorn heredan el grupo y no deben
+        # terminar sus procesos al salir
+        self._creador = os.getpid()
+        self.pids = []
+        for w in range(procesos):
+            pid = os.fork()
+            if pid == 0:
+                try:
+                    self._trabajar(w)
+                finally:
+                    os._exit(0)
+            self.pids.append(pid)
+
+    # --- en los procesos del grupo ---
+
+    def _trabajar(self, w: int) -> None:
+        while True:
+            if not self._inicio[w].acquire(timeout=1.0):
+                # el proceso que creó el grupo ya no existe
+                if os.getppid() != self._creador:
+                    return
+                continue
+            if self.control[_CERRAR]:
+                return
+            try:
+                self._buscar(w)
+            finally:
+                self._listos.release()
+
+    def _recibir(self, w: int) -> list:
+        cabeza, cola = self.punteros[w]
+        if cola == cabeza:
+            return []
+        with self._candados[w]:
+            cabeza, cola = int(self.punteros[w, 0]), int(self.punteros[w, 1])
+            i = cabeza % CAPACIDAD_BUZON
+            primeros = min(cola - cabeza, CAPACIDAD_BUZON - i)
+            mensajes = np.concatenate(
+                (self.buzones[w, i : i + primeros], self.buzones[w, : cola - cabeza - primeros])
+            )
+            self.punteros[w, 0] = cola
+        return mensajes.tolist()
+
+    def _enviar(self, o: int, mensajes: list) -> int:
+        """
+        Se escriben en el buzón de `o` los mensajes que quepan; se regresa cuántos.
+        """
+        with self._candados[o]:
+            cabeza, cola = int(self.punteros[o, 0]), int(self.punteros[o, 1])
+            k = min(len(mensajes), CAPACIDAD_BUZON - (cola - cabeza))
+            if k > 0:
+                bloque = np.array(mensajes[:k], dtype=np.int64)
+                i = cola % CAPACIDAD_BUZON
+                primeros = min(k, CAPACIDAD_BUZON - i)
+                self.buzones[o, i : i + primeros] = bloque[:primeros]
+                self.buzones[o, : k - primeros] = bloque[primeros:]
+                self.punteros[o, 1] = cola + k
+        return k
+
+    def _buscar(self, w: int) -> None:
+        horario, control, estado = self.horario, self.control, self.estado
+        # listas de Python: el acceso por elemento es mucho más barato que en NumPy
+        h = self.h.tolist()
+        es_objetivo = self.objetivo.tolist()
+        duenio = self.duenio.tolist()
+        mct = self.mct_us.tolist()
+        escala = self.escala_us.tolist()
+        padres, vuelos = self.padre, self.vuelo
+        desde_dia, hasta_dia = int(control[_DESDE]), int(control[_HASTA])
+
+        g_mejor: dict[int, int] = {}
+        # (f, g, aeropuerto, llegada del vuelo con el que se llegó, -1 en los orígenes)
+        abierta: list[tuple[float, int, int, int]] = []
+        salientes: list[list] = [[] for _ in range(self.procesos)]
+        # el menor g mandado a cada aeropuerto ajeno: los peores no hace falta mandarlos
+        enviado: dict[int, int] = {}
+        enviados = recibidos = expansiones = relajaciones = filas = 0
+
+        def relajar(a: int, g: int, llegada: int, vuelo: int, padre: int) -> int:
+            if g >= g_mejor.get(a, _INFINITO):
+                return 0
+            g_mejor[a] = g
+            padres[a] = padre
+            vuelos[a] = vuelo
+            # en los orígenes la cota es 0: el primer vuelo no cuesta
+            heapq.heappush(abierta, (g + h[a] if llegada >= 0 else 0.0, g, a, llegada))
+            return 1
+
+        for a in self.origenes[: control[_NUM_ORIGENES]].tolist():
+            if duenio[a] == w:
+                relajar(a, 0, -1, -1, -1)
+
+        # la primera vez siempre se publica el estado
+        trabajo = True
+        while not control[_TERMINAR]:
+            for a, g, llegada, vuelo, padre in self._recibir(w):
+                recibidos += 1
+                relajaciones += relajar(a, g, llegada, vuelo, padre)
+                trabajo = True
+
+            incumbente = float(control[_INCUMBENTE_G])
+            for _ in range(LOTE):
+                # las etiquetas que ya se mejoraron se descartan al llegar al tope
+                while abierta and abierta[0][1] > g_mejor[abierta[0][2]]:
+                    heapq.heappop(abierta)
+                if not abierta or abierta[0][0] >= incumbente:
+                    break
+                _, g, a, llegada = heapq.heappop(abierta)
+                trabajo = True
+
+                if es_objetivo[a]:
+                    with self._candado_incumbente:
+                        # con el mismo costo, el de menor posición (no el que llegue primero)
+                        if (g, a) < (control[_INCUMBENTE_G], control[_INCUMBENTE]):
+                            control[_INCUMBENTE_G] = g
+                            control[_INCUMBENTE] = a
+                    incumbente = float(control[_INCUMBENTE_G])
+                    continue
+
+                expansiones += 1
+                if llegada < 0:
+                    desde, hasta = desde_dia, hasta_dia
+                else:
+                    desde, hasta = llegada + mct[a], llegada + escala[a]
+                posiciones = horario.salidas(a, de_microsegundos(desde), de_microsegundos(hasta))
+                if not posiciones:
+                    continue
+                filas += len(posiciones)
+                columnas = horario.columnas(
+                    posiciones.start, posiciones.stop, ("llegada", "destino")
+                )
+                for vuelo, llegada_vecino, d in zip(
+                    posiciones, columnas["llegada"].tolist(), columnas["destino"].tolist()
+                ):
+                    # el primer tramo cuesta 0; los demás, la espera más la duración del vuelo
+                    g_vecino = 0 if llegada < 0 else g + llegada_vecino - llegada
+                    o = duenio[d]
+                    if o == w:
+                        relajaciones += relajar(d, g_vecino, llegada_vecino, vuelo, a)
+                    elif g_vecino < enviado.get(d, _INFINITO):
+                        enviado[d] = g_vecino
+                        salientes[o].append((d, g_vecino, llegada_vecino, vuelo, a))
+
+            pendientes = 0
+            for o, mensajes in enumerate(salientes):
+                if mensajes:
+                    # si el buzón está lleno, el resto se manda en la siguiente vuelta
+                    k = self._enviar(o, mensajes)
+                    del mensajes[:k]
+                    enviados += k
+                    pendientes += len(mensajes)
+                    trabajo = trabajo or k > 0
+
+            if trabajo:
+                while abierta and abierta[0][1] > g_mejor[abierta[0][2]]:
+                    heapq.heappop(abierta)
+                estado[w, _VERSION] += 1
+                estado[w, :_VERSION] = (
+                    enviados,
+                    recibidos,
+                    pendientes,
+                    expansiones,
+                    relajaciones,
+                    filas,
+                )
+                self.minimos[w] = abierta[0][0] if abierta else np.inf
+                estado[w, _VERSION] += 1
+                trabajo = False
+            else:
+                time.sleep(ESPERA_S)
+
+    # --- en el proceso de la petición ---
+
+    def _instantanea(self) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Copia consistente del estado de todos los procesos (ninguno lo escribía a la mitad).
+        """
+        while True:
+            antes = self.estado[:, _VERSION].copy()
+            if (antes % 2).any():
+                continue
+            estado, minimos = self.estado.copy(), self.minimos.copy()
+            if (self.estado[:, _VERSION] == antes).all():
+                return estado, minimos
+
+    def heuristica(self, objetivos: list[int]) -> np.ndarray:
+        """
+        Cota inferior (µs) del costo que falta desde cada aeropuerto del horario: la distancia
+        (haversine) al objetivo más cercano entre la mayor velocidad de los vuelos del horario.
+        """
+        if self.velocidad <= 0:
+            return np.zeros(self.n, dtype=np.float64)
+        km = distances.haversine_km(
+            self.lat_deg[:, None],
+            self.lon_deg[:, None],
+            self.lat_deg[None, objetivos],
+            self.lon_deg[None, objetivos],
+        )
+        return km.min(axis=1) / self.velocidad
+
+    def buscar(
+        self,
+        origenes: list[int],
+        objetivos: list[int],
+        desde: int,
+        hasta: int,
+        max_expansiones: int | None = None,
+        estadisticas: dict[str, int] | None = None,
+    ) -> tuple[int, list[tuple[int, int]]] | None:
+        """
+        Camino de alguno de los `origenes` a alguno de los `objetivos` (posiciones en `ids`),
+        con el primer vuelo saliendo en `[desde, hasta)` (µs): `(objetivo, [(aeropuerto,
+        posición del vuelo que sale de ahí), ...])`, con la lista vacía si no hay ruta o se rebasó
+        `max_expansiones`. Si el grupo está ocupado con otra búsqueda (o roto), `None`.
+        """
+        if estadisticas is None:
+            estadisticas = {}
+        if self.roto or not self._ocupado.acquire(block=False):
+            return None
+        try:
+            return self._coordinar(origenes, objetivos, desde, hasta, max_expansiones, estadisticas)
+        finally:
+            self._ocupado.release()
+
+    def _coordinar(
+        self,
+        origenes: list[int],
+        objetivos: list[int],
+        desde: int,
+        hasta: int,
+        max_expansiones: int | None,
+        estadisticas: dict[str, int],
+    ) -> tuple[int, list[tuple[int, int]]] | None:
+        control = self.control
+        control[:] = (0, 0, desde, hasta, len(origenes), -1, _INFINITO)
+        self.estado[:] = 0
+        self.minimos[:] = -np.inf
+        self.punteros[:] = 0
+        self.h[:] = self.heuristica(objetivos)
+        self.objetivo[:] = 0
+        self.objetivo[objetivos] = 1
+        self.origenes[: len(origenes)] = origenes
+        self.padre[:] = -1
+        self.vuelo[:] = -1
+
+        for semaforo in self._inicio:
+            semaforo.release()
+
+        limite = time.monotonic() + self.limite_segundos
+        truncada = False
+        anterior = None
+        while True:
+            time.sleep(ESPERA_S)
+            estado, minimos = self._instantanea()
+            if max_expansiones is not None and estado[:, _EXPANSIONES].sum() > max_expansiones:
+                truncada = True
+                break
+            if time.monotonic() > limite:
+                # como si se rebasara `max_expansiones`
+                truncada = True
+                break
+            incumbente = float(control[_INCUMBENTE_G])
+            quieto = (
+                (minimos >= incumbente).all()
+                and estado[:, _PENDIENTES].sum() == 0
+                and estado[:, _ENVIADOS].sum() == estado[:, _RECIBIDOS].sum()
+            )
+            if not quieto:
+                anterior = None
+            elif anterior is not None and (estado[:, _VERSION] == anterior).all():
+                break
+            else:
+                anterior = estado[:, _VERSION].copy()
+
+        control[_TERMINAR] = 1
+        for _ in range(self.procesos):
+            if not self._listos.acquire(timeout=5.0):
+                self.roto = True
+                break
+        if self.roto:
+            return None
+
+        estado = self.estado
+        estadisticas["expansiones"] += int(estado[:, _EXPANSIONES].sum())
+        estadisticas["relajaciones"] += int(estado[:, _RELAJACIONES].sum())
+        estadisticas["consultas_vecinos"] += int(estado[:, _EXPANSIONES].sum())
+        estadisticas["filas"] += int(estado[:, _FILAS].sum())
+        estadisticas["mensajes"] = estadisticas.get("mensajes", 0) + int(estado[:, _ENVIADOS].sum())
+
+        objetivo = int(control[_INCUMBENTE])
+        if truncada:
+            estadisticas["truncada"] = 1
+            return (objetivos[0], [])
+        if objetivo < 0:
+            return (objetivos[0], [])
+        camino = []
+        a = objetivo
+        while self.padre[a] >= 0:
+            a, vuelo = int(self.padre[a]), int(self.vuelo[a])
+            camino.append((a, vuelo))
+            # igual que en `a_star`: un camino nunca tiene más vuelos que aeropuertos
+            if len(camino) > self.n:
+                return (objetivo, [])
+        return (objetivo, camino[::-1])
+
+    def conviene(self, costo: float | None) -> bool:
+        """
+        Si una búsqueda con el costo estimado (`admission.Estimacion.costo`) se hace en paralelo.
+        """
+        if costo is None:
+            return self.costo_minimo <= 0
+        return costo >= self.costo_minimo
+
+    def cerrar(self) -> None:
+        self.control[_CERRAR] = 1
+        for semaforo in self._inicio:
+            semaforo.release()
+        if os.getpid() == self._creador:
+            for pid in self.pids:
+                os.waitpid(pid, 0)
+
+
+def a_star_paralelo(
+    sqlalchemy_session: Session,
+    grupo: Grupo,
+    aeropuertos_iniciales: list[Airport],
+    aeropuertos_objetivo: list[Airport],
+    salida_primer_vuelo: datetime,
+    estadisticas: dict[str, int] | None = None,
+    max_expansiones: int | None = None,
+) -> tuple[list[tuple[Airport, Flight]], Airport] | None:
+    """
+    Un camino como los de `a_star` (con las reglas con las que se creó el grupo), buscando con
+    los procesos de `grupo`; `None` si el grupo está ocupado con otra búsqueda. No siempre es el
+    mismo que el de `a_star`, ni el mismo entre corridas (ver la limitación en el docstring del
+    módulo).
+    """
+    if estadisticas is None:
+        estadisticas = {}
+    for contador in ("expansiones", "relajaciones", "consultas_vecinos", "filas"):
+        estadisticas.setdefault(contador, 0)
+
+    horario = grupo.horario
+    # sin repetidos, conservando el orden
+    origenes = list(dict.fromkeys(aeropuertos_iniciales))
+    objetivos = list(dict.fromkeys(aeropuertos_objetivo))
+    # un origen que también es objetivo se acepta antes de expandir nada, como en `a_star`
+    for origen in origenes:
+        if origen in objetivos:
+            return ([], origen)
+    directo = vuelo_directo(horario, origenes, objetivos, salida_primer_vuelo)
+    if directo is not None:
+        origen, vuelo, objetivo = directo
+        metrics.registrar_busqueda(estadisticas)
+        return ([(origen, vuelo)], objetivo)
+
+    posiciones_origen = [horario.indice(int(a.id)) for a in origenes]
+    posiciones_objetivo = [horario.indice(int(a.id)) for a in objetivos]
+    posiciones_origen = [i for i in posiciones_origen if i >= 0]
+    por_posicion = {i: a for i, a in zip(posiciones_objetivo, objetivos) if i >= 0}
+    if not posiciones_origen or not por_posicion:
+        # sin vuelos de salida o de llegada no hay ruta
+        return ([], objetivos[0])
+
+    desde, hasta = (graph.a_microsegundos(f) for f in rules.ventana_salida(salida_primer_vuelo))
+    with metrics.fase("parallel_search"):
+        encontrado = grupo.buscar(
+            posiciones_origen, list(por_posicion), desde, hasta, max_expansiones, estadisticas
+        )
+    if encontrado is None:
+        metrics.incrementar("ia_vuelos_parallel_search_total", resultado="ocupado")
+        return None
+    metrics.incrementar("ia_vuelos_parallel_search_total", resultado="paralela")
+    metrics.registrar_busqueda(estadisticas)
+
+    objetivo, camino = encontrado
+    if not camino:
+        return ([], por_posicion.get(objetivo, objetivos[0]))
+    aeropuertos = {int(a.id): a for a in origenes}
+    resultado = []
+    for i, posicion in camino:
+        airport_id = int(horario.ids[i])
+        if airport_id not in aeropuertos:
+            aeropuertos[airport_id] = sqlalchemy_session.get(Airport, airport_id)
+        resultado.append((aeropuertos[airport_id], horario.vuelo(posicion)))
+    return (resultado, por_posicion[objetivo])
+
+
+def habilitado() -> bool:
+    return int(os.environ.get("IA_VUELOS_PARALLEL_WORKERS", "0") or 0) >= 2
+
+
+_grupo: Grupo | None = None
+_creando = threading.Lock()
+
+
+def actual() -> Grupo | None:
+    """
+    El grupo de procesos de este proceso (ver `para`), si ya se creó.
+    """
+    return _grupo
+
+
+def usar(grupo: Grupo | None) -> None:
+    global _grupo
+    _grupo = grupo
+
+
+def crear(
+    session: Session,
+    horario: Horario,
+    procesos: int,
+    reglas: rules.Reglas | None = None,
+    costo_minimo: float = 0.0,
+) -> Grupo:
+    """
+    Se leen las coordenadas y las reglas de conexión de los aeropuertos del horario y se crean los
+    procesos del grupo.
+    """
+    if reglas is None:
+        reglas = rules.actuales()
+    coordenadas = {
+        int(airport_id): (lat, lon)
+        for airport_id, lat, lon in session.execute(
+            select(Airport.id, Airport.latitude_deg, Airport.longitude_deg)
+        ).tuples()
+    }
+    lat, lon = (
+        np.array([coordenadas.get(int(i), (0.0, 0.0)) for i in horario.ids], dtype=np.float64)
+        .reshape(-1, 2)
+        .T
+    )
+    mct_us, escala_us = limites_conexion(session, horario, reglas)
+    # lo que ya existe no se recorre (ni se escribe) desde los procesos hijos
+    graph.preparar_fork()
+    return Grupo(
+        horario, lat.copy(), lon.copy(), mct_us, escala_us, procesos, costo_minimo=costo_minimo
+    )
+
+
+def para(session: Session, horario: Horario | None) -> Grupo | None:
+    """
+    El grupo de este proceso, con `IA_VUELOS_PARALLEL_WORKERS` procesos; se crea la primera vez
+    que se pide. `None` si no está habilitado o no hay horario en memoria.
+    """
+    global _grupo
+    if horario is None or not habilitado():
+        return None
+    with _creando:
+        if _grupo is None:
+            _grupo = crear(
+                session,
+                horario,
+                int(os.environ["IA_VUELOS_PARALLEL_WORKERS"]),
+                costo_minimo=float(os.environ.get("IA_VUELOS_PARALLEL_MIN_COST", "20")),
+            )
+            print(f"Búsqueda paralela: {_grupo.procesos} procesos (pid {os.getpid()})")
+    return _grupo
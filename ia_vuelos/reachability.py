@@ -0,0 +1,253 @@
+"""
+Alcanzabilidad precalculada sobre el horario en memoria, para descartar al instante las búsquedas
+sin ruta (que son las más caras: `a_star` solo se rinde después de agotar toda la frontera).
+
+Para cada día `d` del horario se toma el grafo de los vuelos que salen desde `d` (las escalas
+siempre son posteriores a la salida), se calculan sus componentes fuertemente conexas (Tarjan) y,
+sobre el grafo de componentes, el cierre transitivo como bitsets (`np.packbits`) de aeropuertos.
+La fila de un origen `o` en el día `d` es la unión de los cierres de los destinos de los vuelos
+que salen de `o` ese día, así que "¿hay ruta de `o` a `x` saliendo el día `d`?" es leer un bit.
+
+Es una sobreaproximación (no toma en cuenta el MCT ni la escala máxima): si el bit es 0 no hay
+ruta, si es 1 puede haberla y se busca. Las filas repetidas (p.ej. todos los aeropuertos de una
+misma componente grande) se guardan una sola vez.
+
+Se calcula fuera de línea, como los patrones de transbordo, y la app solo abre los arreglos con
+mmap (si no existen, no se descarta ninguna búsqueda):
+
+```sh
+python3 scripts/build_reachability.py  # escribe data/reachability/
+```
+
+Formato en disco (un directorio con archivos `.npy`): `dias.npy`, `fila.npy`, `filas.npy` y
+`componentes.npy` (los atributos de `Alcanzabilidad`) y `huella.npy`, la huella del horario con
+el que se calcularon (`graph.huella`).
+"""
+
+import os
+from datetime import datetime
+
+import numpy as np
+
+from ia_vuelos.graph import Horario, a_microsegundos, huella
+
+DIRECTORIO_DEFAULT = os.environ.get("IA_VUELOS_REACHABILITY_DIR", "data/reachability")
+
+_DIA_US = 86_400 * 1_000_000
+_ARREGLOS = ("dias", "fila", "filas", "componentes", "huella")
+
+
+def componentes_fuertes(n: int, offsets: np.ndarray, destinos: np.ndarray) -> tuple:
+    """
+    Componentes fuertemente conexas del grafo en formato CSR (Tarjan, sin recursión). Se regresan
+    `(componente de cada nodo, número de componentes)`; las componentes quedan numeradas en orden
+    topológico inverso: las aristas entre componentes van de un número mayor a uno menor.
+    """
+    offsets = offsets.tolist()
+    destinos = destinos.tolist()
+    indice = [-1] * n
+    bajo = [0] * n
+    en_pila = [False] * n
+    pila: list[int] = []
+    componente = [-1] * n
+    num_componentes = 0
+    contador = 0
+    for raiz in range(n):
+        if indice[raiz] >= 0:
+            continue
+        indice[raiz] = bajo[raiz] = contador
+        contador += 1
+        pila.append(raiz)
+        en_pila[raiz] = True
+        trabajo = [(raiz, offsets[raiz])]
+        while trabajo:
+            v, i = trabajo[-1]
+            if i < offsets[v + 1]:
+                trabajo[-1] = (v, i + 1)
+                w = destinos[i]
+                if indice[w] < 0:
+                    indice[w] = bajo[w] = contador
+                    contador += 1
+                    pila.append(w)
+                    en_pila[w] = True
+                    trabajo.append((w, offsets[w]))
+                elif en_pila[w]:
+                    bajo[v] = min(bajo[v], indice[w])
+                continue
+            trabajo.pop()
+            if trabajo:
+                u = trabajo[-1][0]
+                bajo[u] = min(bajo[u], bajo[v])
+            if bajo[v] == indice[v]:
+                while True:
+                    w = pila.pop()
+                    en_pila[w] = False
+                    componente[w] = num_componentes
+                    if w == v:
+                        break
+                num_componentes += 1
+    return np.array(componente, dtype=np.int64), num_componentes
+
+
+def _csr(n: int, origenes: np.ndarray, destinos: np.ndarray) -> tuple:
+    """
+    Aristas únicas `origenes[i] -> destinos[i]` en formato CSR.
+    """
+    pares = np.unique(origenes.astype(np.int64) * n + destinos)
+    origenes, destinos = np.divmod(pares, n)
+    return np.searchsorted(origenes, np.arange(n + 1)), destinos
+
+
+def _cierre(n: int, origenes: np.ndarray, destinos: np.ndarray) -> tuple:
+    """
+    Componente de cada aeropuerto y, por componente, el bitset de los aeropuertos alcanzables
+    desde ella (incluidos los suyos).
+    """
+    offsets, vecinos = _csr(n, origenes, destinos)
+    componente, num_componentes = componentes_fuertes(n, offsets, vecinos)
+    bytes_fila = (n + 7) // 8
+    cierre = np.zeros((num_componentes, bytes_fila), dtype=np.uint8)
+    nodos = np.arange(n)
+    np.bitwise_or.at(
+        cierre, (componente, nodos >> 3), (0x80 >> (nodos & 7)).astype(np.uint8)
+    )  # orden de bits de np.packbits
+
+    # aristas entre componentes, agrupadas por componente de salida; como los números siguen
+    # el orden topológico inverso, al llegar a una componente sus sucesoras ya están completas
+    aristas = np.unique(
+        componente[np.repeat(nodos, np.diff(offsets))] * num_componentes + componente[vecinos]
+    )
+    salida, llegada = np.divmod(aristas, num_componentes)
+    externas = salida != llegada
+    salida, llegada = salida[externas], llegada[externas]
+    limites = np.searchsorted(salida, np.arange(num_componentes + 1))
+    for c in range(num_componentes):
+        if limites[c] < limites[c + 1]:
+            cierre[c] |= np.bitwise_or.reduce(cierre[llegada[limites[c] : limites[c + 1]]], axis=0)
+    return componente, cierre, num_componentes
+
+
+class Alcanzabilidad:
+    def __init__(
+        self,
+        horario: Horario,
+        dias: np.ndarray,
+        fila: np.ndarray,
+        filas: np.ndarray,
+        componentes: np.ndarray,
+        huella: np.ndarray,
+    ) -> None:
+        self.horario = horario
+        # días (desde `EPOCA`) con vuelos; `fila[k, o]` es la fila de `filas` con los
+        # aeropuertos alcanzables desde `o` saliendo el día `dias[k]` (-1: ninguno)
+        self.dias = dias
+        self.fila = fila
+        self.filas = filas
+        # número de componentes fuertemente conexas del grafo de cada día
+        self.componentes = componentes
+        self.huella = huella
+
+    def nbytes(self) -> int:
+        return self.dias.nbytes + self.fila.nbytes + self.filas.nbytes
+
+    def guardar(self, directorio: str) -> None:
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in _ARREGLOS:
+            np.save(os.path.join(directorio, f"{nombre}.npy"), getattr(self, nombre))
+
+    @classmethod
+    def cargar(cls, directorio: str, horario: Horario) -> "Alcanzabilidad":
+        return cls(
+            horario,
+            *(
+                np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r")
+                for nombre in _ARREGLOS
+            ),
+        )
+
+    def alcanzable(self, origen_id: int, destino_id: int, fecha: datetime) -> bool:
+        """
+        `False` si seguro no hay ruta de `origen_id` a `destino_id` saliendo el día de `fecha`.
+        """
+        if origen_id == destino_id:
+            return True
+        o, x = self.horario.indice(origen_id), self.horario.indice(destino_id)
+        if o < 0 or x < 0:
+            return False
+        dia = a_microsegundos(datetime(fecha.year, fecha.month, fecha.day)) // _DIA_US
+        k = int(np.searchsorted(self.dias, dia))
+        if k == len(self.dias) or self.dias[k] != dia:
+            return False
+        fila = self.fila[k, o]
+        return fila >= 0 and bool(self.filas[fila, x >> 3] & (0x80 >> (x & 7)))
+
+    def alguno_alcanzable(self, origen_ids, destino_ids, fecha: datetime) -> bool:
+        return any(self.alcanzable(o, x, fecha) for o in origen_ids for x in destino_ids)
+
+
+def construir(horario: Horario) -> Alcanzabilidad:
+    n = len(horario.ids)
+    origen_vuelo = np.repeat(np.arange(n), np.diff(horario.offsets))
+    # columnas completas (con el horario comprimido se decodifican una sola vez)
+    destino = np.asarray(horario.destino)
+    dia_vuelo = np.asarray(horario.salida) // _DIA_US
+    dias = np.unique(dia_vuelo)
+
+    fila = np.full((len(dias), n), -1, dtype=np.int32)
+    filas: list[np.ndarray] = []
+    vistas: dict[bytes, int] = {}
+    componentes = np.zeros(len(dias), dtype=np.int64)
+    for k, dia in enumerate(dias):
+        desde_dia = dia_vuelo >= dia
+        componente, cierre, componentes[k] = _cierre(n, origen_vuelo[desde_dia], destino[desde_dia])
+
+        # por origen con salidas ese día, la unión de los cierres de sus destinos
+        del_dia = np.flatnonzero(dia_vuelo == dia)  # ordenados por origen
+        origenes = origen_vuelo[del_dia]
+        inicios = np.flatnonzero(np.r_[True, origenes[1:] != origenes[:-1]])
+        uniones = np.bitwise_or.reduceat(cierre[componente[destino[del_dia]]], inicios)
+        for o, union in zip(origenes[inicios], uniones):
+            llave = union.tobytes()
+            if llave not in vistas:
+                vistas[llave] = len(filas)
+                filas.append(union)
+            fila[k, o] = vistas[llave]
+
+    bytes_fila = (n + 7) // 8
+    return Alcanzabilidad(
+        horario,
+        dias,
+        fila,
+        np.array(filas, dtype=np.uint8).reshape(len(filas), bytes_fila),
+        componentes,
+        huella(horario),
+    )
+
+
+_alcanzabilidad: Alcanzabilidad | None = None
+
+
+def actual() -> Alcanzabilidad | None:
+    return _alcanzabilidad
+
+
+def usar(alcanzabilidad: Alcanzabilidad | None) -> None:
+    global _alcanzabilidad
+    _alcanzabilidad = alcanzabilidad
+
+
+def cargar_global(
+    horario: Horario | None, directorio: str = DIRECTORIO_DEFAULT
+) -> Alcanzabilidad | None:
+    """
+    Se carga (con mmap) la alcanzabilidad de `directorio` para el proceso, si existe y es del
+    mismo horario.
+    """
+    if horario is None or not os.path.exists(os.path.join(directorio, "huella.npy")):
+        return None
+    alcanzabilidad = Alcanzabilidad.cargar(directorio, horario)
+    if not np.array_equal(alcanzabilidad.huella, huella(horario)):
+        print(f"La alcanzabilidad de {directorio} no corresponde al horario cargado; no se usa")
+        return None
+    usar(alcanzabilidad)
+    return alcanzabilidad
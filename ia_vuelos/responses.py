@@ -0,0 +1,164 @@
+"""
+Respuestas JSON de la API: serialización rápida, compresión negociada y transmisión por partes.
+
+- `json_response` serializa con `orjson` si está instalado (si no, con `json`) y comprime con
+  brotli o gzip, según el `Accept-Encoding` de la petición, solo si el cuerpo pasa de
+  `UMBRAL_COMPRESION` bytes.
+- `stream_json` transmite un iterable (p.ej. un generador sobre una consulta con `yield_per`) como
+  un arreglo JSON, o como NDJSON (un objeto por línea) si se pide con `?format=ndjson` o
+  `Accept: application/x-ndjson`; así el cuerpo nunca está completo en memoria. Se envía en bloques
+  de `TAMANIO_BLOQUE` bytes, comprimidos (y vaciados) bloque por bloque. Como en `json_response`,
+  solo se comprime si el cuerpo llega a `UMBRAL_COMPRESION` bytes: se lee hasta ese tamaño antes de
+  elegir, y si el iterable se acaba antes, la respuesta se manda completa y sin comprimir.
+"""
+
+import itertools
+import json
+import os
+import zlib
+from typing import Any, Callable, Iterable, Iterator
+
+from flask import Response, request
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+UMBRAL_COMPRESION = int(os.environ.get("IA_VUELOS_COMPRESS_MIN_BYTES", "1024"))
+TAMANIO_BLOQUE = 64 * 1024
+
+MIMETYPE_NDJSON = "application/x-ndjson"
+
+
+def dumps(obj: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+def codificacion_aceptada() -> str | None:
+    """
+    `"br"` o `"gzip"` según el `Accept-Encoding` de la petición (se prefiere brotli, si está
+    instalado), o `None` si no acepta ninguna.
+    """
+    aceptadas = set()
+    for parte in request.headers.get("Accept-Encoding", "").split(","):
+        nombre, _, parametros = parte.strip().partition(";")
+        q = parametros.strip().removeprefix("q=")
+        try:
+            if parametros and float(q) == 0:
+                continue
+        except ValueError:
+            continue
+        aceptadas.add(nombre.strip().lower())
+    if brotli is not None and "br" in aceptadas:
+        return "br"
+    if "gzip" in aceptadas:
+        return "gzip"
+    return None
+
+
+def _compresor(codificacion: str) -> tuple[Callable[[bytes], bytes], Callable[[], bytes]]:
+    """
+    Funciones para comprimir (y vaciar) un bloque y para terminar el flujo comprimido.
+    """
+    if codificacion == "br":
+        compresor = brotli.Compressor(quality=5)  # pyright: ignore [reportOptionalMemberAccess]
+        return lambda bloque: compresor.process(bloque) + compresor.flush(), compresor.finish
+    compresor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: formato gzip
+    return (
+        lambda bloque: compresor.compress(bloque) + compresor.flush(zlib.Z_SYNC_FLUSH),
+        compresor.flush,
+    )
+
+
+def json_response(obj: Any, status: int = 200) -> Response:
+    cuerpo = dumps(obj)
+    headers = {"Vary": "Accept-Encoding"}
+    codificacion = codificacion_aceptada()
+    if codificacion is not None and len(cuerpo) >= UMBRAL_COMPRESION:
+        comprimir, terminar = _compresor(codificacion)
+        cuerpo = comprimir(cuerpo) + terminar()
+        headers["Content-Encoding"] = codificacion
+    return Response(cuerpo, status=status, mimetype="application/json", headers=headers)
+
+
+def _bloques(partes: Iterable[bytes]) -> Iterator[bytes]:
+    buffer, tamanio = [], 0
+    for parte in partes:
+        buffer.append(parte)
+        tamanio += len(parte)
+        if tamanio >= TAMANIO_BLOQUE:
+            yield b"".join(buffer)
+            buffer, tamanio = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _comprimidos(bloques: Iterator[bytes], codificacion: str) -> Iterator[bytes]:
+    comprimir, terminar = _compresor(codificacion)
+    for bloque in bloques:
+        yield comprimir(bloque)
+    yield terminar()
+
+
+def _arreglo(elementos: Iterable) -> Iterator[bytes]:
+    yield b"["
+    primero = True
+    for elemento in elementos:
+        yield dumps(elemento) if primero else b"," + dumps(elemento)
+        primero = False
+    yield b"]"
+
+
+def _ndjson(elementos: Iterable) -> Iterator[bytes]:
+    for elemento in elementos:
+        yield dumps(elemento) + b"\n"
+
+
+def pide_ndjson() -> bool:
+    return (
+        request.args.get("format") == "ndjson"
+        or request.accept_mimetypes.best_match(["application/json", MIMETYPE_NDJSON])
+        == MIMETYPE_NDJSON
+    )
+
+
+def stream_json(elementos: Iterable, ndjson: bool | None = None) -> Response:
+    """
+    Se transmite `elementos` como arreglo JSON o NDJSON (por defecto, según la petición). El
+    iterable se consume mientras se envía la respuesta, fuera del contexto de la vista (salvo los
+    primeros `UMBRAL_COMPRESION` bytes, si se acepta compresión).
+    """
+    headers = {"Vary": "Accept-Encoding"}
+    if ndjson is None:
+        ndjson = pide_ndjson()
+        # sin `?format=ndjson` el formato sale del `Accept`, así que los caches compartidos
+        # deben distinguir por él
+        if request.args.get("format") != "ndjson":
+            headers["Vary"] = "Accept, Accept-Encoding"
+    partes = iter(_ndjson(elementos) if ndjson else _arreglo(elementos))
+    mimetype = MIMETYPE_NDJSON if ndjson else "application/json"
+    codificacion = codificacion_aceptada()
+    if codificacion is None:
+        return Response(_bloques(partes), mimetype=mimetype, headers=headers)
+
+    # con menos de UMBRAL_COMPRESION bytes no vale la pena comprimir (ni transmitir por partes)
+    inicio, tamanio = [], 0
+    for parte in partes:
+        inicio.append(parte)
+        tamanio += len(parte)
+        if tamanio >= UMBRAL_COMPRESION:
+            break
+    else:
+        return Response(b"".join(inicio), mimetype=mimetype, headers=headers)
+
+    bloques = _comprimidos(_bloques(itertools.chain(inicio, partes)), codificacion)
+    headers["Content-Encoding"] = codificacion
+    return Response(bloques, mimetype=mimetype, headers=headers)
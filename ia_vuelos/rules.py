@@ -0,0 +1,141 @@
+"""
+Reglas de conexión entre vuelos: tiempo mínimo de conexión (MCT) y escala máxima.
+
+Una conexión en un aeropuerto es válida si el siguiente vuelo sale al menos el MCT del aeropuerto
+después de la llegada y a lo más la escala máxima después. El MCT depende del tipo de aeropuerto
+(`MCT_POR_TIPO`) y se puede cambiar para aeropuertos concretos con un archivo JSON
+(`IA_VUELOS_RULES_FILE`):
+
+```json
+{
+  "mct_min_by_type": {"large_airport": 75},
+  "mct_min_default": 30,
+  "max_layover_min": 1440,
+  "airports": {"4044": {"mct_min": 90, "max_layover_min": 720}}
+}
+```
+
+Las reglas se aplican al generar los vecinos en la búsqueda (`Reglas.ventana_conexion` da la
+ventana de salidas válidas), así que las conexiones imposibles nunca entran a la lista abierta.
+"""
+
+import json
+import os
+from datetime import datetime, timedelta
+
+from ia_vuelos.sqlalchemy import Airport
+
+MCT_POR_TIPO = {
+    "large_airport": timedelta(minutes=60),
+    "medium_airport": timedelta(minutes=45),
+    "small_airport": timedelta(minutes=30),
+}
+MCT_DEFAULT = timedelta(minutes=30)
+ESCALA_MAXIMA = timedelta(hours=24)
+
+
+class Reglas:
+    def __init__(
+        self,
+        mct_por_tipo: dict[str, timedelta] | None = None,
+        mct_default: timedelta = MCT_DEFAULT,
+        escala_maxima: timedelta = ESCALA_MAXIMA,
+        por_aeropuerto: dict[int, dict[str, timedelta]] | None = None,
+        mismo_dia: bool = False,
+    ) -> None:
+        self.mct_por_tipo = MCT_POR_TIPO if mct_por_tipo is None else mct_por_tipo
+        self.mct_default = mct_default
+        self.escala_maxima = escala_maxima
+        # {airport_id: {"mct": timedelta, "escala_maxima": timedelta}} (cualquiera es opcional)
+        self.por_aeropuerto = por_aeropuerto or {}
+        # comportamiento anterior: cualquier vuelo del mismo día de la llegada, sin MCT
+        self.mismo_dia = mismo_dia
+
+    @classmethod
+    def sin_restricciones(cls) -> "Reglas":
+        """
+        Las conexiones como eran antes de las reglas (para comparar en los benchmarks).
+        """
+        return cls(mismo_dia=True)
+
+    def mct(self, airport: Airport) -> timedelta:
+        return self.mct_de(int(airport.id), str(airport.type))
+
+    def mct_de(self, airport_id: int, tipo: str) -> timedelta:
+        excepcion = self.por_aeropuerto.get(airport_id, {})
+        if "mct" in excepcion:
+            return excepcion["mct"]
+        return self.mct_por_tipo.get(tipo, self.mct_default)
+
+    def escala_maxima_en(self, airport: Airport) -> timedelta:
+        return self.escala_maxima_de(int(airport.id))
+
+    def escala_maxima_de(self, airport_id: int) -> timedelta:
+        return self.por_aeropuerto.get(airport_id, {}).get("escala_maxima", self.escala_maxima)
+
+    def ventana_conexion(self, airport: Airport, llegada: datetime) -> tuple[datetime, datetime]:
+        """
+        `[desde, hasta)` de las salidas de `airport` a las que se puede conectar llegando a las
+        `llegada`.
+        """
+        if self.mismo_dia:
+            dia = datetime(llegada.year, llegada.month, llegada.day)
+            return dia, dia + timedelta(days=1)
+        return llegada + self.mct(airport), llegada + self.escala_maxima_en(airport)
+
+    def conexion_valida(self, airport: Airport, llegada: datetime, salida: datetime) -> bool:
+        desde, hasta = self.ventana_conexion(airport, llegada)
+        return desde <= salida < hasta
+
+
+def ventana_salida(salida_primer_vuelo: datetime) -> tuple[datetime, datetime]:
+    """
+    Ventana del primer vuelo: cualquier salida del día de `salida_primer_vuelo`.
+    """
+    dia = datetime(salida_primer_vuelo.year, salida_primer_vuelo.month, salida_primer_vuelo.day)
+    return dia, dia + timedelta(days=1)
+
+
+def cargar(ruta: str) -> Reglas:
+    with open(ruta) as archivo:
+        config = json.load(archivo)
+
+    def minutos(valor) -> timedelta:
+        return timedelta(minutes=float(valor))
+
+    por_aeropuerto = {}
+    for airport_id, excepcion in config.get("airports", {}).items():
+        por_aeropuerto[int(airport_id)] = {}
+        if "mct_min" in excepcion:
+            por_aeropuerto[int(airport_id)]["mct"] = minutos(excepcion["mct_min"])
+        if "max_layover_min" in excepcion:
+            por_aeropuerto[int(airport_id)]["escala_maxima"] = minutos(excepcion["max_layover_min"])
+
+    return Reglas(
+        mct_por_tipo={
+            **MCT_POR_TIPO,
+            **{tipo: minutos(m) for tipo, m in config.get("mct_min_by_type", {}).items()},
+        },
+        mct_default=minutos(config.get("mct_min_default", MCT_DEFAULT.total_seconds() / 60)),
+        escala_maxima=minutos(config.get("max_layover_min", ESCALA_MAXIMA.total_seconds() / 60)),
+        por_aeropuerto=por_aeropuerto,
+    )
+
+
+_reglas: Reglas | None = None
+
+
+def actuales() -> Reglas:
+    """
+    Las reglas del proceso: las de `IA_VUELOS_RULES_FILE` si está definido, o las de por defecto.
+    """
+    global _reglas
+    if _reglas is None:
+        ruta = os.environ.get("IA_VUELOS_RULES_FILE")
+        _reglas = cargar(ruta) if ruta else Reglas()
+    return _reglas
+
+
+def usar(reglas: Reglas | None) -> None:
+    global _reglas
+    _reglas = reglas
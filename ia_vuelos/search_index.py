@@ -0,0 +1,253 @@
+"""
+Índice en memoria para buscar aeropuertos por texto (autocompletado), sobre `name`, `iata_code`,
+`ident`, `municipality` y `keywords`.
+
+Cada palabra (normalizada: minúsculas, sin acentos) de esos campos es una entrada de un arreglo
+ordenado, así que las palabras que empiezan con un prefijo son un rango contiguo que se encuentra
+con dos búsquedas binarias. Una consulta de varias palabras pide que cada una sea prefijo de alguna
+palabra del aeropuerto. Si una palabra de la consulta no es prefijo de ninguna (p.ej. por un error
+de dedo), se cambia por las palabras del vocabulario con las que comparte más trigramas.
+
+El orden de los resultados toma en cuenta el campo en el que coincide cada palabra (un código IATA
+pesa más que una palabra del nombre), si la coincidencia es exacta o solo de prefijo y el tamaño
+del aeropuerto.
+"""
+
+import unicodedata
+from bisect import bisect_left
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ia_vuelos.sqlalchemy import Airport
+
+COLUMNAS = ("id", "ident", "iata_code", "name", "municipality", "iso_country", "type")
+
+# Peso de una coincidencia (de prefijo) en cada campo; una coincidencia exacta vale el doble
+PESOS = {"iata_code": 8.0, "ident": 6.0, "name": 4.0, "municipality": 3.0, "keywords": 2.0}
+
+# Se suma al puntaje para desempatar entre aeropuertos con las mismas coincidencias
+PESOS_TIPO = {"large_airport": 1.5, "medium_airport": 1.0, "small_airport": 0.5}
+
+# Similitud (Jaccard de trigramas) mínima para corregir una palabra, y cuántas palabras del
+# vocabulario se usan como corrección
+SIMILITUD_MINIMA = 0.3
+CORRECCIONES = 3
+
+
+def normalizar(texto: str | None) -> str:
+    """
+    Minúsculas, sin acentos y con todo lo que no es letra o número como espacio.
+    """
+    if not texto:
+        return ""
+    if not texto.isascii():
+        texto = unicodedata.normalize("NFKD", texto)
+        texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return "".join(c if c.isalnum() else " " for c in texto.lower())
+
+
+def trigramas(texto: str) -> set[str]:
+    """
+    Trigramas de cada palabra de un texto ya normalizado, con un espacio al inicio y al final.
+    """
+    return {f" {palabra} "[i : i + 3] for palabra in texto.split() for i in range(len(palabra) + 1)}
+
+
+class IndiceBusqueda:
+    def __init__(self, filas: list[tuple]) -> None:
+        # filas con `COLUMNAS` más `keywords` al final
+        self.filas = [tuple(fila[: len(COLUMNAS)]) for fila in filas]
+        n = len(filas)
+
+        entradas: list[tuple[str, int, float]] = []
+        base = np.zeros(n, dtype=np.float32)
+        for posicion, fila in enumerate(filas):
+            valores = dict(zip(COLUMNAS + ("keywords",), fila))
+            base[posicion] = PESOS_TIPO.get(valores["type"], 0.0)
+            for campo, peso in PESOS.items():
+                for palabra in set(normalizar(valores[campo]).split()):
+                    entradas.append((palabra, posicion, peso))
+        entradas.sort()
+
+        # palabras distintas (ordenadas); las entradas de `vocabulario[v]` son
+        # `inicios[v]:inicios[v + 1]`
+        self.vocabulario: list[str] = []
+        inicios = []
+        for i, (palabra, _, _) in enumerate(entradas):
+            if not self.vocabulario or self.vocabulario[-1] != palabra:
+                self.vocabulario.append(palabra)
+                inicios.append(i)
+        inicios.append(len(entradas))
+        self.inicios = np.array(inicios, dtype=np.int64)
+        self.posiciones = np.array([p for _, p, _ in entradas], dtype=np.int64)
+        self.pesos = np.array([peso for _, _, peso in entradas], dtype=np.float32)
+        self.base = base
+
+        # trigramas del vocabulario, para corregir palabras
+        inverso: dict[str, list[int]] = {}
+        self.num_trigramas = np.zeros(len(self.vocabulario), dtype=np.float32)
+        for v, palabra in enumerate(self.vocabulario):
+            tris = trigramas(palabra)
+            self.num_trigramas[v] = len(tris)
+            for tri in tris:
+                inverso.setdefault(tri, []).append(v)
+        self.inverso = {tri: np.array(vs, dtype=np.int64) for tri, vs in inverso.items()}
+
+    def __len__(self) -> int:
+        return len(self.filas)
+
+    def _vocablos(self, palabra: str) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Palabras del vocabulario (índices) con las que coincide una palabra de la consulta, y el
+        factor de su peso: 2 si es igual, 1 si es prefijo o la similitud si es una corrección.
+        """
+        primera = bisect_left(self.vocabulario, palabra)
+        ultima = bisect_left(self.vocabulario, palabra + "\U0010ffff", lo=primera)
+        if primera < ultima:
+            factores = np.ones(ultima - primera, dtype=np.float32)
+            if self.vocabulario[primera] == palabra:
+                factores[0] = 2
+            return np.arange(primera, ultima), factores
+        correcciones = self._correcciones(palabra)
+        return (
+            np.array([v for v, _ in correcciones], dtype=np.int64),
+            np.array([similitud for _, similitud in correcciones], dtype=np.float32),
+        )
+
+    def _num_entradas(self, vocablos: np.ndarray) -> int:
+        return int((self.inicios[vocablos + 1] - self.inicios[vocablos]).sum())
+
+    def _puntaje_palabra(self, vocablos: np.ndarray, factores: np.ndarray) -> np.ndarray:
+        """
+        Puntaje de cada aeropuerto para una palabra de la consulta (0 si no coincide con ninguna
+        de sus palabras).
+        """
+        puntajes = np.zeros(len(self.filas), dtype=np.float32)
+        if len(vocablos) == 0:
+            return puntajes
+        if len(vocablos) == 1 or (np.diff(vocablos) == 1).all():
+            # un prefijo: sus palabras son un rango contiguo del vocabulario
+            inicio, fin = self.inicios[vocablos[0]], self.inicios[vocablos[-1] + 1]
+            posiciones = self.posiciones[inicio:fin]
+            pesos = self.pesos[inicio:fin] * np.repeat(
+                factores, self.inicios[vocablos + 1] - self.inicios[vocablos]
+            )
+        else:
+            rangos = [(self.inicios[v], self.inicios[v + 1]) for v in vocablos]
+            posiciones = np.concatenate([self.posiciones[i:f] for i, f in rangos])
+            pesos = np.concatenate([self.pesos[i:f] * f_ for (i, f), f_ in zip(rangos, factores)])
+        # con varias palabras que coinciden en un aeropuerto, cuenta la de más peso
+        np.maximum.at(puntajes, posiciones, pesos)
+        return puntajes
+
+    def _puntaje_en(
+        self, vocablos: np.ndarray, factores: np.ndarray, candidatos: np.ndarray
+    ) -> np.ndarray:
+        """
+        Puntaje de una palabra de la consulta solo para los `candidatos` (posiciones ordenadas),
+        con una búsqueda binaria por cada palabra del vocabulario con la que coincide.
+        """
+        puntajes = np.zeros(len(candidatos), dtype=np.float32)
+        for v, factor in zip(vocablos, factores):
+            inicio, fin = self.inicios[v], self.inicios[v + 1]
+            posiciones = self.posiciones[inicio:fin]
+            # las entradas de una palabra están ordenadas por aeropuerto y peso: la última de cada
+            # aeropuerto es la de más peso
+            i = np.searchsorted(posiciones, candidatos, side="right") - 1
+            coinciden = (i >= 0) & (posiciones[i] == candidatos)
+            pesos = np.where(coinciden, self.pesos[inicio + i] * factor, 0)
+            np.maximum(puntajes, pesos, out=puntajes)
+        return puntajes
+
+    def _correcciones(self, palabra: str) -> list[tuple[int, float]]:
+        """
+        Palabras del vocabulario (índice y similitud) más parecidas a `palabra` por sus trigramas.
+        """
+        tris = trigramas(palabra)
+        listas = [self.inverso[tri] for tri in tris if tri in self.inverso]
+        if not listas:
+            return []
+        candidatos, compartidos = np.unique(np.concatenate(listas), return_counts=True)
+        similitud = compartidos / (len(tris) + self.num_trigramas[candidatos] - compartidos)
+        parecidos = np.flatnonzero(similitud >= SIMILITUD_MINIMA)
+        mejores = parecidos[np.argsort(-similitud[parecidos], kind="stable")[:CORRECCIONES]]
+        return [(int(candidatos[i]), float(similitud[i])) for i in mejores]
+
+    def _por_prefijo(self, palabras: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Aeropuertos (posiciones) que coinciden con todas las palabras, y su puntaje.
+        """
+        # de la palabra con menos entradas a la de más: la primera da los candidatos y las demás
+        # solo se evalúan sobre los que quedan
+        por_palabra = sorted(
+            (self._vocablos(palabra) for palabra in palabras),
+            key=lambda vocablos_factores: self._num_entradas(vocablos_factores[0]),
+        )
+        vocablos, factores = por_palabra[0]
+        puntajes = self._puntaje_palabra(vocablos, factores)
+        candidatos = np.flatnonzero(puntajes > 0)
+        total = puntajes[candidatos]
+        for vocablos, factores in por_palabra[1:]:
+            if len(candidatos) == 0:
+                break
+            # una búsqueda binaria por palabra del vocabulario cuesta como recorrer ~1000 entradas
+            if len(vocablos) * (len(candidatos) + 1000) < self._num_entradas(vocablos):
+                puntajes = self._puntaje_en(vocablos, factores, candidatos)
+            else:
+                puntajes = self._puntaje_palabra(vocablos, factores)[candidatos]
+            # todas las palabras de la consulta deben coincidir
+            coinciden = puntajes > 0
+            candidatos, total = candidatos[coinciden], total[coinciden] + puntajes[coinciden]
+        return candidatos, total
+
+    def buscar(self, consulta: str, k: int = 10) -> list[tuple[int, float]]:
+        """
+        Los `k` mejores resultados como `(posición, puntaje)`, del mejor al peor.
+        """
+        consulta = normalizar(consulta)
+        palabras = consulta.split()
+        if not palabras or k <= 0:
+            return []
+
+        encontrados, puntajes = self._por_prefijo(palabras)
+        return _mejores(encontrados, puntajes + self.base[encontrados], k)
+
+    def a_dicts(self, resultados: list[tuple[int, float]]) -> list[dict]:
+        return [dict(zip(COLUMNAS, self.filas[posicion])) for posicion, _ in resultados]
+
+
+def _mejores(posiciones: np.ndarray, puntajes: np.ndarray, k: int) -> list[tuple[int, float]]:
+    if len(posiciones) > k:
+        mejores = np.argpartition(-puntajes, k - 1)[:k]
+        posiciones, puntajes = posiciones[mejores], puntajes[mejores]
+    orden = np.argsort(-puntajes, kind="stable")
+    return [(int(posiciones[i]), float(puntajes[i])) for i in orden]
+
+
+def construir_desde_db(session: Session, solo_con_vuelos: bool = False) -> IndiceBusqueda:
+    """
+    Índice sobre la tabla `airports`; con `solo_con_vuelos` solo sobre los aeropuertos medianos y
+    grandes con servicio regular.
+    """
+    consulta = select(*(getattr(Airport, columna) for columna in COLUMNAS), Airport.keywords)
+    if solo_con_vuelos:
+        consulta = consulta.where(
+            Airport.type.in_(("medium_airport", "large_airport")),
+            Airport.scheduled_service.is_(True),
+        )
+    return IndiceBusqueda([tuple(fila) for fila in session.execute(consulta)])
+
+
+_indices: dict[bool, IndiceBusqueda] = {}
+
+
+def indice_aeropuertos(session: Session, solo_con_vuelos: bool = False) -> IndiceBusqueda:
+    """
+    Índice del proceso. `app.py` construye los dos al arrancar; si entonces falló (p.ej. sin base),
+    se construye la primera vez que se pide.
+    """
+    if solo_con_vuelos not in _indices:
+        _indices[solo_con_vuelos] = construir_desde_db(session, solo_con_vuelos)
+    return _indices[solo_con_vuelos]
@@ -0,0 +1,201 @@
+"""
+Índice espacial en memoria de los aeropuertos, para buscar los más cercanos a una coordenada
+(k vecinos) o todos los que están dentro de un radio.
+
+Los aeropuertos se agrupan en una rejilla de celdas de `TAMANIO_CELDA_DEG` grados, ordenados por
+celda (fila por fila), así que las celdas de una franja de latitud son un rango contiguo de los
+arreglos. Una consulta por radio junta las celdas que cubre el casquete esférico y calcula las
+distancias exactas (sobre vectores en la esfera unitaria) solo para esos candidatos; la de k
+vecinos repite la de radio duplicando el radio hasta tener k resultados.
+"""
+
+import math
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ia_vuelos.distances import RADIO_TIERRA_KM
+from ia_vuelos.sqlalchemy import Airport
+
+TAMANIO_CELDA_DEG = 1.0
+
+# Radio inicial (km) de la búsqueda de k vecinos
+_RADIO_INICIAL_KM = 50.0
+
+# columnas de `IndiceEspacial.filas` cuando el índice se construye desde la base
+COLUMNAS = (
+    "id",
+    "latitude_deg",
+    "longitude_deg",
+    "ident",
+    "name",
+    "type",
+    "iso_country",
+    "municipality",
+)
+
+
+def vectores_unitarios(lat_deg: np.ndarray, lon_deg: np.ndarray) -> np.ndarray:
+    """
+    Coordenadas en la esfera unitaria (n x 3, float64).
+    """
+    lat = np.radians(np.asarray(lat_deg, dtype=np.float64))
+    lon = np.radians(np.asarray(lon_deg, dtype=np.float64))
+    return np.stack((np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)), axis=-1)
+
+
+class IndiceEspacial:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        lat_deg: np.ndarray,
+        lon_deg: np.ndarray,
+        filas: list[tuple] | None = None,
+        tamanio_celda: float = TAMANIO_CELDA_DEG,
+    ) -> None:
+        lat_deg = np.asarray(lat_deg, dtype=np.float64)
+        lon_deg = np.asarray(lon_deg, dtype=np.float64)
+        self.tamanio_celda = tamanio_celda
+        self.filas_rejilla = int(math.ceil(180 / tamanio_celda))
+        self.columnas_rejilla = int(math.ceil(360 / tamanio_celda))
+
+        celdas = self._celda_fila(lat_deg) * self.columnas_rejilla + self._celda_columna(lon_deg)
+        orden = np.argsort(celdas, kind="stable")
+        self.ids = np.asarray(ids)[orden]
+        self.lat = lat_deg[orden]
+        self.lon = lon_deg[orden]
+        self.xyz = vectores_unitarios(self.lat, self.lon)
+        # datos extra de cada aeropuerto, en el mismo orden que `ids`
+        self.filas = [filas[i] for i in orden] if filas is not None else None
+        # offsets[c]:offsets[c + 1] son los aeropuertos de la celda c
+        self.offsets = np.searchsorted(
+            celdas[orden], np.arange(self.filas_rejilla * self.columnas_rejilla + 1)
+        )
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _celda_fila(self, lat_deg: np.ndarray) -> np.ndarray:
+        fila = np.floor((lat_deg + 90) / self.tamanio_celda).astype(np.int64)
+        return np.clip(fila, 0, self.filas_rejilla - 1)
+
+    def _celda_columna(self, lon_deg: np.ndarray) -> np.ndarray:
+        columna = np.floor(((lon_deg + 180) % 360) / self.tamanio_celda).astype(np.int64)
+        return np.clip(columna, 0, self.columnas_rejilla - 1)
+
+    def _candidatos(self, lat: float, lon: float, radio_km: float) -> np.ndarray:
+        """
+        Posiciones de los aeropuertos en las celdas que cubren el casquete de `radio_km`.
+        """
+        angulo = radio_km / RADIO_TIERRA_KM
+        if angulo >= math.pi:
+            return np.arange(len(self.ids))
+
+        angulo_deg = math.degrees(angulo)
+        lat_min, lat_max = lat - angulo_deg, lat + angulo_deg
+        fila_min = int(self._celda_fila(np.array(max(lat_min, -90.0))))
+        fila_max = int(self._celda_fila(np.array(min(lat_max, 90.0))))
+
+        # ancho en longitud del casquete; si toca un polo se cubren todas las longitudes
+        cos_lat = math.cos(math.radians(lat))
+        if lat_min <= -90 or lat_max >= 90 or math.sin(angulo) >= cos_lat:
+            rangos_columnas = [(0, self.columnas_rejilla - 1)]
+        else:
+            delta_lon = math.degrees(math.asin(math.sin(angulo) / cos_lat))
+            if 2 * delta_lon >= 360 - self.tamanio_celda:
+                rangos_columnas = [(0, self.columnas_rejilla - 1)]
+            else:
+                col_min = int(self._celda_columna(np.array(lon - delta_lon)))
+                col_max = int(self._celda_columna(np.array(lon + delta_lon)))
+                if col_min <= col_max:
+                    rangos_columnas = [(col_min, col_max)]
+                else:
+                    # cruza el antimeridiano
+                    rangos_columnas = [(col_min, self.columnas_rejilla - 1), (0, col_max)]
+
+        rebanadas = []
+        for fila in range(fila_min, fila_max + 1):
+            base = fila * self.columnas_rejilla
+            for col_min, col_max in rangos_columnas:
+                inicio, fin = self.offsets[base + col_min], self.offsets[base + col_max + 1]
+                if inicio < fin:
+                    rebanadas.append(np.arange(inicio, fin))
+        if not rebanadas:
+            return np.empty(0, dtype=np.int64)
+        return np.concatenate(rebanadas)
+
+    def _distancias_km(self, posiciones: np.ndarray, lat: float, lon: float) -> np.ndarray:
+        # ángulo central a partir de la cuerda, estable también para distancias pequeñas
+        cuerda = np.linalg.norm(self.xyz[posiciones] - vectores_unitarios(lat, lon), axis=1)
+        return 2 * RADIO_TIERRA_KM * np.arcsin(np.clip(cuerda / 2, 0, 1))
+
+    def en_radio(self, lat: float, lon: float, radio_km: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Posiciones (en el índice) y distancias de los aeropuertos a menos de `radio_km`, de la más
+        cercana a la más lejana.
+        """
+        posiciones = self._candidatos(lat, lon, radio_km)
+        distancias = self._distancias_km(posiciones, lat, lon)
+        dentro = distancias <= radio_km
+        posiciones, distancias = posiciones[dentro], distancias[dentro]
+        orden = np.argsort(distancias, kind="stable")
+        return posiciones[orden], distancias[orden]
+
+    def a_dicts(self, posiciones: np.ndarray, distancias: np.ndarray) -> list[dict]:
+        """
+        Resultados de una consulta como diccionarios (`COLUMNAS` más `distance_km`).
+        """
+        filas = self.filas or []
+        return [
+            dict(zip(COLUMNAS, filas[i]), distance_km=round(float(distancia), 3))
+            for i, distancia in zip(posiciones, distancias)
+        ]
+
+    def cercanos(
+        self, lat: float, lon: float, k: int, radio_max_km: float | None = None
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Posiciones y distancias de los `k` aeropuertos más cercanos (opcionalmente, solo los que
+        están a menos de `radio_max_km`).
+        """
+        limite = radio_max_km if radio_max_km is not None else math.pi * RADIO_TIERRA_KM
+        radio = min(_RADIO_INICIAL_KM, limite)
+        while True:
+            posiciones, distancias = self.en_radio(lat, lon, radio)
+            # todos los que están dentro del radio ya son exactos: si hay k, son los k más cercanos
+            if len(posiciones) >= k or radio >= limite:
+                return posiciones[:k], distancias[:k]
+            radio = min(radio * 2, limite)
+
+
+def construir_desde_db(session: Session, solo_con_vuelos: bool = False) -> IndiceEspacial:
+    """
+    Índice sobre la tabla `airports`; con `solo_con_vuelos` solo sobre los aeropuertos medianos y
+    grandes con servicio regular (los que tienen vuelos).
+    """
+    consulta = select(*(getattr(Airport, columna) for columna in COLUMNAS)).where(
+        Airport.latitude_deg.is_not(None), Airport.longitude_deg.is_not(None)
+    )
+    if solo_con_vuelos:
+        consulta = consulta.where(
+            Airport.type.in_(("medium_airport", "large_airport")),
+            Airport.scheduled_service.is_(True),
+        )
+    filas = session.execute(consulta).fetchall()
+    if not filas:
+        return IndiceEspacial(np.empty(0, dtype=np.int64), np.empty(0), np.empty(0), [])
+    ids, lat, lon = (np.array(columna) for columna in list(zip(*filas))[:3])
+    return IndiceEspacial(ids, lat, lon, [tuple(fila) for fila in filas])
+
+
+_indices: dict[bool, IndiceEspacial] = {}
+
+
+def indice_aeropuertos(session: Session, solo_con_vuelos: bool = False) -> IndiceEspacial:
+    """
+    Índice del proceso; se construye la primera vez que se pide.
+    """
+    if solo_con_vuelos not in _indices:
+        _indices[solo_con_vuelos] = construir_desde_db(session, solo_con_vuelos)
+    return _indices[solo_con_vuelos]
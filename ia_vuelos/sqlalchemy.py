@@ -2,7 +2,6 @@ from __future__ import annotations
 
 from datetime import datetime, timedelta
 
-from geopy.distance import geodesic
 from sqlalchemy import (
     Boolean,
     Column,
@@ -10,6 +9,7 @@ from sqlalchemy import (
     Double,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
@@ -17,6 +17,8 @@ from sqlalchemy import (
 )
 from sqlalchemy.orm import DeclarativeBase, Session, relationship
 
+from ia_vuelos import distances
+
 
 # Define the base class
 class Base(DeclarativeBase):
@@ -25,6 +27,15 @@ class Base(DeclarativeBase):
 
 class Flight(Base):
     __tablename__ = "flights"
+    # próximas salidas de un par de aeropuertos (`ia_vuelos.direct_flights`)
+    __table_args__ = (
+        Index(
+            "ix_flights_route_departure",
+            "departure_airport_id",
+            "arrival_airport_id",
+            "departure_time",
+        ),
+    )
 
     flight_id = Column(String(11), primary_key=True)
     model = Column(String(50))
@@ -185,11 +196,14 @@ Airport:
         self,
         session: Session,
         start_date: datetime,  # pyright: ignore [reportRedeclaration]
+        end_date: datetime | None = None,
     ) -> list[tuple[Flight, Airport]]:
         # dates available from 2024-01-01 to 2024-02-01
 
-        start_date: datetime = datetime(start_date.year, start_date.month, start_date.day)
-        end_date = start_date + timedelta(days=1)
+        # without end_date, every flight on the calendar day of start_date
+        if end_date is None:
+            start_date: datetime = datetime(start_date.year, start_date.month, start_date.day)
+            end_date = start_date + timedelta(days=1)
 
         # Query for flights (and the destination airpor) departing from the
         # specified airport on the specified date
@@ -212,6 +226,15 @@ Airport:
         return flights
 
     def calc_distance_airports(self, airport2: Airport) -> float:
+        # precalculated distance matrix (see ia_vuelos/distances.py), if one is loaded
+        matriz = distances.actual()
+        if matriz is not None:
+            distancia = matriz.distancia(int(self.id), int(airport2.id))
+            if distancia is not None:
+                return distancia
+        # imported here so that loading the models doesn't pay for geopy
+        from geopy.distance import geodesic
+
         return float(
             geodesic(
                 (self.latitude_deg, self.longitude_deg),
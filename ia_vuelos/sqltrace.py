@@ -0,0 +1,186 @@
+"""
+Trazas de las consultas SQL, usando los eventos del engine de SQLAlchemy.
+
+Cada sentencia se atribuye a la petición (endpoint) y a la fase de la búsqueda (ver
+`ia_vuelos.metrics.fase`) que la emitió, y se agrupa por su forma normalizada (sin literales ni
+parámetros). Si dentro de una misma petición una sentencia normalizada se repite al menos
+`umbral_n_mas_1` veces, se marca como patrón N+1: por ejemplo las consultas repetidas de
+`get_neighboring_flights` o las cargas perezosas de `Airport.country`/`Airport.region`.
+
+Para las pruebas, `esperar_consultas` falla si un bloque emite más consultas de las esperadas y
+`consultas_endpoint` cuenta las consultas de una petición hecha con el cliente de pruebas de Flask.
+"""
+
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Iterator
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import ORMExecuteState, Session
+
+from ia_vuelos import metrics
+
+_RE_ESPACIOS = re.compile(r"\s+")
+_RE_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_RE_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_RE_PARAMETROS = re.compile(r"%\(\w+\)s|%s|:\w+|\?")
+_RE_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+# Fase "perezosa": se marca cuando el ORM carga una relación (lazy load)
+_carga_perezosa: ContextVar[str | None] = ContextVar("ia_vuelos_carga_perezosa", default=None)
+# Conteo de sentencias normalizadas de la petición en curso
+_peticion: ContextVar[Counter | None] = ContextVar("ia_vuelos_sql_peticion", default=None)
+_endpoint: ContextVar[str] = ContextVar("ia_vuelos_sql_endpoint", default="")
+
+
+def normalizar(sentencia: str) -> str:
+    """
+    Forma normalizada de una sentencia: sin literales, con los parámetros como `?` y las listas
+    `IN (?, ?, ...)` colapsadas a `IN (?)`.
+    """
+    sentencia = _RE_CADENAS.sub("?", sentencia)
+    sentencia = _RE_PARAMETROS.sub("?", sentencia)
+    sentencia = _RE_NUMEROS.sub("?", sentencia)
+    sentencia = _RE_LISTAS.sub("(?)", sentencia)
+    return _RE_ESPACIOS.sub(" ", sentencia).strip()
+
+
+class Trazador:
+    """
+    Se instala sobre un engine (`trazador.instalar(engine)`) y acumula, por
+    `(endpoint, fase, sentencia normalizada)`, el número de ejecuciones y su tiempo total.
+    """
+
+    def __init__(self, umbral_n_mas_1: int = 10) -> None:
+        self.umbral_n_mas_1 = umbral_n_mas_1
+        self._lock = threading.Lock()
+        # {(endpoint, fase, sentencia): [ejecuciones, segundos]}
+        self.sentencias: dict[tuple[str, str, str], list[float]] = {}
+        # {(endpoint, sentencia): peticiones en las que se detectó N+1}
+        self.n_mas_1: Counter = Counter()
+
+    def instalar(self, engine: Engine) -> None:
+        # la atribución por fase se apoya en el rastreo de fases de las métricas
+        metrics.habilitar()
+        event.listen(engine, "before_cursor_execute", self._antes)
+        event.listen(engine, "after_cursor_execute", self._despues)
+        event.listen(engine, "handle_error", self._error)
+        event.listen(Session, "do_orm_execute", _marcar_carga_perezosa)
+
+    def _antes(self, conn, _cursor, sentencia, _parametros, _contexto, _executemany) -> None:
+        # una carga perezosa emite una sola sentencia, así que la marca se consume aquí
+        fase = _carga_perezosa.get() or metrics.fase_actual() or ""
+        _carga_perezosa.set(None)
+        conn.info.setdefault("ia_vuelos_inicio", []).append((time.perf_counter(), fase))
+
+    def _despues(self, conn, _cursor, sentencia, _parametros, _contexto, _executemany) -> None:
+        inicio, fase = conn.info["ia_vuelos_inicio"].pop()
+        duracion = time.perf_counter() - inicio
+        normalizada = normalizar(sentencia)
+        llave = (_endpoint.get(), fase, normalizada)
+        with self._lock:
+            acumulado = self.sentencias.setdefault(llave, [0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += duracion
+        conteo = _peticion.get()
+        if conteo is not None:
+            conteo[normalizada] += 1
+
+    def _error(self, contexto) -> None:
+        # si la sentencia falla no hay `after_cursor_execute`
+        if contexto.connection is not None and contexto.connection.info.get("ia_vuelos_inicio"):
+            contexto.connection.info["ia_vuelos_inicio"].pop()
+
+    def iniciar_peticion(self, endpoint: str) -> object:
+        return (_peticion.set(Counter()), _endpoint.set(endpoint))
+
+    def terminar_peticion(self, token: object) -> list[tuple[str, int]]:
+        """
+        Se cierra la petición y se regresan las sentencias marcadas como N+1 (con sus
+        repeticiones).
+        """
+        token_peticion, token_endpoint = token  # pyright: ignore [reportGeneralTypeIssues]
+        conteo = _peticion.get() or Counter()
+        endpoint = _endpoint.get()
+        _peticion.reset(token_peticion)
+        _endpoint.reset(token_endpoint)
+
+        sospechosas = [(s, n) for s, n in conteo.most_common() if n >= self.umbral_n_mas_1]
+        with self._lock:
+            for sentencia, _ in sospechosas:
+                self.n_mas_1[(endpoint, sentencia)] += 1
+        return sospechosas
+
+    def reporte(self) -> dict:
+        with self._lock:
+            sentencias = sorted(self.sentencias.items(), key=lambda x: x[1][1], reverse=True)
+            n_mas_1 = self.n_mas_1.most_common()
+        return {
+            "sentencias": [
+                {
+                    "endpoint": endpoint,
+                    "fase": fase,
+                    "sentencia": sentencia,
+                    "ejecuciones": int(ejecuciones),
+                    "segundos": round(segundos, 6),
+                }
+                for (endpoint, fase, sentencia), (ejecuciones, segundos) in sentencias
+            ],
+            "n_mas_1": [
+                {"endpoint": endpoint, "sentencia": sentencia, "peticiones": peticiones}
+                for (endpoint, sentencia), peticiones in n_mas_1
+            ],
+        }
+
+
+def _marcar_carga_perezosa(estado: ORMExecuteState) -> None:
+    if estado.is_relationship_load and estado.lazy_loaded_from is not None:
+        _carga_perezosa.set(f"lazy_load:{estado.lazy_loaded_from.class_.__name__}")
+
+
+@contextmanager
+def contar_consultas(engine: Engine) -> Iterator[list[str]]:
+    """
+    Se regresan (en una lista que se va llenando) las sentencias ejecutadas dentro del bloque.
+    """
+    sentencias: list[str] = []
+
+    def _antes(_conn, _cursor, sentencia, *_args) -> None:
+        sentencias.append(sentencia)
+
+    event.listen(engine, "before_cursor_execute", _antes)
+    try:
+        yield sentencias
+    finally:
+        event.remove(engine, "before_cursor_execute", _antes)
+
+
+@contextmanager
+def esperar_consultas(engine: Engine, maximo: int) -> Iterator[list[str]]:
+    """
+    Falla (`AssertionError`) si el bloque ejecuta más de `maximo` consultas.
+    """
+    with contar_consultas(engine) as sentencias:
+        yield sentencias
+    if len(sentencias) > maximo:
+        resumen = "\n".join(
+            f"  {n}x {s}" for s, n in Counter(map(normalizar, sentencias)).most_common()
+        )
+        raise AssertionError(
+            f"{len(sentencias)} consultas, se esperaban máximo {maximo}:\n{resumen}"
+        )
+
+
+def consultas_endpoint(cliente, engine: Engine, url: str) -> int:
+    """
+    Número de consultas que emite una petición `GET` al `url` (`cliente` es
+    `app.test_client()`).
+    """
+    with contar_consultas(engine) as sentencias:
+        cliente.get(url)
+    return len(sentencias)
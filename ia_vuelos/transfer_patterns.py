@@ -0,0 +1,442 @@
+"""
+Patrones de transbordo (transfer patterns) precalculados sobre el horario en memoria.
+
+Un patrón de `A` a `B` es la secuencia de aeropuertos de escala de un itinerario óptimo, p.ej.
+`A → MEX → B`. Como el horario es fijo durante el mes, se calculan fuera de línea, para cada
+aeropuerto de origen y cada día, los itinerarios de menor costo con 1, 2, ..., `MAX_TRAMOS` vuelos
+(los Pareto-óptimos en costo y número de vuelos), y se guardan sus secuencias de escalas sin
+repetir. El costo es el mismo que minimiza `a_star`: de la llegada del primer vuelo a la del
+último. Al consultar solo se evalúan esos pocos patrones contra el horario, con todos los vuelos
+de cada tramo, en vez de explorar el grafo.
+
+El cálculo por origen es por rondas, como RAPTOR: en la ronda `k` se revisan, con operaciones
+vectorizadas de NumPy, las salidas de los aeropuertos que mejoraron en la ronda `k - 1` dentro de
+su ventana de conexión (`ia_vuelos.rules`), para cada primer vuelo del día. Los orígenes se
+reparten entre procesos.
+
+Formato en disco (un directorio con archivos `.npy`, que se abren con mmap):
+- `ids.npy`: ids de los aeropuertos, los mismos y en el mismo orden que `Horario.ids`.
+- `offsets.npy`: los patrones del origen `i` son las filas `offsets[i]:offsets[i + 1]`.
+- `patrones.npy`: una fila por patrón, `[destino, escala_1, ..., escala_{MAX_TRAMOS - 1}]` (con
+  -1 de relleno), ordenadas por destino dentro de cada origen; `int16` si caben.
+- `mct_us.npy` y `escala_us.npy`: las reglas de conexión con las que se calcularon.
+- `huella.npy` y `formato.npy`: la huella del horario con el que se calcularon (`graph.huella`) y
+  la versión del formato (`FORMATO`).
+
+Solo se cargan si el formato, la huella y las reglas de conexión son los del proceso: con otro
+horario (p.ej. el del mes siguiente, con los mismos aeropuertos) o con otras reglas podrían faltar
+los patrones de los mejores itinerarios.
+
+```sh
+python3 scripts/build_transfer_patterns.py  # escribe data/transfer_patterns/
+```
+"""
+
+import multiprocessing
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ia_vuelos import direct_flights, rules
+from ia_vuelos.graph import Horario, a_microsegundos, huella
+from ia_vuelos.rules import Reglas
+from ia_vuelos.sqlalchemy import Airport
+
+MAX_TRAMOS = 4
+# 2: patrones con el costo de `a_star` (el 1 era el de llegada más temprana, sin huella)
+FORMATO = 2
+
+DIRECTORIO_DEFAULT = os.environ.get("IA_VUELOS_TRANSFER_PATTERNS_DIR", "data/transfer_patterns")
+
+_DIA_US = 86_400 * 1_000_000
+_INFINITO = np.iinfo(np.int64).max
+# la llave de búsqueda de las salidas es `origen << _BITS_HORA | hora`
+_BITS_HORA = 44
+_ARREGLOS = ("ids", "offsets", "patrones", "mct_us", "escala_us", "huella", "formato")
+
+
+def limites_conexion(session: Session, horario: Horario, reglas: Reglas) -> tuple:
+    """
+    MCT y escala máxima (µs) de cada aeropuerto del horario.
+    """
+    tipos = dict(session.execute(select(Airport.id, Airport.type)).tuples().all())
+    mct = [reglas.mct_de(int(i), str(tipos.get(int(i)))) for i in horario.ids]
+    escala = [reglas.escala_maxima_de(int(i)) for i in horario.ids]
+    por_us = timedelta(microseconds=1)
+    return (
+        np.array([m // por_us for m in mct], dtype=np.int64),
+        np.array([e // por_us for e in escala], dtype=np.int64),
+    )
+
+
+class _Rondas:
+    """
+    Datos compartidos (después del fork) por los procesos que calculan los patrones.
+    """
+
+    def __init__(self, horario: Horario, mct_us: np.ndarray, escala_us: np.ndarray) -> None:
+        self.horario = horario
+        self.mct_us = mct_us
+        self.escala_us = escala_us
+        self.n = len(horario.ids)
+        self.origen_vuelo = np.repeat(np.arange(self.n), np.diff(horario.offsets))
+        self.base = int(horario.salida.min()) if len(horario) else 0
+        assert self.n < 2 ** (63 - _BITS_HORA), "demasiados aeropuertos para la llave"
+        # ordenada, porque los vuelos están ordenados por (origen, salida)
+        self.llave = (self.origen_vuelo << _BITS_HORA) | (horario.salida - self.base)
+
+    def _llaves(self, aeropuertos: np.ndarray, horas: np.ndarray) -> np.ndarray:
+        horas = np.clip(horas - self.base, 0, (1 << _BITS_HORA) - 1)
+        return (aeropuertos.astype(np.int64) << _BITS_HORA) | horas
+
+    def salidas(
+        self, aeropuertos: np.ndarray, desde: np.ndarray, hasta: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Posiciones de todas las salidas de `aeropuertos[j]` en `[desde[j], hasta[j])`, junto con
+        el `j` de cada una.
+        """
+        inicio = np.searchsorted(self.llave, self._llaves(aeropuertos, desde))
+        fin = np.searchsorted(self.llave, self._llaves(aeropuertos, hasta))
+        tamanios = np.maximum(fin - inicio, 0)
+        total = int(tamanios.sum())
+        if total == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        # inicio[j], inicio[j] + 1, ..., fin[j] - 1 para cada j, concatenados
+        saltos = np.repeat(inicio - np.cumsum(tamanios) + tamanios, tamanios)
+        return saltos + np.arange(total), np.repeat(np.arange(len(aeropuertos)), tamanios)
+
+    def patrones_dia(self, origen: int, dia_us: int) -> np.ndarray:
+        """
+        Patrones (filas `[destino, escalas...]`) de los itinerarios de menor costo con 1, 2, ...,
+        `MAX_TRAMOS` vuelos saliendo de `origen` el día `dia_us`.
+
+        El costo es el de `a_star`: de la llegada del primer vuelo a la del último. Como depende
+        del primer vuelo, las rondas se hacen a la vez para todos los primeros vuelos del día,
+        con la llegada más temprana a cada par `(primer vuelo, aeropuerto)`; el costo a un destino
+        es el mínimo, sobre los primeros vuelos, de esa llegada menos la del primer vuelo.
+        """
+        horario = self.horario
+        primeros, _ = self.salidas(
+            np.array([origen]), np.array([dia_us]), np.array([dia_us + _DIA_US])
+        )
+        primeros = primeros[horario.destino[primeros] != origen]
+        if len(primeros) == 0:
+            return np.empty((0, MAX_TRAMOS), dtype=np.int32)
+        llegada_primero = horario.llegada[primeros]
+        mejor = np.full((len(primeros), self.n), _INFINITO, dtype=np.int64)
+        # el menor costo a cada destino en las rondas anteriores
+        menor = np.full(self.n, _INFINITO, dtype=np.int64)
+        padres: list[np.ndarray] = []
+        filas = []
+
+        # en la primera ronda, cada primer vuelo llega a su destino
+        primero = np.arange(len(primeros))
+        posiciones = primeros
+        for ronda in range(1, MAX_TRAMOS + 1):
+            if ronda > 1:
+                posiciones, consulta = self.salidas(marcados, desde, hasta)
+                primero = primero[consulta]
+                no_regresan = horario.destino[posiciones] != origen
+                posiciones, primero = posiciones[no_regresan], primero[no_regresan]
+                if len(posiciones) == 0:
+                    break
+            destinos = horario.destino[posiciones]
+            llegadas = horario.llegada[posiciones]
+
+            # la llegada más temprana a cada par (primer vuelo, destino) en esta ronda
+            celdas = primero * self.n + destinos
+            orden = np.lexsort((llegadas, celdas))
+            celdas, llegadas, posiciones = celdas[orden], llegadas[orden], posiciones[orden]
+            unicos = np.r_[True, celdas[1:] != celdas[:-1]]
+            celdas, llegadas, posiciones = celdas[unicos], llegadas[unicos], posiciones[unicos]
+            mejoran = llegadas < mejor.ravel()[celdas]
+            if not mejoran.any():
+                break
+            primero, marcados = np.divmod(celdas[mejoran], self.n)
+            mejor[primero, marcados] = llegadas[mejoran]
+            padre = np.full(mejor.shape, -1, dtype=np.int64)
+            padre[primero, marcados] = posiciones[mejoran]
+            padres.append(padre)
+
+            # los destinos cuyo costo mejoró con esta ronda, y con qué primer vuelo
+            columnas = np.unique(marcados)
+            costos = mejor[:, columnas] - llegada_primero[:, None]
+            costos[mejor[:, columnas] == _INFINITO] = _INFINITO
+            elegidos = np.argmin(costos, axis=0)
+            minimos = costos[elegidos, np.arange(len(columnas))]
+            nuevos = minimos < menor[columnas]
+            columnas, elegidos = columnas[nuevos], elegidos[nuevos]
+            menor[columnas] = minimos[nuevos]
+
+            # escalas de cada itinerario que mejoró, de la última hacia atrás
+            fila = np.full((len(columnas), MAX_TRAMOS), -1, dtype=np.int32)
+            fila[:, 0] = columnas
+            nodo = columnas
+            for anterior in range(ronda - 1, 0, -1):
+                nodo = self.origen_vuelo[padres[anterior][elegidos, nodo]]
+                fila[:, anterior] = nodo
+            filas.append(fila)
+
+            desde = llegadas[mejoran] + self.mct_us[marcados]
+            hasta = llegadas[mejoran] + self.escala_us[marcados]
+
+        if not filas:
+            return np.empty((0, MAX_TRAMOS), dtype=np.int32)
+        return np.concatenate(filas)
+
+    def patrones_origen(self, origen: int) -> np.ndarray:
+        inicio, fin = self.horario.offsets[origen], self.horario.offsets[origen + 1]
+        dias = np.unique(self.horario.salida[inicio:fin] // _DIA_US)
+        filas = [self.patrones_dia(origen, int(dia) * _DIA_US) for dia in dias]
+        if not filas:
+            return np.empty((0, MAX_TRAMOS), dtype=np.int32)
+        return np.unique(np.concatenate(filas), axis=0)
+
+
+_rondas: _Rondas | None = None
+
+
+def _patrones_origen(origen: int) -> np.ndarray:
+    return _rondas.patrones_origen(origen)  # pyright: ignore [reportOptionalMemberAccess]
+
+
+class PatronesTransbordo:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        offsets: np.ndarray,
+        patrones: np.ndarray,
+        mct_us: np.ndarray,
+        escala_us: np.ndarray,
+        huella: np.ndarray,
+        formato: np.ndarray,
+    ) -> None:
+        self.ids = ids
+        self.offsets = offsets
+        self.patrones = patrones
+        self.mct_us = mct_us
+        self.escala_us = escala_us
+        self.huella = huella
+        self.formato = formato
+        # las reglas contra las que se revisaron al cargarlos (`cargar_global`); si ya no son las
+        # del proceso, no se usan
+        self.reglas: Reglas | None = None
+
+    def __len__(self) -> int:
+        return len(self.patrones)
+
+    def nbytes(self) -> int:
+        return sum(
+            arreglo.nbytes
+            for arreglo in (self.ids, self.offsets, self.patrones, self.mct_us, self.escala_us)
+        )
+
+    def de(self, origen: int, destino: int) -> list[list[int]]:
+        """
+        Secuencias de escalas (posiciones en `ids`) de `origen` a `destino`; lista vacía si no hay
+        ningún itinerario entre ellos.
+        """
+        inicio, fin = int(self.offsets[origen]), int(self.offsets[origen + 1])
+        columna = self.patrones[inicio:fin, 0]
+        primero = inicio + int(np.searchsorted(columna, destino, side="left"))
+        ultimo = inicio + int(np.searchsorted(columna, destino, side="right"))
+        return [[int(h) for h in fila[1:] if h >= 0] for fila in self.patrones[primero:ultimo]]
+
+    def guardar(self, directorio: str) -> None:
+        os.makedirs(directorio, exist_ok=True)
+        for nombre in _ARREGLOS:
+            np.save(os.path.join(directorio, f"{nombre}.npy"), getattr(self, nombre))
+
+    @classmethod
+    def cargar(cls, directorio: str) -> "PatronesTransbordo":
+        return cls(
+            *(
+                np.load(os.path.join(directorio, f"{nombre}.npy"), mmap_mode="r")
+                for nombre in _ARREGLOS
+            )
+        )
+
+
+def construir(
+    horario: Horario, mct_us: np.ndarray, escala_us: np.ndarray, procesos: int | None = None
+) -> PatronesTransbordo:
+    """
+    Se calculan los patrones de todos los orígenes, repartidos entre `procesos` (por defecto, uno
+    por núcleo). Los procesos se crean con fork, así que comparten el horario sin copiarlo.
+    """
+    global _rondas
+    _rondas = _Rondas(horario, mct_us, escala_us)
+    n = len(horario.ids)
+    origenes = range(n)
+    try:
+        if procesos == 1:
+            por_origen = [_patrones_origen(origen) for origen in origenes]
+        else:
+            with multiprocessing.get_context("fork").Pool(procesos) as pool:
+                por_origen = pool.map(_patrones_origen, origenes, chunksize=4)
+    finally:
+        _rondas = None
+
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(filas) for filas in por_origen])
+    patrones = np.concatenate(por_origen) if n else np.empty((0, MAX_TRAMOS), np.int32)
+    if n < np.iinfo(np.int16).max:
+        patrones = patrones.astype(np.int16)
+    return PatronesTransbordo(
+        np.asarray(horario.ids),
+        offsets,
+        patrones,
+        mct_us,
+        escala_us,
+        huella(horario),
+        np.array([FORMATO], dtype=np.int64),
+    )
+
+
+def evaluar(
+    horario: Horario,
+    patrones: PatronesTransbordo,
+    secuencia: list[int],
+    dia: datetime,
+) -> list[int] | None:
+    """
+    Vuelos (posiciones en el horario) del itinerario de menor costo (el de `a_star`: de la llegada
+    del primer vuelo a la del último) que sigue la `secuencia` de aeropuertos saliendo el `dia`, o
+    `None` si no se puede ese día.
+
+    Se revisan todos los vuelos de cada tramo y no solo el que llega primero, porque con la escala
+    máxima un vuelo que llega más tarde puede ser el único que conecta con el tramo siguiente. A
+    cada vuelo de un tramo se le guarda la llegada más tardía del primer vuelo entre las cadenas
+    que terminan en él, que es la que da el menor costo, y de qué vuelo del tramo anterior viene.
+    """
+    directos = direct_flights.para(horario)
+    inicio = a_microsegundos(datetime(dia.year, dia.month, dia.day))
+    vuelos = directos.rango(secuencia[0], secuencia[1], inicio, inicio + _DIA_US)
+    if len(vuelos) == 0:
+        return None
+    llegada_primero = horario.llegada[vuelos]
+    tramos = [vuelos]
+    anteriores = []
+    for a, b in zip(secuencia[1:], secuencia[2:]):
+        llegadas = horario.llegada[vuelos][:, None]
+        mct, escala = int(patrones.mct_us[a]), int(patrones.escala_us[a])
+        siguientes = directos.rango(a, b, int(llegadas.min()) + mct, int(llegadas.max()) + escala)
+        salidas = horario.salida[siguientes]
+        conecta = (llegadas + mct <= salidas) & (salidas < llegadas + escala)
+        validos = conecta.any(axis=0)
+        if not validos.any():
+            return None
+        candidatas = np.where(conecta[:, validos], llegada_primero[:, None], np.iinfo(np.int64).min)
+        anterior = np.argmax(candidatas, axis=0)
+        llegada_primero = candidatas[anterior, np.arange(len(anterior))]
+        vuelos = siguientes[validos]
+        tramos.append(vuelos)
+        anteriores.append(anterior)
+
+    # a igual costo, el primero por hora de salida (como `lib.vuelo_directo` con un solo tramo)
+    indice = int(np.argmin(horario.llegada[vuelos] - llegada_primero))
+    camino = [int(vuelos[indice])]
+    for tramo, anterior in zip(reversed(tramos[:-1]), reversed(anteriores)):
+        indice = int(anterior[indice])
+        camino.append(int(tramo[indice]))
+    return camino[::-1]
+
+
+def costo(horario: Horario, vuelos: list[int]) -> int:
+    """
+    Costo (µs) de un itinerario como en `a_star`: de la llegada del primer vuelo a la del último.
+    """
+    return int(horario.llegada[vuelos[-1]]) - int(horario.llegada[vuelos[0]])
+
+
+def buscar(
+    session: Session,
+    horario: Horario,
+    patrones: PatronesTransbordo,
+    origen: Airport,
+    destino: Airport,
+    dia: datetime,
+    estadisticas: dict[str, int] | None = None,
+):
+    """
+    Lo mismo que `a_star` (`([(Airport, Flight)], Airport)`) evaluando solo los patrones del par:
+    el itinerario de menor costo de `a_star` (a igual costo, el de menos vuelos). Se regresa `None`
+    si el par no tiene patrones (o se cargaron con otras reglas de conexión), para buscar de otra
+    forma.
+    """
+    if patrones.reglas is not None and patrones.reglas is not rules.actuales():
+        return None
+    i, j = horario.indice(int(origen.id)), horario.indice(int(destino.id))
+    if i < 0 or j < 0:
+        return None
+    escalas = patrones.de(i, j)
+    if not escalas:
+        return None
+
+    mejor = None
+    for escala in escalas:
+        vuelos = evaluar(horario, patrones, [i, *escala, j], dia)
+        if vuelos is None:
+            continue
+        llave = (costo(horario, vuelos), len(vuelos))
+        if mejor is None or llave < mejor[0]:
+            mejor = (llave, vuelos)
+    if estadisticas is not None:
+        estadisticas["patrones"] = estadisticas.get("patrones", 0) + len(escalas)
+    if mejor is None:
+        return ([], destino)
+
+    camino = []
+    for posicion in mejor[1]:
+        vuelo = horario.vuelo(posicion)
+        camino.append((session.get(Airport, vuelo.departure_airport_id), vuelo))
+    return (camino, destino)
+
+
+_patrones: PatronesTransbordo | None = None
+
+
+def actual() -> PatronesTransbordo | None:
+    return _patrones
+
+
+def usar(patrones: PatronesTransbordo | None) -> None:
+    global _patrones
+    _patrones = patrones
+
+
+def cargar_global(
+    session: Session, horario: Horario | None, directorio: str = DIRECTORIO_DEFAULT
+) -> PatronesTransbordo | None:
+    """
+    Se cargan (con mmap) los patrones de `directorio` para el proceso, si existen y se calcularon
+    con el formato actual, el mismo horario y las reglas de conexión del proceso.
+    """
+    if horario is None or not os.path.exists(os.path.join(directorio, "patrones.npy")):
+        return None
+    if not os.path.exists(os.path.join(directorio, "formato.npy")):
+        print(f"Los patrones de {directorio} son de un formato anterior; no se usan")
+        return None
+    patrones = PatronesTransbordo.cargar(directorio)
+    if int(patrones.formato[0]) != FORMATO:
+        print(f"Los patrones de {directorio} son de otro formato; no se usan")
+        return None
+    if not np.array_equal(patrones.huella, huella(horario)):
+        print(f"Los patrones de {directorio} no corresponden al horario cargado; no se usan")
+        return None
+    reglas = rules.actuales()
+    mct_us, escala_us = limites_conexion(session, horario, reglas)
+    if not (
+        np.array_equal(patrones.mct_us, mct_us) and np.array_equal(patrones.escala_us, escala_us)
+    ):
+        print(
+            f"Los patrones de {directorio} se calcularon con otras reglas de conexión; no se usan"
+        )
+        return None
+    patrones.reglas = reglas
+    usar(patrones)
+    return patrones
@@ -0,0 +1,126 @@
+"""
+Arranque en caliente de un proceso de la API.
+
+Después de un despliegue, las primeras peticiones de cada proceso pagan la configuración de los
+mappers de SQLAlchemy, la apertura de conexiones, la importación de geopy y la carga de los índices
+en memoria. Con `IA_VUELOS_WARMUP=1`, `app.py` hace todo eso al importarse, antes de atender
+peticiones, y además precalcula (en la caché de rutas, si está activada) las
+`IA_VUELOS_WARMUP_TOP_N` búsquedas más frecuentes de un archivo de repetición
+(`IA_VUELOS_WARMUP_REPLAY`). Los índices de `/search_airports` y geopy se cargan al arrancar aun
+sin `IA_VUELOS_WARMUP`.
+
+El archivo de repetición es NDJSON: una línea por petición, con `origin_id`, `destination_id` y
+`date`, ya sea en el objeto mismo o dentro de `"args"`. Sirven las capturas de `ia_vuelos.capture`
+(de ellas se toman solo las de `/get_path`); la ruta puede ser un patrón, p.ej.
+`data/capture/requests.*.ndjson*` para todos los procesos y los archivos rotados. `/ready`
+responde 200 solo cuando el arranque terminó sin errores.
+"""
+
+import glob
+import json
+import os
+import time
+from collections import Counter
+from typing import Callable
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import configure_mappers
+
+# Resultado del arranque: {"pasos": {nombre: segundos}, "errores": {nombre: mensaje}}
+_reporte: dict | None = None
+
+
+def habilitado() -> bool:
+    return os.environ.get("IA_VUELOS_WARMUP", "") not in ("", "0")
+
+
+def configurar_mappers() -> None:
+    configure_mappers()
+
+
+def preparar_geodesic() -> None:
+    """
+    Se importa geopy y se calcula una distancia: `Airport.calc_distance_airports` lo importa al
+    vuelo (para que los scripts que cargan los modelos no lo paguen), y sin matriz de distancias la
+    primera búsqueda de cada proceso pagaría la importación.
+    """
+    from geopy.distance import geodesic
+
+    geodesic((0.0, 0.0), (1.0, 1.0))
+
+
+def abrir_conexiones(engine: Engine, numero: int | None = None) -> int:
+    """
+    Se abren (a la vez, para que no se reutilice la misma) `numero` conexiones del pool y se
+    regresan a él; por defecto, tantas como el tamaño del pool.
+    """
+    if numero is None:
+        tamanio = getattr(engine.pool, "size", None)
+        numero = tamanio() if callable(tamanio) else 1
+    conexiones = [engine.connect() for _ in range(numero)]
+    try:
+        for conexion in conexiones:
+            conexion.execute(text("SELECT 1"))
+    finally:
+        for conexion in conexiones:
+            conexion.close()
+    return numero
+
+
+def leer_repeticion(ruta: str, top_n: int) -> list[tuple[str, str, str]]:
+    """
+    Las `top_n` búsquedas `(origin_id, destination_id, date)` más frecuentes de los archivos que
+    coinciden con `ruta`.
+    """
+    conteo: Counter = Counter()
+    for nombre in sorted(glob.glob(ruta)) or [ruta]:
+        with open(nombre) as archivo:
+            for linea in archivo:
+                try:
+                    peticion = json.loads(linea)
+                except ValueError:
+                    continue
+                if not isinstance(peticion, dict):
+                    continue
+                # de una captura, solo las búsquedas de rutas
+                if peticion.get("endpoint", "get_path") != "get_path":
+                    continue
+                args = peticion.get("args", peticion)
+                busqueda = tuple(
+                    args.get(campo) for campo in ("origin_id", "destination_id", "date")
+                )
+                if all(busqueda):
+                    conteo[tuple(str(valor) for valor in busqueda)] += 1
+    return [busqueda for busqueda, _ in conteo.most_common(top_n)]
+
+
+def calentar(pasos: dict[str, Callable[[], object]]) -> dict:
+    """
+    Se corren los pasos en orden, midiendo cuánto tarda cada uno. Si alguno falla se sigue con los
+    demás y el error queda en el reporte (y el proceso no se reporta listo).
+    """
+    global _reporte
+    reporte: dict = {"pasos": {}, "errores": {}}
+    for nombre, paso in pasos.items():
+        inicio = time.perf_counter()
+        try:
+            resultado = paso()
+        except Exception as e:
+            reporte["errores"][nombre] = f"{type(e).__name__}: {e}"
+            print(f"Arranque: falló {nombre}: {e}")
+            continue
+        segundos = round(time.perf_counter() - inicio, 3)
+        reporte["pasos"][nombre] = segundos
+        detalle = f" ({resultado})" if resultado is not None else ""
+        print(f"Arranque: {nombre} en {segundos} s{detalle}")
+    _reporte = reporte
+    return reporte
+
+
+def listo() -> bool:
+    return _reporte is not None and not _reporte["errores"]
+
+
+def reporte() -> dict | None:
+    return _reporte
@@ -0,0 +1,968 @@
+"""
+Benchmarks reproducibles de la búsqueda de rutas y de la capa HTTP.
+
+- `busqueda`: genera (con semilla) un horario sintético con la misma lógica de
+  `scripts/populate_flights.py` sobre una base SQLite local (o la de `--db-url`), corre un corpus
+  fijo de consultas (origen, destino, fecha) con cada motor de búsqueda y reporta latencia
+  p50/p95/p99, nodos expandidos, consultas SQL emitidas y memoria pico. Con `--k-paths 1,3,5`
+  se agrega `a_star_k` (itinerarios alternativos) para cada K, con `--compressed-graph` se
+  compara `a_star` sobre el horario en memoria columnar contra el comprimido, y con
+  `--parallel 2,4,8` se mide la aceleración del A* paralelo en las consultas más largas.
+- `almacenamiento`: compara backends (`--db-url`, SQLite temporal por defecto) en throughput de
+  carga por lotes y latencia de la consulta de vecinos.
+- `espacial`: latencia de las consultas del índice espacial de aeropuertos.
+- `autocompletado`: latencia de la búsqueda de aeropuertos por texto.
+- `respuestas`: tiempo al primer byte y memoria pico de respuestas JSON grandes, completas contra
+  transmitidas por partes, sin y con compresión.
+- `http`: prueba de carga de `/get_path` con clientes concurrentes contra una instancia corriendo.
+- `estaticos`: bytes transferidos y tiempo de la primera carga (y de una segunda visita) de la
+  página y sus recursos contra una instancia corriendo, por `Accept-Encoding`.
+
+Los resultados se escriben como JSON para poder comparar (diff) entre corridas:
+
+```sh
+python3 scripts/benchmark.py busqueda --seed 42 --output bench_busqueda.json
+python3 scripts/benchmark.py http --url http://localhost:5000 --corpus bench_busqueda.json
+```
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import re
+import string
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from flask import Flask, jsonify
+from sqlalchemy import func, insert, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from ia_vuelos import (
+    compressed_graph,
+    data,
+    direct_flights,
+    distances,
+    graph,
+    parallel_search,
+    responses,
+    rules,
+    search_index,
+    spatial,
+    sqltrace,
+    transfer_patterns,
+)
+from ia_vuelos.lib import a_star, a_star_k
+from ia_vuelos.sqlalchemy import Airport, Base, Flight
+from ia_vuelos.storage import ensure_database, make_engine
+from populate_flights import (
+    PLANE_MODELS,
+    build_single_flight,
+    generate_all_dates,
+    generate_flight_indexes,
+)
+
+# Límite de nodos expandidos por consulta, para que ninguna búsqueda domine la corrida
+MAX_EXPANSIONES = 2000
+
+# Motores de búsqueda a comparar: (session, origen, destino, fecha, estadisticas) -> camino
+MOTORES = {
+    "a_star": lambda session, orig, dest, fecha, stats: a_star(
+        session, orig, dest, fecha, estadisticas=stats, max_expansiones=MAX_EXPANSIONES
+    )[0],
+    # conexiones como antes de las reglas de MCT: cualquier vuelo del mismo día, para comparar
+    "a_star_sin_reglas": lambda session, orig, dest, fecha, stats: a_star(
+        session,
+        orig,
+        dest,
+        fecha,
+        estadisticas=stats,
+        max_expansiones=MAX_EXPANSIONES,
+        reglas=rules.Reglas.sin_restricciones(),
+    )[0],
+}
+
+
+def buscar_con_patrones(session, orig, dest, fecha, stats) -> list:
+    """
+    Motor `transfer_patterns` (con `--transfer-patterns`): solo los patrones precalculados, sin
+    recurrir a `a_star` si el par no tiene.
+    """
+    encontrado = transfer_patterns.buscar(
+        session, graph.actual(), transfer_patterns.actual(), orig, dest, fecha, stats
+    )
+    return encontrado[0] if encontrado else []
+
+
+def motor_con_horario(horario):
+    """
+    Motor `a_star` sobre `horario` (con `--compressed-graph`), sin cambiar el de los demás.
+    """
+
+    def buscar(session, orig, dest, fecha, stats) -> list:
+        anterior = graph.actual()
+        graph.usar(horario)
+        try:
+            return a_star(
+                session, orig, dest, fecha, estadisticas=stats, max_expansiones=MAX_EXPANSIONES
+            )[0]
+        finally:
+            graph.usar(anterior)
+
+    return buscar
+
+
+def motor_k(k: int, limite_segundos: float):
+    """
+    Motor con `a_star_k` (con `--k-paths`): regresa el mejor camino y cuenta las alternativas.
+    """
+
+    def buscar(session, orig, dest, fecha, stats) -> list:
+        caminos = a_star_k(
+            session,
+            orig,
+            dest,
+            fecha,
+            k=k,
+            limite_segundos=limite_segundos,
+            estadisticas=stats,
+            max_expansiones=MAX_EXPANSIONES,
+        )
+        stats["alternativas"] = len(caminos)
+        return caminos[0][0] if caminos else []
+
+    return buscar
+
+
+def es_camino_invalido(camino: list) -> bool:
+    """
+    Si alguna conexión del camino no cumple las reglas por defecto (MCT y escala máxima).
+    """
+    reglas = rules.Reglas()
+    return any(
+        not reglas.conexion_valida(aeropuerto, vuelo_anterior.arrival_time, vuelo.departure_time)
+        for (_, vuelo_anterior), (aeropuerto, vuelo) in zip(camino, camino[1:])
+    )
+
+
+def costo_camino(camino: list) -> float | None:
+    """
+    Costo g (segundos) de un camino, como en `a_star`: de la llegada del primer vuelo a la del
+    último.
+    """
+    if not camino:
+        return None
+    return (camino[-1][1].arrival_time - camino[0][1].arrival_time).total_seconds()
+
+
+def percentiles(valores: list[float]) -> dict[str, float]:
+    """
+    Percentiles p50/p95/p99 (por rango más cercano) de una lista de valores.
+    """
+    if not valores:
+        return {"p50": 0.0, "p95": 0.0, "p99": 0.0}
+    ordenados = sorted(valores)
+    resultado = {}
+    for p in (50, 95, 99):
+        indice = max(0, min(len(ordenados) - 1, -(-p * len(ordenados) // 100) - 1))
+        resultado[f"p{p}"] = round(ordenados[indice], 3)
+    return resultado
+
+
+def generar_aeropuertos(num_aeropuertos: int) -> list[data.Airport]:
+    """
+    Aeropuertos sintéticos repartidos al azar sobre el globo (un 20% son 'large_airport').
+    """
+    aeropuertos = []
+    for i in range(1, num_aeropuertos + 1):
+        tipo = "large_airport" if random.random() < 0.2 else "medium_airport"
+        lat = random.uniform(-60, 70)
+        lon = random.uniform(-180, 180)
+        aeropuertos.append(data.Airport((i, f"SYN{i}", tipo, f"Synthetic {i}", lat, lon)))
+    return aeropuertos
+
+
+def generar_horario(
+    num_aeropuertos: int, dias: int
+) -> tuple[list[data.Airport], list[datetime], list[dict]]:
+    """
+    Aeropuertos y vuelos sintéticos, usando las mismas funciones que `populate_flights.py`.
+    Se regresan los aeropuertos, las fechas y los vuelos (como diccionarios de columnas).
+    """
+    aeropuertos = generar_aeropuertos(num_aeropuertos)
+    fechas = generate_all_dates()[:dias]
+
+    vuelos = []
+    flight_ids = set()
+    for orig in aeropuertos:
+        flight_indexes = generate_flight_indexes(orig)
+        for fecha in fechas:
+            for plane_index in flight_indexes:
+                flight = build_single_flight(PLANE_MODELS[plane_index], aeropuertos, orig, fecha)
+                while flight.flight_id in flight_ids:
+                    flight = build_single_flight(
+                        PLANE_MODELS[plane_index], aeropuertos, orig, fecha
+                    )
+                flight_ids.add(flight.flight_id)
+                vuelos.append(vars(flight))
+
+    return aeropuertos, fechas, vuelos
+
+
+def preparar_base(url: str | None) -> Engine:
+    """
+    Engine con las tablas creadas; sin `url` se usa un SQLite temporal. La base debe estar vacía
+    (nunca se borran datos existentes).
+    """
+    if url is None:
+        url = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="ia_vuelos_bench_"), "bench.db")
+    engine = make_engine(url)
+    ensure_database(engine)
+    Base.metadata.create_all(engine)
+    with engine.connect() as connection:
+        if connection.execute(select(func.count()).select_from(Airport)).scalar_one() > 0:
+            sys.exit(f"La base {engine.url!r} no está vacía: usa una base desechable")
+    return engine
+
+
+def cargar_horario(engine: Engine, aeropuertos: list[data.Airport], vuelos: list[dict]) -> float:
+    """
+    Se insertan aeropuertos y vuelos por lotes; se regresan los segundos que tomó.
+    """
+    inicio = time.perf_counter()
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Airport),
+            [
+                {
+                    "id": a.id,
+                    "ident": a.ident,
+                    "type": a.type,
+                    "name": a.name,
+                    "latitude_deg": a.lat,
+                    "longitude_deg": a.lon,
+                    "scheduled_service": True,
+                }
+                for a in aeropuertos
+            ],
+        )
+        for i in range(0, len(vuelos), 5000):
+            connection.execute(insert(Flight), vuelos[i : i + 5000])
+    return time.perf_counter() - inicio
+
+
+def generar_corpus(
+    aeropuertos: list[data.Airport], fechas: list[datetime], num_consultas: int
+) -> list[tuple[int, int, str]]:
+    """
+    Corpus fijo (dada la semilla) de consultas `(origin_id, destination_id, date)`.
+    """
+    corpus = []
+    while len(corpus) < num_consultas:
+        orig, dest = random.sample(aeropuertos, 2)
+        fecha = random.choice(fechas)
+        corpus.append((orig.id, dest.id, fecha.strftime("%Y-%m-%d")))
+    return corpus
+
+
+def correr_busquedas(
+    engine: Engine, SessionLocal: sessionmaker, corpus: list[tuple[int, int, str]]
+) -> dict:
+    resultados = {}
+    for nombre, motor in MOTORES.items():
+        latencias, expansiones, consultas, memoria, alternativas = [], [], [], [], []
+        encontrados, truncadas, invalidos = 0, 0, 0
+        for origin_id, destination_id, date_str in corpus:
+            fecha = datetime.strptime(date_str, "%Y-%m-%d")
+
+            # primera pasada: latencia, nodos expandidos y consultas sql (sin tracemalloc)
+            with SessionLocal() as session:
+                orig = session.get(Airport, origin_id)
+                dest = session.get(Airport, destination_id)
+                stats: dict[str, int] = {}
+                with sqltrace.contar_consultas(engine) as sentencias:
+                    inicio = time.perf_counter()
+                    camino = motor(session, orig, dest, fecha, stats)
+                    latencias.append((time.perf_counter() - inicio) * 1000)
+                consultas.append(len(sentencias))
+                expansiones.append(stats.get("expansiones", 0))
+                alternativas.append(stats.get("alternativas", 1 if camino else 0))
+                encontrados += 1 if camino else 0
+                invalidos += 1 if es_camino_invalido(camino) else 0
+                truncadas += stats.get("truncada", 0)
+
+            # segunda pasada: memoria pico (tracemalloc distorsiona la latencia)
+            with SessionLocal() as session:
+                orig = session.get(Airport, origin_id)
+                dest = session.get(Airport, destination_id)
+                tracemalloc.start()
+                motor(session, orig, dest, fecha, {})
+                memoria.append(tracemalloc.get_traced_memory()[1] / 1024)
+                tracemalloc.stop()
+
+        resultados[nombre] = {
+            "consultas_corpus": len(corpus),
+            "rutas_encontradas": encontrados,
+            "busquedas_truncadas": truncadas,
+            "rutas_invalidas": invalidos,
+            "latencia_ms": percentiles(latencias),
+            "nodos_expandidos": percentiles(expansiones),
+            "alternativas": percentiles(alternativas),
+            "consultas_sql": percentiles(consultas),
+            "memoria_pico_kib": percentiles(memoria),
+        }
+        print(f"{nombre}: {json.dumps(resultados[nombre])}")
+    return resultados
+
+
+def benchmark_paralelo(
+    engine: Engine,
+    SessionLocal: sessionmaker,
+    corpus: list[tuple[int, int, str]],
+    procesos: list[int],
+    num_largas: int,
+) -> dict:
+    """
+    `a_star` contra el A* paralelo con 1 y `procesos` procesos, en las `num_largas` consultas del
+    corpus en las que `a_star` (sin límite de expansiones) expande más nodos.
+    """
+    anterior = graph.actual()
+    horario = graph.construir_desde_db(engine)
+    graph.usar(horario)
+    try:
+        medidas = []
+        for origin_id, destination_id, date_str in corpus:
+            fecha = datetime.strptime(date_str, "%Y-%m-%d")
+            with SessionLocal() as session:
+                orig = session.get(Airport, origin_id)
+                dest = session.get(Airport, destination_id)
+                stats: dict[str, int] = {}
+                inicio = time.perf_counter()
+                camino, _ = a_star(session, orig, dest, fecha, estadisticas=stats)
+                latencia = (time.perf_counter() - inicio) * 1000
+            medidas.append(
+                (stats["expansiones"], latencia, costo_camino(camino), origin_id, destination_id)
+            )
+        largas = sorted(zip(medidas, corpus), key=lambda medida: medida[0][0], reverse=True)[
+            :num_largas
+        ]
+
+        resultado = {
+            "cpus": os.cpu_count(),
+            "consultas": [consulta for _, consulta in largas],
+            "a_star": {
+                "latencia_ms": percentiles([medida[1] for medida, _ in largas]),
+                "total_ms": round(sum(medida[1] for medida, _ in largas), 3),
+                "nodos_expandidos": percentiles([medida[0] for medida, _ in largas]),
+            },
+            "procesos": {},
+        }
+        for num_procesos in [1] + procesos:
+            with SessionLocal() as session:
+                grupo = parallel_search.crear(session, horario, num_procesos)
+            latencias, expansiones, mensajes = [], [], []
+            comparados = {"igual": 0, "menor": 0, "mayor": 0}
+            # consultas en las que una segunda corrida regresa otros vuelos
+            cambian = 0
+            try:
+                for medida, (origin_id, destination_id, date_str) in largas:
+                    fecha = datetime.strptime(date_str, "%Y-%m-%d")
+                    with SessionLocal() as session:
+                        orig = session.get(Airport, origin_id)
+                        dest = session.get(Airport, destination_id)
+                        stats = {}
+                        inicio = time.perf_counter()
+                        camino, _ = parallel_search.a_star_paralelo(
+                            session, grupo, [orig], [dest], fecha, stats
+                        )
+                        latencias.append((time.perf_counter() - inicio) * 1000)
+                        otra, _ = parallel_search.a_star_paralelo(
+                            session, grupo, [orig], [dest], fecha
+                        )
+                        cambian += [v.flight_id for _, v in otra] != [
+                            v.flight_id for _, v in camino
+                        ]
+                    expansiones.append(stats["expansiones"])
+                    mensajes.append(stats.get("mensajes", 0))
+                    costo, costo_a_star = costo_camino(camino), medida[2]
+                    if costo == costo_a_star:
+                        comparados["igual"] += 1
+                    elif costo_a_star is None or (costo is not None and costo < costo_a_star):
+                        comparados["menor"] += 1
+                    else:
+                        comparados["mayor"] += 1
+            finally:
+                grupo.cerrar()
+            resultado["procesos"][num_procesos] = {
+                "latencia_ms": percentiles(latencias),
+                "total_ms": round(sum(latencias), 3),
+                "nodos_expandidos": percentiles(expansiones),
+                "mensajes": percentiles(mensajes),
+                # costo del camino respecto al de `a_star`
+                "costo_vs_a_star": comparados,
+                "no_deterministas": cambian,
+            }
+        base = resultado["procesos"][1]["total_ms"]
+        for medida in resultado["procesos"].values():
+            medida["aceleracion"] = round(base / max(medida["total_ms"], 1e-9), 2)
+            medida["aceleracion_vs_a_star"] = round(
+                resultado["a_star"]["total_ms"] / max(medida["total_ms"], 1e-9), 2
+            )
+        print(f"A* paralelo: {json.dumps(resultado['procesos'])}")
+        return resultado
+    finally:
+        graph.usar(anterior)
+
+
+def benchmark_busqueda(args) -> dict:
+    random.seed(args.seed)
+
+    engine = preparar_base(args.db_url)
+    SessionLocal = sessionmaker(bind=engine)
+
+    inicio = time.perf_counter()
+    aeropuertos, fechas, vuelos = generar_horario(args.airports, args.days)
+    cargar_horario(engine, aeropuertos, vuelos)
+    num_vuelos = len(vuelos)
+    print(f"Horario sintético: {len(aeropuertos)} aeropuertos, {num_vuelos} vuelos")
+    tiempo_generacion = time.perf_counter() - inicio
+
+    corpus = generar_corpus(aeropuertos, fechas, args.queries)
+
+    preprocesamiento = None
+    if args.transfer_patterns:
+        # con el horario en memoria también `a_star` lo usa, así que se comparan en igualdad
+        horario = graph.construir_desde_db(engine)
+        graph.usar(horario)
+        with SessionLocal() as session:
+            mct_us, escala_us = transfer_patterns.limites_conexion(
+                session, horario, rules.actuales()
+            )
+        inicio = time.perf_counter()
+        patrones = transfer_patterns.construir(horario, mct_us, escala_us)
+        preprocesamiento = {
+            "segundos": round(time.perf_counter() - inicio, 3),
+            "patrones": len(patrones),
+            "kib": round(patrones.nbytes() / 1024, 1),
+        }
+        print(f"Patrones de transbordo: {json.dumps(preprocesamiento)}")
+        transfer_patterns.usar(patrones)
+        MOTORES["transfer_patterns"] = buscar_con_patrones
+
+    for k in args.k_paths:
+        MOTORES[f"a_star_k{k}"] = motor_k(k, args.k_deadline)
+
+    compresion = None
+    if args.compressed_graph:
+        columnar = graph.construir_desde_db(engine)
+        inicio = time.perf_counter()
+        comprimido = compressed_graph.comprimir(columnar)
+        segundos = round(time.perf_counter() - inicio, 3)
+        # con el índice de vuelos directos, que el servidor siempre construye sobre el horario
+        con_indice = {
+            nombre: horario.nbytes() + direct_flights.IndiceDirectos(horario).nbytes()
+            for nombre, horario in (("columnar", columnar), ("comprimido", comprimido))
+        }
+        compresion = {
+            "segundos": segundos,
+            "bytes_columnar": columnar.nbytes(),
+            "bytes_comprimido": comprimido.nbytes(),
+            "razon": round(columnar.nbytes() / max(comprimido.nbytes(), 1), 2),
+            "bytes_por_vuelo": round(comprimido.nbytes() / max(len(comprimido), 1), 2),
+            "bytes_columnar_con_indice": con_indice["columnar"],
+            "bytes_comprimido_con_indice": con_indice["comprimido"],
+            "razon_con_indice": round(con_indice["columnar"] / max(con_indice["comprimido"], 1), 2),
+            "bytes_por_vuelo_con_indice": round(
+                con_indice["comprimido"] / max(len(comprimido), 1), 2
+            ),
+        }
+        print(f"Horario comprimido: {json.dumps(compresion)}")
+        MOTORES["a_star_columnar"] = motor_con_horario(columnar)
+        MOTORES["a_star_comprimido"] = motor_con_horario(comprimido)
+
+    paralelo = None
+    if args.parallel:
+        paralelo = benchmark_paralelo(
+            engine, SessionLocal, corpus, args.parallel, args.parallel_longest
+        )
+
+    if args.distance_matrix:
+        # heurística con la matriz precalculada en vez de `geodesic`
+        distances.usar(
+            distances.construir(
+                np.array([a.id for a in aeropuertos]),
+                np.array([a.lat for a in aeropuertos]),
+                np.array([a.lon for a in aeropuertos]),
+            )
+        )
+
+    return {
+        "parametros": {
+            "seed": args.seed,
+            "airports": args.airports,
+            "days": args.days,
+            "queries": args.queries,
+            "backend": engine.dialect.name,
+            "distance_matrix": args.distance_matrix,
+            "transfer_patterns": args.transfer_patterns,
+            "k_paths": args.k_paths,
+            "compressed_graph": args.compressed_graph,
+            "parallel": args.parallel,
+        },
+        "horario": {"vuelos": num_vuelos, "segundos_generacion": round(tiempo_generacion, 3)},
+        "patrones_transbordo": preprocesamiento,
+        "horario_comprimido": compresion,
+        "a_star_paralelo": paralelo,
+        "corpus": corpus,
+        "motores": correr_busquedas(engine, SessionLocal, corpus),
+    }
+
+
+def benchmark_almacenamiento(args) -> dict:
+    """
+    Mismo horario sintético en cada backend: throughput de la carga por lotes y latencia de
+    `Airport.get_neighboring_flights`.
+    """
+    random.seed(args.seed)
+    aeropuertos, fechas, vuelos = generar_horario(args.airports, args.days)
+    consultas = [
+        (random.choice(aeropuertos).id, random.choice(fechas)) for _ in range(args.queries)
+    ]
+
+    resultados = {}
+    for i, url in enumerate(args.db_url or [None]):
+        engine = preparar_base(url)
+        nombre = engine.dialect.name if engine.dialect.name not in resultados else f"{i}_{url}"
+        segundos_carga = cargar_horario(engine, aeropuertos, vuelos)
+
+        latencias = []
+        with sessionmaker(bind=engine)() as session:
+            for airport_id, fecha in consultas:
+                airport = session.get(Airport, airport_id)
+                inicio = time.perf_counter()
+                airport.get_neighboring_flights(session, fecha)
+                latencias.append((time.perf_counter() - inicio) * 1000)
+
+        resultados[nombre] = {
+            "carga_filas_por_segundo": round((len(vuelos) + len(aeropuertos)) / segundos_carga),
+            "carga_segundos": round(segundos_carga, 3),
+            "vecinos_latencia_ms": percentiles(latencias),
+        }
+        print(f"{nombre}: {json.dumps(resultados[nombre])}")
+        engine.dispose()
+
+    return {
+        "parametros": {
+            "seed": args.seed,
+            "airports": args.airports,
+            "days": args.days,
+            "queries": args.queries,
+            "vuelos": len(vuelos),
+        },
+        "backends": resultados,
+    }
+
+
+def benchmark_espacial(args) -> dict:
+    """
+    Latencia del índice espacial (k vecinos y radio) sobre puntos al azar, del tamaño de la tabla
+    `airports` completa.
+    """
+    rng = np.random.default_rng(args.seed)
+
+    def puntos(n: int) -> tuple[np.ndarray, np.ndarray]:
+        # uniformes sobre la esfera
+        return np.degrees(np.arcsin(rng.uniform(-1, 1, n))), rng.uniform(-180, 180, n)
+
+    lat, lon = puntos(args.points)
+    inicio = time.perf_counter()
+    indice = spatial.IndiceEspacial(np.arange(args.points), lat, lon)
+    segundos_construccion = time.perf_counter() - inicio
+
+    consultas_lat, consultas_lon = puntos(args.queries)
+    consultas = {
+        f"knn_{args.k}": lambda la, lo: indice.cercanos(la, lo, args.k),
+        f"radio_{args.radius_km:g}km": lambda la, lo: indice.en_radio(la, lo, args.radius_km),
+    }
+    resultados = {}
+    for nombre, consulta in consultas.items():
+        latencias = []
+        for la, lo in zip(consultas_lat.tolist(), consultas_lon.tolist()):
+            inicio = time.perf_counter()
+            consulta(la, lo)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        resultados[nombre] = {"latencia_ms": percentiles(latencias)}
+        print(f"{nombre}: {json.dumps(resultados[nombre])}")
+
+    return {
+        "parametros": {
+            "seed": args.seed,
+            "points": args.points,
+            "queries": args.queries,
+            "k": args.k,
+            "radius_km": args.radius_km,
+        },
+        "construccion_segundos": round(segundos_construccion, 3),
+        "consultas": resultados,
+    }
+
+
+def benchmark_autocompletado(args) -> dict:
+    """
+    Latencia de `/search_airports` (sin HTTP) sobre aeropuertos con nombres sintéticos, para
+    consultas de prefijo (cada prefijo de un nombre, como al teclearlo) y con errores de dedo.
+    """
+    random.seed(args.seed)
+    silabas = ["san", "ma", "lo", "ri", "to", "ca", "ber", "lin", "po", "de", "mon", "te", "gua"]
+
+    def palabra() -> str:
+        return "".join(random.choices(silabas, k=random.randint(2, 4))).capitalize()
+
+    filas = []
+    for i in range(args.airports):
+        ciudad = palabra()
+        tipo = random.choice(("small_airport", "heliport", "medium_airport", "large_airport"))
+        iata = "".join(random.choices(string.ascii_uppercase, k=3)) if i % 5 == 0 else None
+        nombre = f"{ciudad} {palabra()} International Airport"
+        filas.append((i, f"SYN{i}", iata, nombre, ciudad, "XX", tipo, None))
+
+    inicio = time.perf_counter()
+    indice = search_index.IndiceBusqueda(filas)
+    segundos_construccion = time.perf_counter() - inicio
+
+    nombres = [fila[3] for fila in random.sample(filas, args.queries)]
+    consultas = {
+        "prefijo": [nombre[: random.randint(1, len(nombre))] for nombre in nombres],
+        # se cambia una letra
+        "error_de_dedo": [
+            nombre[:j] + "x" + nombre[j + 1 :]
+            for nombre in nombres
+            for j in [random.randrange(len(nombre.split()[0]))]
+        ],
+    }
+    resultados = {}
+    for nombre, textos in consultas.items():
+        latencias = []
+        for texto in textos:
+            inicio = time.perf_counter()
+            indice.buscar(texto, args.k)
+            latencias.append((time.perf_counter() - inicio) * 1000)
+        resultados[nombre] = {"latencia_ms": percentiles(latencias)}
+        print(f"{nombre}: {json.dumps(resultados[nombre])}")
+
+    return {
+        "parametros": {
+            "seed": args.seed,
+            "airports": args.airports,
+            "queries": args.queries,
+            "k": args.k,
+        },
+        "construccion_segundos": round(segundos_construccion, 3),
+        "consultas": resultados,
+    }
+
+
+def benchmark_respuestas(args) -> dict:
+    """
+    Tiempo al primer byte, tiempo total, memoria pico y bytes enviados de una respuesta grande
+    (`--items` aeropuertos), con `jsonify` sobre la lista completa contra `ia_vuelos.responses`,
+    sin y con gzip.
+    """
+    app = Flask(__name__)
+
+    def elementos():
+        for i in range(args.items):
+            yield {"id": i, "ident": f"SYN{i}", "name": f"Synthetic airport {i}"}
+
+    variantes = {
+        "jsonify": lambda: jsonify(list(elementos())),
+        "json_response": lambda: responses.json_response(list(elementos())),
+        "stream_json": lambda: responses.stream_json(elementos(), ndjson=False),
+        "stream_ndjson": lambda: responses.stream_json(elementos(), ndjson=True),
+    }
+    resultados = {}
+    for codificacion in ("identity", "gzip"):
+        for nombre, vista in variantes.items():
+            with app.test_request_context(headers={"Accept-Encoding": codificacion}):
+                tracemalloc.start()
+                inicio = time.perf_counter()
+                primer_byte = None
+                enviados = 0
+                for bloque in vista().response:
+                    if primer_byte is None:
+                        primer_byte = time.perf_counter() - inicio
+                    enviados += len(bloque)
+                total = time.perf_counter() - inicio
+                _, pico = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+            resultados[f"{nombre}_{codificacion}"] = {
+                "primer_byte_ms": round((primer_byte or total) * 1000, 3),
+                "total_ms": round(total * 1000, 3),
+                "memoria_pico_mib": round(pico / (1024 * 1024), 2),
+                "bytes": enviados,
+            }
+            print(
+                f"{nombre} ({codificacion}): {json.dumps(resultados[f'{nombre}_{codificacion}'])}"
+            )
+
+    return {
+        "parametros": {"items": args.items, "orjson": responses.orjson is not None},
+        "variantes": resultados,
+    }
+
+
+def cargar_corpus(path: str | None) -> list[tuple[int, int, str]]:
+    if path is None:
+        # la misma búsqueda que `main_alt` en app.py
+        return [(3, 26955, "2024-01-01")]
+    with open(path, "r") as f:
+        return [tuple(consulta) for consulta in json.load(f)["corpus"]]
+
+
+def benchmark_http(args) -> dict:
+    corpus = cargar_corpus(args.corpus)
+    consultas = [corpus[i % len(corpus)] for i in range(args.requests)]
+    latencias: list[float] = []
+    errores = {"http": 0, "conexion": 0}
+    lock = threading.Lock()
+
+    def pedir(consulta: tuple[int, int, str]):
+        origin_id, destination_id, date_str = consulta
+        url = (
+            f"{args.url}/get_path?origin_id={origin_id}"
+            f"&destination_id={destination_id}&date={date_str}"
+        )
+        inicio = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=args.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError:
+            with lock:
+                errores["http"] += 1
+            return
+        except (urllib.error.URLError, TimeoutError):
+            with lock:
+                errores["conexion"] += 1
+            return
+        with lock:
+            latencias.append((time.perf_counter() - inicio) * 1000)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.clients) as pool:
+        list(pool.map(pedir, consultas))
+    duracion = time.perf_counter() - inicio
+
+    resultado = {
+        "parametros": {"url": args.url, "clients": args.clients, "requests": args.requests},
+        "get_path": {
+            "latencia_ms": percentiles(latencias),
+            "exitosas": len(latencias),
+            "errores": errores,
+            "peticiones_por_segundo": round(len(latencias) / duracion, 3),
+        },
+    }
+    print(json.dumps(resultado["get_path"]))
+    return resultado
+
+
+def decodificar(cuerpo: bytes, codificacion: str | None) -> str:
+    if codificacion == "gzip":
+        return gzip.decompress(cuerpo).decode()
+    if codificacion == "br":
+        return responses.brotli.decompress(
+            cuerpo
+        ).decode()  # pyright: ignore [reportOptionalMemberAccess]
+    return cuerpo.decode()
+
+
+def benchmark_estaticos(args) -> dict:
+    """
+    Primera carga: `/` y los recursos locales que enlaza (`src`/`href` que empiezan con `/`).
+    Segunda visita: lo mismo con la caché del navegador (los recursos `immutable` no se piden y
+    los demás se revalidan con `If-None-Match`). El tiempo estimado suma la transferencia de los
+    bytes con `--mbps`.
+    """
+
+    def pedir(ruta: str, headers: dict[str, str]) -> tuple[int, bytes, dict]:
+        peticion = urllib.request.Request(args.url + ruta, headers=headers)
+        try:
+            with urllib.request.urlopen(peticion, timeout=args.timeout) as response:
+                return response.status, response.read(), dict(response.headers)
+        except urllib.error.HTTPError as error:
+            return error.code, error.read(), dict(error.headers)
+
+    resultados = {}
+    for codificacion in args.accept_encoding.split(","):
+        visitas = []
+        cache: dict[str, dict] = {}
+        for _ in range(2):
+            bytes_transferidos = peticiones = 0
+            inicio = time.perf_counter()
+            rutas = ["/"]
+            while rutas:
+                ruta = rutas.pop(0)
+                anterior = cache.get(ruta)
+                if anterior is not None and "immutable" in anterior.get("Cache-Control", ""):
+                    continue
+                headers = {"Accept-Encoding": codificacion}
+                if anterior is not None and "ETag" in anterior:
+                    headers["If-None-Match"] = anterior["ETag"]
+                status, cuerpo, respuesta = pedir(ruta, headers)
+                peticiones += 1
+                bytes_transferidos += len(cuerpo)
+                if status == 200:
+                    cache[ruta] = respuesta
+                if ruta == "/" and status == 200:
+                    html = decodificar(cuerpo, respuesta.get("Content-Encoding"))
+                    rutas += re.findall(r'(?:src|href)="(/[^"/][^"]*)"', html)
+            medido = time.perf_counter() - inicio
+            visitas.append(
+                {
+                    "peticiones": peticiones,
+                    "bytes": bytes_transferidos,
+                    "medido_ms": round(medido * 1000, 3),
+                    "estimado_ms": round(
+                        (medido + bytes_transferidos * 8 / (args.mbps * 1e6)) * 1000, 3
+                    ),
+                }
+            )
+        resultados[codificacion] = {"primera_carga": visitas[0], "segunda_visita": visitas[1]}
+        print(f"{codificacion}: {json.dumps(resultados[codificacion])}")
+
+    return {"parametros": {"url": args.url, "mbps": args.mbps}, "codificaciones": resultados}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument("--output", help="archivo JSON donde se escriben los resultados")
+    subparsers = parser.add_subparsers(dest="modo", required=True)
+
+    busqueda = subparsers.add_parser(
+        "busqueda", parents=[comunes], help="motores de búsqueda sobre SQLite"
+    )
+    busqueda.add_argument("--seed", type=int, default=42)
+    busqueda.add_argument("--airports", type=int, default=150)
+    busqueda.add_argument("--days", type=int, default=3)
+    busqueda.add_argument("--queries", type=int, default=30)
+    busqueda.add_argument("--db-url", help="base vacía y desechable (por defecto SQLite temporal)")
+    busqueda.add_argument(
+        "--distance-matrix", action="store_true", help="usar la matriz de distancias precalculada"
+    )
+    busqueda.add_argument(
+        "--transfer-patterns",
+        action="store_true",
+        help="horario en memoria y motor de patrones de transbordo (con su preprocesamiento)",
+    )
+    busqueda.add_argument(
+        "--k-paths",
+        type=lambda valor: [int(k) for k in valor.split(",")],
+        default=[],
+        help="valores de K (p.ej. 1,3,5) para comparar itinerarios alternativos con a_star_k",
+    )
+    busqueda.add_argument(
+        "--compressed-graph",
+        action="store_true",
+        help="comparar a_star sobre el horario en memoria columnar y el comprimido",
+    )
+    busqueda.add_argument(
+        "--parallel",
+        type=lambda valor: [int(p) for p in valor.split(",")],
+        default=[],
+        help="procesos (p.ej. 2,4,8) con los que se compara el A* paralelo en las consultas largas",
+    )
+    busqueda.add_argument(
+        "--parallel-longest",
+        type=int,
+        default=10,
+        help="consultas (las que más expande a_star) en las que se mide el A* paralelo",
+    )
+    busqueda.add_argument(
+        "--k-deadline", type=float, default=2.0, help="límite (s) de cada búsqueda de a_star_k"
+    )
+
+    almacenamiento = subparsers.add_parser(
+        "almacenamiento", parents=[comunes], help="carga y consultas de vecinos por backend"
+    )
+    almacenamiento.add_argument("--seed", type=int, default=42)
+    almacenamiento.add_argument("--airports", type=int, default=300)
+    almacenamiento.add_argument("--days", type=int, default=7)
+    almacenamiento.add_argument("--queries", type=int, default=500)
+    almacenamiento.add_argument(
+        "--db-url",
+        action="append",
+        help="bases vacías y desechables a comparar (repetible; por defecto SQLite temporal)",
+    )
+
+    espacial = subparsers.add_parser(
+        "espacial", parents=[comunes], help="índice espacial de aeropuertos"
+    )
+    espacial.add_argument("--seed", type=int, default=42)
+    espacial.add_argument("--points", type=int, default=80000)
+    espacial.add_argument("--queries", type=int, default=2000)
+    espacial.add_argument("--k", type=int, default=10)
+    espacial.add_argument("--radius-km", type=float, default=200)
+
+    autocompletado = subparsers.add_parser(
+        "autocompletado", parents=[comunes], help="búsqueda de aeropuertos por texto"
+    )
+    autocompletado.add_argument("--seed", type=int, default=42)
+    autocompletado.add_argument("--airports", type=int, default=80000)
+    autocompletado.add_argument("--queries", type=int, default=2000)
+    autocompletado.add_argument("--k", type=int, default=10)
+
+    respuestas = subparsers.add_parser(
+        "respuestas", parents=[comunes], help="serialización y transmisión de respuestas grandes"
+    )
+    respuestas.add_argument("--items", type=int, default=200000)
+
+    http = subparsers.add_parser("http", parents=[comunes], help="prueba de carga de /get_path")
+    http.add_argument("--url", default="http://localhost:5000")
+    http.add_argument("--corpus", help="JSON de un benchmark de búsqueda (usa su corpus)")
+    http.add_argument("--clients", type=int, default=8)
+    http.add_argument("--requests", type=int, default=200)
+    http.add_argument("--timeout", type=float, default=60)
+
+    estaticos = subparsers.add_parser(
+        "estaticos", parents=[comunes], help="bytes y tiempo de la primera carga de la página"
+    )
+    estaticos.add_argument("--url", default="http://localhost:5000")
+    estaticos.add_argument("--accept-encoding", default="identity,gzip,br")
+    estaticos.add_argument(
+        "--mbps", type=float, default=1.6, help="ancho de banda para el tiempo estimado"
+    )
+    estaticos.add_argument("--timeout", type=float, default=60)
+
+    args = parser.parse_args()
+    modos = {
+        "busqueda": benchmark_busqueda,
+        "almacenamiento": benchmark_almacenamiento,
+        "espacial": benchmark_espacial,
+        "autocompletado": benchmark_autocompletado,
+        "respuestas": benchmark_respuestas,
+        "http": benchmark_http,
+        "estaticos": benchmark_estaticos,
+    }
+    resultado = modos[args.modo](args)
+    resultado["modo"] = args.modo
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import argparse
+import json
+import os
+import sys
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ia_vuelos import assets
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description=(
+            "Copia los recursos del frontend con la huella de su contenido en el nombre, junto "
+            "con sus variantes gzip y brotli, y escribe el manifiesto."
+        )
+    )
+    parser.add_argument(
+        "--elm", default="build/main.js", help="salida de `elm make src/Main.elm --output=...js`"
+    )
+    parser.add_argument("--styles", default="static/styles.css")
+    parser.add_argument("--output", default=assets.DIRECTORIO_DEFAULT)
+    args = parser.parse_args()
+
+    if assets.brotli is None:
+        print("brotli no está instalado: solo se generan las variantes gzip")
+
+    os.makedirs(args.output, exist_ok=True)
+    manifiesto = {}
+    # los builds anteriores se quedan en el directorio: las páginas ya abiertas los siguen pidiendo
+    for nombre, ruta in (("main.js", args.elm), ("styles.css", args.styles)):
+        with open(ruta, "rb") as f:
+            contenido = f.read()
+        base, extension = os.path.splitext(nombre)
+        con_huella = f"{base}.{assets.huella(contenido)}{extension}"
+        manifiesto[nombre] = con_huella
+
+        tamanios = []
+        for codificacion, cuerpo in assets.comprimir(contenido).items():
+            sufijo = assets.EXTENSIONES.get(codificacion, "")
+            with open(os.path.join(args.output, con_huella + sufijo), "wb") as f:
+                f.write(cuerpo)
+            tamanios.append(f"{codificacion or 'identity'} {len(cuerpo) / 1024:.1f} KiB")
+        print(f"{nombre} -> {con_huella}: {', '.join(tamanios)}")
+
+    with open(os.path.join(args.output, assets.MANIFIESTO), "w") as f:
+        json.dump(manifiesto, f, indent=2)
+    print(f"Manifiesto escrito en {os.path.join(args.output, assets.MANIFIESTO)}")
+
+
+if __name__ == "__main__":
+    main()
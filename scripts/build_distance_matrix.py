@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import numpy as np
+from sqlalchemy import select
+
+from ia_vuelos import distances
+from ia_vuelos.sqlalchemy import Airport
+from ia_vuelos.storage import make_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precalcula la matriz de distancias entre aeropuertos con servicio regular."
+    )
+    parser.add_argument("--output", default=distances.DIRECTORIO_DEFAULT)
+    args = parser.parse_args()
+
+    engine = make_engine()
+    with engine.connect() as connection:
+        # los mismos aeropuertos para los que `populate_flights.py` genera vuelos
+        rows = connection.execute(
+            select(Airport.id, Airport.latitude_deg, Airport.longitude_deg).where(
+                Airport.type.in_(("medium_airport", "large_airport")),
+                Airport.scheduled_service.is_(True),
+            )
+        ).fetchall()
+    print(f"Conexión lograda con {engine.dialect.name}: {len(rows)} aeropuertos")
+
+    inicio = time.perf_counter()
+    ids, lat, lon = (np.array(columna) for columna in zip(*rows))
+    matriz = distances.construir(ids, lat, lon)
+    matriz.guardar(args.output)
+
+    tamanio_mb = sum(
+        os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output)
+    ) / (1024 * 1024)
+    print(
+        f"Matriz de {len(matriz)}x{len(matriz)} guardada en {args.output} "
+        f"({tamanio_mb:.1f} MiB, {time.perf_counter() - inicio:.2f} s)"
+    )
+
+
+if __name__ == "__main__":
+    main()
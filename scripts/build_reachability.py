@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ia_vuelos import graph, reachability
+from ia_vuelos.storage import make_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precalcula qué aeropuertos se alcanzan desde cada origen y día del horario."
+    )
+    parser.add_argument("--output", default=reachability.DIRECTORIO_DEFAULT)
+    args = parser.parse_args()
+
+    inicio = time.perf_counter()
+    horario = graph.construir_desde_db(make_engine())
+    print(
+        f"Horario de {len(horario)} vuelos y {len(horario.ids)} aeropuertos "
+        f"({time.perf_counter() - inicio:.2f} s)"
+    )
+
+    inicio = time.perf_counter()
+    alcanzabilidad = reachability.construir(horario)
+    segundos = time.perf_counter() - inicio
+    alcanzabilidad.guardar(args.output)
+    print(
+        f"Alcanzabilidad de {len(alcanzabilidad.dias)} días "
+        f"({len(alcanzabilidad.filas)} filas distintas, {alcanzabilidad.nbytes() / 1024:.0f} KiB) "
+        f"guardada en {args.output} ({segundos:.2f} s de preprocesamiento)"
+    )
+
+
+if __name__ == "__main__":
+    main()
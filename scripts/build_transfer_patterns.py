@@ -0,0 +1,49 @@
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from sqlalchemy.orm import Session
+
+from ia_vuelos import graph, rules, transfer_patterns
+from ia_vuelos.storage import make_engine
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Precalcula los patrones de transbordo de todos los aeropuertos con vuelos."
+    )
+    parser.add_argument("--output", default=transfer_patterns.DIRECTORIO_DEFAULT)
+    parser.add_argument(
+        "--processes", type=int, default=None, help="procesos (por defecto, uno por núcleo)"
+    )
+    args = parser.parse_args()
+
+    engine = make_engine()
+    inicio = time.perf_counter()
+    horario = graph.construir_desde_db(engine)
+    with Session(engine) as session:
+        mct_us, escala_us = transfer_patterns.limites_conexion(session, horario, rules.actuales())
+    print(
+        f"Horario de {len(horario)} vuelos y {len(horario.ids)} aeropuertos "
+        f"({time.perf_counter() - inicio:.2f} s)"
+    )
+
+    inicio = time.perf_counter()
+    patrones = transfer_patterns.construir(horario, mct_us, escala_us, args.processes)
+    segundos = time.perf_counter() - inicio
+    patrones.guardar(args.output)
+
+    tamanio_mb = sum(
+        os.path.getsize(os.path.join(args.output, f)) for f in os.listdir(args.output)
+    ) / (1024 * 1024)
+    print(
+        f"{len(patrones)} patrones guardados en {args.output} "
+        f"({tamanio_mb:.2f} MiB, {segundos:.2f} s de preprocesamiento)"
+    )
+
+
+if __name__ == "__main__":
+    main()
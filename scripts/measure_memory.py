@@ -0,0 +1,88 @@
+"""
+Memoria (RSS y PSS) de cada worker de la API, leída de `/proc/<pid>/smaps_rollup` (Linux).
+
+La PSS reparte cada página compartida entre los procesos que la usan, así que si el horario en
+memoria sigue compartido después del fork la suma de PSS de los workers crece mucho menos que la
+de RSS. Se toman varias muestras para verlo mientras corre una carga, p.ej.:
+
+```sh
+IA_VUELOS_GRAPH=1 gunicorn -c gunicorn.conf.py app:app &
+python3 scripts/benchmark.py http --url http://localhost:8000 --requests 5000 &
+python3 scripts/measure_memory.py --pid $(pgrep -o gunicorn) --children --samples 30
+```
+"""
+
+import argparse
+import json
+import os
+import time
+
+CAMPOS = ("Rss", "Pss", "Shared_Clean", "Shared_Dirty", "Private_Clean", "Private_Dirty")
+
+
+def leer_smaps_rollup(pid: int) -> dict[str, int]:
+    """
+    Los `CAMPOS` del proceso, en KiB.
+    """
+    valores = {}
+    with open(f"/proc/{pid}/smaps_rollup") as archivo:
+        for linea in archivo:
+            nombre, _, resto = linea.partition(":")
+            if nombre in CAMPOS:
+                valores[nombre] = int(resto.split()[0])
+    return valores
+
+
+def hijos(pid: int) -> list[int]:
+    pids = []
+    for tarea in os.listdir(f"/proc/{pid}/task"):
+        with open(f"/proc/{pid}/task/{tarea}/children") as archivo:
+            pids += [int(hijo) for hijo in archivo.read().split()]
+    return sorted(pids)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RSS/PSS por worker desde /proc.")
+    parser.add_argument("--pid", type=int, action="append", required=True)
+    parser.add_argument(
+        "--children", action="store_true", help="medir también los hijos (workers) de cada --pid"
+    )
+    parser.add_argument("--samples", type=int, default=1)
+    parser.add_argument("--interval", type=float, default=1.0)
+    parser.add_argument("--output", help="archivo JSON con todas las muestras")
+    args = parser.parse_args()
+
+    muestras = []
+    for numero in range(args.samples):
+        pids = list(args.pid)
+        if args.children:
+            pids += [hijo for pid in args.pid for hijo in hijos(pid)]
+
+        muestra = {"t": round(time.time(), 3), "procesos": {}}
+        for pid in pids:
+            try:
+                muestra["procesos"][pid] = leer_smaps_rollup(pid)
+            except FileNotFoundError:
+                continue  # el proceso terminó
+        muestras.append(muestra)
+
+        print(f"muestra {numero + 1}/{args.samples}")
+        for pid, valores in muestra["procesos"].items():
+            print(
+                f"  {pid:>7}  " + "  ".join(f"{c}={valores.get(c, 0) / 1024:.1f}M" for c in CAMPOS)
+            )
+        procesos = muestra["procesos"].values()
+        print(
+            f"  total    Rss={sum(v['Rss'] for v in procesos) / 1024:.1f}M"
+            f"  Pss={sum(v['Pss'] for v in procesos) / 1024:.1f}M"
+        )
+        if numero + 1 < args.samples:
+            time.sleep(args.interval)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(muestras, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,12 +7,19 @@ import os
 
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 
-import mysql.connector
 from geopy.distance import geodesic
-from mysql.connector.cursor import MySQLCursor
+from sqlalchemy import Connection, text
+from sqlalchemy.exc import IntegrityError
 
+from ia_vuelos import distances
 from ia_vuelos.data import Airport, Flight
+from ia_vuelos.sqlalchemy import Base
+from ia_vuelos.storage import make_engine
 
+PLANE_MODELS = [
+    {"model": "Boeing 787-9", "speed": 903, "range": 14140},
+    {"model": "Airbus A320neo", "speed": 833, "range": 6500},
+]
 
 """
 Rows in 'airports' table, in 'fly_data'
@@ -20,12 +27,11 @@ Rows in 'airports' table, in 'fly_data'
 """
 
 
-def get_airports(cursor: MySQLCursor) -> list[Airport]:
+def get_airports(connection: Connection) -> list[Airport]:
     """
     Obtener todos los aeropuertos 'válidos' para generarles sus rutas.
     """
-    cursor.execute(
-        """
+    result = connection.execute(text("""
         SELECT id, ident, type, name, latitude_deg, longitude_deg
         FROM airports
         WHERE 
@@ -33,10 +39,9 @@ def get_airports(cursor: MySQLCursor) -> list[Airport]:
                 AND
             scheduled_service IS TRUE
         ;
-    """
-    )
+    """))
 
-    return list(map(lambda x: Airport(tuple(x)), cursor.fetchall()))
+    return list(map(lambda x: Airport(tuple(x)), result.fetchall()))
 
 
 def generate_flight_id() -> str:
@@ -78,19 +83,47 @@ def generate_dest_airport(
     return (dest_airport, distance_km)
 
 
+def get_feasible_destinations(
+    matriz: distances.MatrizDistancias,
+    airports_by_id: dict[int, Airport],
+    orig_airport: Airport,
+) -> dict[str, list[tuple[Airport, float]]]:
+    """
+    Destinos (con su distancia) dentro del rango de cada modelo de avión, según la matriz de
+    distancias precalculada.
+    """
+    feasible = {}
+    for plane in PLANE_MODELS:
+        dest_ids, dest_km = matriz.factibles_con_distancia(orig_airport.id, plane["model"])
+        feasible[plane["model"]] = [
+            (airports_by_id[dest_id], km)
+            for dest_id, km in zip(dest_ids.tolist(), dest_km.tolist())
+            if dest_id in airports_by_id
+        ]
+    return feasible
+
+
 def build_single_flight(
-    plane, all_airports: list[Airport], orig_airport: Airport, date: datetime
+    plane,
+    all_airports: list[Airport],
+    orig_airport: Airport,
+    date: datetime,
+    feasible_destinations: list[tuple[Airport, float]] | None = None,
 ) -> Flight:
 
-    dest_airport, distance_km = generate_dest_airport(
-        all_airports,
-        orig_airport,
-    )
-    while (dest_airport.id == orig_airport.id) or (distance_km > plane["range"]):
+    if feasible_destinations:
+        # con la matriz de distancias se elige directamente entre los destinos en rango
+        dest_airport, distance_km = random.choice(feasible_destinations)
+    else:
         dest_airport, distance_km = generate_dest_airport(
             all_airports,
             orig_airport,
         )
+        while (dest_airport.id == orig_airport.id) or (distance_km > plane["range"]):
+            dest_airport, distance_km = generate_dest_airport(
+                all_airports,
+                orig_airport,
+            )
 
     flight_id: str = generate_flight_id()
     duration_hours: float = calculate_duration(distance_km, plane["speed"])
@@ -113,70 +146,77 @@ def build_single_flight(
     )
 
 
-def insert_flight(cursor: MySQLCursor, flight: Flight):
-    insert_query = """
+INSERT_FLIGHT_QUERY = text("""
     INSERT INTO flights (
         flight_id, model, price_business, price_economy, departure_time, arrival_time,
         departure_airport_id, arrival_airport_id
-    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-    """
-    cursor.execute(
-        insert_query,
-        (
-            flight.flight_id,
-            flight.model,
-            flight.price_business,
-            flight.price_economy,
-            flight.departure_time,
-            flight.arrival_time,
-            flight.departure_airport_id,
-            flight.arrival_airport_id,
-        ),
+    ) VALUES (
+        :flight_id, :model, :price_business, :price_economy, :departure_time, :arrival_time,
+        :departure_airport_id, :arrival_airport_id
     )
+    """)
+
+
+def insert_flight(connection: Connection, flight: Flight):
+    connection.execute(INSERT_FLIGHT_QUERY, vars(flight))
+
 
+def generate_flight_indexes(orig_airport: Airport) -> list[int]:
+    """
+    Obtener los índices (en `PLANE_MODELS`) de los aviones que salen de un aeropuerto cada día.
+    """
+    flights_per_day: int = 0
+    if orig_airport.type == "large_airport":
+        flights_per_day = random.randint(10, 15)
+        long_haul_flights = floor(flights_per_day * 0.5)
+    else:
+        flights_per_day = random.randint(5, 10)
+        long_haul_flights = floor(flights_per_day * 0.2)
+    short_haul_flights = flights_per_day - long_haul_flights
+
+    return [0 for _ in range(long_haul_flights)] + [1 for _ in range(short_haul_flights)]
 
-def generate_flights(cursor: MySQLCursor):
-    all_airports: list[Airport] = get_airports(cursor)
+
+def generate_flights(connection: Connection):
+    all_airports: list[Airport] = get_airports(connection)
     dates = generate_all_dates()
 
-    plane_models = [
-        {"model": "Boeing 787-9", "speed": 903, "range": 14140},
-        {"model": "Airbus A320neo", "speed": 833, "range": 6500},
-    ]
+    matriz = distances.actual()
+    airports_by_id = {airport.id: airport for airport in all_airports}
 
     PRINT_INTERVAL = 1
     count = 0
     do_i_print = PRINT_INTERVAL - 1  # prints every 25 airports finished
     for curr_orig_airport in all_airports:
-        flights_per_day: int = 0
-        if curr_orig_airport.type == "large_airport":
-            flights_per_day = random.randint(10, 15)
-            long_haul_flights = floor(flights_per_day * 0.5)
-        else:
-            flights_per_day = random.randint(5, 10)
-            long_haul_flights = floor(flights_per_day * 0.2)
-        short_haul_flights = flights_per_day - long_haul_flights
-
-        flight_indexes = [0 for _ in range(long_haul_flights)] + [
-            1 for _ in range(short_haul_flights)
-        ]
+        flight_indexes = generate_flight_indexes(curr_orig_airport)
+        feasible = (
+            get_feasible_destinations(matriz, airports_by_id, curr_orig_airport)
+            if matriz is not None
+            else {}
+        )
         # print(
         #     f"\ntotal flights {flights_per_day} long: {long_haul_fligths} short: {short_haul_fligths} \n"
         # )
         # sleep(1)
         for date in dates:
             for plane_index in flight_indexes:
-                plane = plane_models[plane_index]
+                plane = PLANE_MODELS[plane_index]
 
                 # if plane["model"] != "Airbus A320neo":
                 #     print(plane)
 
                 while True:
-                    flight = build_single_flight(plane, all_airports, curr_orig_airport, date)
+                    flight = build_single_flight(
+                        plane,
+                        all_airports,
+                        curr_orig_airport,
+                        date,
+                        feasible.get(plane["model"]),
+                    )
                     try:
-                        insert_flight(cursor, flight)
+                        insert_flight(connection, flight)
                         break  # Exit the loop if insert is successful
-                    except mysql.connector.errors.IntegrityError as e:
+                    except IntegrityError as e:
                         print("\n\nIntegrityError: Probably duplicate key:", e)
                         print(f"\nIn Error Flight:\n{vars(flight)}\n")
                     except Exception as e:
@@ -194,43 +234,28 @@ def generate_flights(cursor: MySQLCursor):
     sys.stdout.flush()
 
 
-def create_flights_table(cursor: MySQLCursor):
-    create_table_query = """
-    CREATE TABLE IF NOT EXISTS flights (
-        flight_id VARCHAR(11) PRIMARY KEY,
-        model VARCHAR(50),
-        price_business FLOAT,
-        price_economy FLOAT,
-        departure_time DATETIME,
-        arrival_time DATETIME,
-        departure_airport_id INT,
-        arrival_airport_id INT,
-        FOREIGN KEY (departure_airport_id) REFERENCES airports(id),
-        FOREIGN KEY (arrival_airport_id) REFERENCES airports(id)
-    )
-    """
-    cursor.execute(create_table_query)
+def create_flights_table(connection: Connection):
+    # la misma tabla que `ia_vuelos.sqlalchemy.Flight`, con el DDL de cada backend
+    tabla = Base.metadata.tables["flights"]
+    Base.metadata.create_all(connection, tables=[tabla])
+    # si la tabla ya existía, create_all no agrega los índices nuevos
+    for indice in tabla.indexes:
+        indice.create(connection, checkfirst=True)
 
 
 def main():
-    db_connection = mysql.connector.connect(
-        host="localhost",  # in docker: host=db
-        port="3306",
-        user="root",
-        password="root",
-        database="fly_data",
-    )
-    print("Conexión lograda con mysql: insertando vuelos")
-
-    cursor: MySQLCursor = db_connection.cursor()
-    create_flights_table(cursor)
-    db_connection.commit()
-
-    generate_flights(cursor)
-    db_connection.commit()
-
-    cursor.close()
-    db_connection.close()
+    # IA_VUELOS_DB_URL, MySQL by default (in docker: host=db)
+    engine = make_engine()
+    with engine.connect() as connection:
+        print(f"Conexión lograda con {engine.dialect.name}: insertando vuelos")
+        if distances.cargar_global() is not None:
+            print(f"Usando la matriz de distancias de {distances.DIRECTORIO_DEFAULT}")
+
+        create_flights_table(connection)
+        connection.commit()
+
+        generate_flights(connection)
+        connection.commit()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,351 @@
+"""
+Repetición de las capturas de tráfico (`ia_vuelos/capture.py`), para elegir con datos el tamaño de
+la caché de rutas y el número de workers.
+
+- `simular`: sin correr ninguna búsqueda, la tasa de aciertos de la caché de rutas con cada tamaño
+  (`--sizes`) y política de desalojo (`lru`, `lfu`, `fifo`), repartiendo las peticiones al azar
+  entre `--workers` procesos (cada worker de gunicorn tiene su propia caché). También reporta la
+  carga de la captura: peticiones por segundo y concurrencia promedio (ley de Little) y pico.
+- `repetir`: manda las peticiones capturadas a una instancia corriendo (`--url`) con los mismos
+  tiempos entre ellas, acelerados `--speedup` veces (0: tan rápido como se pueda), con hasta
+  `--concurrency` peticiones a la vez; reporta latencia por endpoint, errores y cuánto se atrasó
+  la repetición respecto a la captura.
+
+```sh
+python3 scripts/replay.py simular "data/capture/requests.*.ndjson*" --sizes 256,1024,4096
+python3 scripts/replay.py repetir "data/capture/requests.*.ndjson*" --speedup 10 --concurrency 16
+```
+"""
+
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import Counter, OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from ia_vuelos import cache
+from benchmark import percentiles
+
+# parámetros de `/get_path` que cambian la respuesta (y por lo tanto la llave de la caché)
+PARAMETROS_RUTA = (
+    "origin_id",
+    "destination_id",
+    "date",
+    "k",
+    "same_city",
+    "origin_radius_km",
+    "destination_radius_km",
+)
+
+
+def leer(patrones: list[str]) -> list[dict]:
+    """
+    Las peticiones de todos los archivos que coinciden con `patrones`, ordenadas por hora.
+    """
+    peticiones = []
+    for patron in patrones:
+        for ruta in sorted(glob.glob(patron)) or [patron]:
+            with open(ruta) as archivo:
+                for linea in archivo:
+                    try:
+                        peticion = json.loads(linea)
+                    except ValueError:
+                        continue
+                    if isinstance(peticion, dict) and "endpoint" in peticion and "ts" in peticion:
+                        peticiones.append(peticion)
+    peticiones.sort(key=lambda peticion: peticion["ts"])
+    return peticiones
+
+
+def inicio(peticion: dict) -> float:
+    # `ts` se escribe al terminar la petición
+    return peticion["ts"] - peticion.get("ms", 0) / 1000
+
+
+def llave_ruta(args: dict[str, str]) -> tuple:
+    """
+    La llave de `cache.rutas` aproximada con los parámetros de la petición: los orígenes y
+    destinos sin expandir por radio o ciudad, que siempre se expanden igual.
+    """
+    extra = tuple(args.get(parametro, "") for parametro in PARAMETROS_RUTA[4:])
+    return (
+        cache.llave_ruta(
+            [args.get("origin_id")],
+            [args.get("destination_id")],
+            args.get("date", ""),
+            int(args.get("k", "1")),
+        )
+        + extra
+    )
+
+
+class Lru:
+    def __init__(self, tamanio: int) -> None:
+        self.tamanio = tamanio
+        self.datos: OrderedDict = OrderedDict()
+
+    def acceder(self, llave) -> bool:
+        if llave in self.datos:
+            self.datos.move_to_end(llave)
+            return True
+        self.datos[llave] = None
+        if len(self.datos) > self.tamanio:
+            self.datos.popitem(last=False)
+        return False
+
+
+class Fifo(Lru):
+    def acceder(self, llave) -> bool:
+        if llave in self.datos:
+            return True
+        self.datos[llave] = None
+        if len(self.datos) > self.tamanio:
+            self.datos.popitem(last=False)
+        return False
+
+
+class Lfu:
+    """
+    Se desaloja la llave con menos accesos (y, entre ellas, la usada hace más tiempo), en O(1).
+    """
+
+    def __init__(self, tamanio: int) -> None:
+        self.tamanio = tamanio
+        self.frecuencias: dict = {}
+        # {frecuencia: llaves con esa frecuencia, de la usada hace más tiempo a la más reciente}
+        self.por_frecuencia: defaultdict[int, OrderedDict] = defaultdict(OrderedDict)
+        self.minima = 0
+
+    def acceder(self, llave) -> bool:
+        frecuencia = self.frecuencias.get(llave)
+        if frecuencia is not None:
+            del self.por_frecuencia[frecuencia][llave]
+            if not self.por_frecuencia[frecuencia]:
+                del self.por_frecuencia[frecuencia]
+                if self.minima == frecuencia:
+                    self.minima += 1
+            self.frecuencias[llave] = frecuencia + 1
+            self.por_frecuencia[frecuencia + 1][llave] = None
+            return True
+        if self.tamanio <= 0:
+            return False
+        if len(self.frecuencias) >= self.tamanio:
+            desalojada, _ = self.por_frecuencia[self.minima].popitem(last=False)
+            if not self.por_frecuencia[self.minima]:
+                del self.por_frecuencia[self.minima]
+            del self.frecuencias[desalojada]
+        self.frecuencias[llave] = 1
+        self.por_frecuencia[1][llave] = None
+        self.minima = 1
+        return False
+
+
+POLITICAS = {"lru": Lru, "lfu": Lfu, "fifo": Fifo}
+
+
+def concurrencia(peticiones: list[dict]) -> dict:
+    """
+    Peticiones por segundo y peticiones en curso (promedio y pico) durante la captura.
+    """
+    if not peticiones:
+        return {"duracion_s": 0, "peticiones_por_segundo": 0, "promedio": 0, "pico": 0}
+    eventos = sorted(
+        [(inicio(peticion), 1) for peticion in peticiones]
+        + [(peticion["ts"], -1) for peticion in peticiones]
+    )
+    en_curso = pico = 0
+    for _, cambio in eventos:
+        en_curso += cambio
+        pico = max(pico, en_curso)
+    duracion = max(eventos[-1][0] - eventos[0][0], 1e-9)
+    ocupado = sum(peticion.get("ms", 0) for peticion in peticiones) / 1000
+    return {
+        "duracion_s": round(duracion, 3),
+        "peticiones_por_segundo": round(len(peticiones) / duracion, 3),
+        "promedio": round(ocupado / duracion, 3),
+        "pico": pico,
+    }
+
+
+def simular(args) -> dict:
+    peticiones = leer(args.captures)
+    random.seed(args.seed)
+    # las búsquedas que terminaron bien son las que se guardan en la caché
+    llaves = [
+        (random.randrange(args.workers), llave_ruta(peticion.get("args", {})))
+        for peticion in peticiones
+        if peticion["endpoint"] == "get_path" and peticion.get("status") == 200
+    ]
+    distintas = len({llave for _, llave in llaves})
+    # con una caché infinita solo falla la primera vez que cada worker ve una llave
+    techo = 1 - len(set(llaves)) / len(llaves) if llaves else 0
+
+    tasas: dict[str, dict[int, float]] = {}
+    for politica in args.policies:
+        tasas[politica] = {}
+        for tamanio in args.sizes:
+            caches = [POLITICAS[politica](tamanio) for _ in range(args.workers)]
+            aciertos = sum(caches[worker].acceder(llave) for worker, llave in llaves)
+            tasas[politica][tamanio] = round(aciertos / len(llaves), 4) if llaves else 0
+        print(f"{politica}: {json.dumps(tasas[politica])}")
+
+    por_endpoint = {}
+    for endpoint in sorted({peticion["endpoint"] for peticion in peticiones}):
+        de_endpoint = [peticion for peticion in peticiones if peticion["endpoint"] == endpoint]
+        por_endpoint[endpoint] = {
+            "peticiones": len(de_endpoint),
+            "estados": dict(Counter(str(peticion.get("status")) for peticion in de_endpoint)),
+            "latencia_ms": percentiles([peticion.get("ms", 0) for peticion in de_endpoint]),
+        }
+    carga = concurrencia(peticiones)
+    print(f"carga: {json.dumps(carga)}")
+    return {
+        "parametros": {
+            "captures": args.captures,
+            "workers": args.workers,
+            "sizes": args.sizes,
+            "policies": args.policies,
+            "seed": args.seed,
+        },
+        "peticiones": len(peticiones),
+        "endpoints": por_endpoint,
+        "carga": carga,
+        "busquedas": len(llaves),
+        "busquedas_distintas": distintas,
+        "tasa_aciertos_maxima": round(techo, 4),
+        "tasa_aciertos": tasas,
+    }
+
+
+def repetir(args) -> dict:
+    peticiones = leer(args.captures)
+    if args.limit:
+        peticiones = peticiones[: args.limit]
+    latencias: dict[str, list[float]] = defaultdict(list)
+    errores: Counter = Counter()
+    atrasos: list[float] = []
+    lock = threading.Lock()
+
+    def pedir(peticion: dict) -> None:
+        url = f"{args.url}{peticion.get('path', '/' + peticion['endpoint'])}"
+        if peticion.get("args"):
+            url += "?" + urllib.parse.urlencode(peticion["args"])
+        comienzo = time.perf_counter()
+        try:
+            with urllib.request.urlopen(url, timeout=args.timeout) as response:
+                response.read()
+        except urllib.error.HTTPError as e:
+            with lock:
+                errores[f"http_{e.code}"] += 1
+            return
+        except (urllib.error.URLError, TimeoutError):
+            with lock:
+                errores["conexion"] += 1
+            return
+        with lock:
+            latencias[peticion["endpoint"]].append((time.perf_counter() - comienzo) * 1000)
+
+    base = inicio(peticiones[0]) if peticiones else 0
+    # con todos los hilos ocupados, la siguiente petición espera (y se atrasa)
+    cupos = threading.Semaphore(args.concurrency)
+    comienzo = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for peticion in peticiones:
+            programada = (inicio(peticion) - base) / args.speedup if args.speedup > 0 else 0.0
+            espera = programada - (time.perf_counter() - comienzo)
+            if espera > 0:
+                time.sleep(espera)
+            cupos.acquire()
+            if args.speedup > 0:
+                atrasos.append(max(0.0, time.perf_counter() - comienzo - programada) * 1000)
+            futuro = pool.submit(pedir, peticion)
+            futuro.add_done_callback(lambda _: cupos.release())
+    duracion = time.perf_counter() - comienzo
+
+    exitosas = sum(len(valores) for valores in latencias.values())
+    resultado = {
+        "parametros": {
+            "captures": args.captures,
+            "url": args.url,
+            "speedup": args.speedup,
+            "concurrency": args.concurrency,
+        },
+        "peticiones": len(peticiones),
+        "exitosas": exitosas,
+        "errores": dict(errores),
+        "duracion_s": round(duracion, 3),
+        "peticiones_por_segundo": round(exitosas / max(duracion, 1e-9), 3),
+        # cuánto después de su hora (acelerada) salió cada petición
+        "atraso_ms": percentiles(atrasos),
+        "endpoints": {
+            endpoint: {"peticiones": len(valores), "latencia_ms": percentiles(valores)}
+            for endpoint, valores in sorted(latencias.items())
+        },
+    }
+    print(json.dumps({clave: resultado[clave] for clave in ("exitosas", "errores", "atraso_ms")}))
+    for endpoint, medidas in resultado["endpoints"].items():
+        print(f"{endpoint}: {json.dumps(medidas)}")
+    return resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    comunes = argparse.ArgumentParser(add_help=False)
+    comunes.add_argument("captures", nargs="+", help="archivos o patrones de la captura")
+    comunes.add_argument("--output", help="archivo JSON donde se escriben los resultados")
+    subparsers = parser.add_subparsers(dest="modo", required=True)
+
+    simulacion = subparsers.add_parser(
+        "simular", parents=[comunes], help="tasa de aciertos de la caché de rutas, sin buscar"
+    )
+    simulacion.add_argument(
+        "--sizes",
+        type=lambda valor: [int(tamanio) for tamanio in valor.split(",")],
+        default=[128, 256, 512, 1024, 2048, 4096],
+        help="tamaños de la caché (entradas por worker)",
+    )
+    simulacion.add_argument(
+        "--policies",
+        type=lambda valor: valor.split(","),
+        default=list(POLITICAS),
+        help="políticas de desalojo: lru, lfu, fifo",
+    )
+    simulacion.add_argument("--workers", type=int, default=1, help="workers, cada uno con su caché")
+    simulacion.add_argument("--seed", type=int, default=42)
+
+    repeticion = subparsers.add_parser(
+        "repetir", parents=[comunes], help="manda la captura a una instancia corriendo"
+    )
+    repeticion.add_argument("--url", default="http://localhost:5000")
+    repeticion.add_argument(
+        "--speedup", type=float, default=1.0, help="aceleración de los tiempos (0: sin esperas)"
+    )
+    repeticion.add_argument("--concurrency", type=int, default=8)
+    repeticion.add_argument("--limit", type=int, help="solo las primeras N peticiones")
+    repeticion.add_argument("--timeout", type=float, default=60)
+
+    args = parser.parse_args()
+    if args.modo == "simular":
+        desconocidas = set(args.policies) - set(POLITICAS)
+        if desconocidas:
+            parser.error(f"políticas desconocidas: {', '.join(sorted(desconocidas))}")
+    resultado = {"simular": simular, "repetir": repetir}[args.modo](args)
+    resultado["modo"] = args.modo
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(resultado, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -16,7 +16,7 @@ import Tuple exposing (first)
 -- MAIN
 
 
-main : Program () Model Msg
+main : Program Json.Value Model Msg
 main =
     Browser.element
         { init = init
@@ -31,7 +31,8 @@ main =
 
 
 type alias Model =
-    { originAirport : FinalNodesInfo
+    { apiBase : String
+    , originAirport : FinalNodesInfo
     , destinationAirport : FinalNodesInfo
     , date : ( String, Maybe Date.Date )
     , path : Maybe PathData
@@ -210,9 +211,16 @@ pathDataDecoder =
         (Json.field "path" (Json.list pathItemDecoder))
 
 
-init : () -> ( Model, Cmd Msg )
-init _ =
+{-| The server injects `{ apiBase : String }` when serving the page (see `templates/app.html`);
+without flags (e.g. with `elm reactor`) the local development server is used.
+-}
+init : Json.Value -> ( Model, Cmd Msg )
+init flags =
     let
+        apiBase : String
+        apiBase =
+            Result.withDefault "http://localhost:5000" <| Json.decodeValue (Json.field "apiBase" Json.string) flags
+
         defaultDate : Date
         defaultDate =
             Date.fromCalendarDate 2024 Jan 1
@@ -221,7 +229,7 @@ init _ =
         emptyAirportInfo =
             { selectedContinent = Nothing, selectedCountry = Nothing, countryOptions = Nothing, airportOptions = Nothing, selectedAirport = Nothing }
     in
-    ( { originAirport = emptyAirportInfo, destinationAirport = emptyAirportInfo, date = ( Date.toIsoString defaultDate, Just defaultDate ), path = Nothing }
+    ( { apiBase = apiBase, originAirport = emptyAirportInfo, destinationAirport = emptyAirportInfo, date = ( Date.toIsoString defaultDate, Just defaultDate ), path = Nothing }
     , Cmd.none
     )
 
@@ -294,7 +302,7 @@ update msg model =
         UpdateContinent originOrDestinationChange selectedContinentCode ->
             ( updateFinalModel originOrDestinationChange selectedContinentCode setNodeContinent (\_ -> Just continentDictionary)
             , Http.get
-                { url = "http://localhost:5000/get_countries?continent=" ++ selectedContinentCode
+                { url = model.apiBase ++ "/get_countries?continent=" ++ selectedContinentCode
                 , expect = Http.expectJson (GotCountries originOrDestinationChange) countryDecoder
                 }
             )
@@ -302,7 +310,7 @@ update msg model =
         UpdateCountry originOrDestinationChange selectedCountryIsoCode ->
             ( updateFinalModel originOrDestinationChange selectedCountryIsoCode setNodeCountry getNodeCountryOptions
             , Http.get
-                { url = "http://localhost:5000/get_airports?iso_country=" ++ selectedCountryIsoCode
+                { url = model.apiBase ++ "/get_airports?iso_country=" ++ selectedCountryIsoCode
                 , expect = Http.expectJson (GotAirports originOrDestinationChange) airportDecoder
                 }
             )
@@ -352,7 +360,7 @@ update msg model =
                         date =
                             "date=" ++ Date.toIsoString data.date
                     in
-                    "http://localhost:5000/get_path?" ++ origin_id ++ "&" ++ destination_id ++ "&" ++ date
+                    model.apiBase ++ "/get_path?" ++ origin_id ++ "&" ++ destination_id ++ "&" ++ date
                 , expect = Http.expectJson GotPath pathDataDecoder
                 }
             )
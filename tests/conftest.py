@@ -0,0 +1,72 @@
+"""
+Fixtures compartidas por las pruebas: un horario sintético (con semilla) sobre una base SQLite
+temporal, generado con las mismas funciones que `scripts/benchmark.py busqueda`, y la app de Flask
+sobre esa base.
+"""
+
+import os
+import random
+from datetime import datetime
+from typing import NamedTuple
+
+import benchmark
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import sessionmaker
+
+from ia_vuelos.sqlalchemy import Airport, Country
+
+SEMILLA = 42
+AEROPUERTOS = 60
+DIAS = 3
+CONSULTAS = 40
+
+PAISES = (("MX", "Mexico", "NA"), ("CO", "Colombia", "SA"))
+
+
+class BaseSintetica(NamedTuple):
+    url: str
+    engine: Engine
+    SessionLocal: sessionmaker
+    fechas: list[datetime]
+    # consultas (origin_id, destination_id, "YYYY-MM-DD"), como el corpus de los benchmarks
+    corpus: list[tuple[int, int, str]]
+
+
+@pytest.fixture(scope="session")
+def base(tmp_path_factory) -> BaseSintetica:
+    random.seed(SEMILLA)
+    aeropuertos, fechas, vuelos = benchmark.generar_horario(AEROPUERTOS, DIAS)
+    url = "sqlite:///" + str(tmp_path_factory.mktemp("base") / "fly_data.db")
+    engine = benchmark.preparar_base(url)
+    benchmark.cargar_horario(engine, aeropuertos, vuelos)
+
+    # los aeropuertos se reparten entre dos países, para los endpoints que filtran por país
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Country),
+            [
+                {"id": i, "code": code, "name": name, "continent": continent}
+                for i, (code, name, continent) in enumerate(PAISES, start=1)
+            ],
+        )
+        for i, (code, _, _) in enumerate(PAISES):
+            connection.execute(
+                update(Airport).where(Airport.id % len(PAISES) == i).values(iso_country=code)
+            )
+
+    corpus = benchmark.generar_corpus(aeropuertos, fechas, CONSULTAS)
+    return BaseSintetica(url, engine, sessionmaker(bind=engine), fechas, corpus)
+
+
+@pytest.fixture(scope="session")
+def aplicacion(base: BaseSintetica):
+    """
+    El módulo `app` sobre la base sintética (se importa una vez, con la configuración por
+    defecto).
+    """
+    os.environ["IA_VUELOS_DB_URL"] = base.url
+    import app
+
+    return app
@@ -0,0 +1,176 @@
+"""
+Control de admisión: entran las búsquedas que caben en el presupuesto, las demás esperan o se
+rechazan (las de prioridad baja de inmediato), y los promedios móviles se actualizan con lo que
+costó cada búsqueda.
+"""
+
+import threading
+import time
+
+import pytest
+
+from ia_vuelos import admission, cache
+
+PAR = ((1,), (2,))
+
+
+def estimacion(costo: float, km: float = 100.0) -> admission.Estimacion:
+    return admission.Estimacion(PAR, km, costo * admission.EXPANSIONES_POR_UNIDAD)
+
+
+@pytest.fixture
+def resultados(monkeypatch):
+    # ia_vuelos_admission_total por resultado, aunque las métricas estén desactivadas
+    vistos: list[str] = []
+    lock = threading.Lock()
+
+    def incrementar(nombre, valor=1, **etiquetas):
+        with lock:
+            vistos.append(etiquetas["resultado"])
+
+    monkeypatch.setattr(admission.metrics, "incrementar", incrementar)
+    return vistos
+
+
+def ocupar(controlador: admission.Controlador, costo: float):
+    """
+    Un hilo con una búsqueda de `costo` en curso hasta que se fija el evento que se regresa.
+    """
+    dentro, soltar = threading.Event(), threading.Event()
+
+    def buscar():
+        with controlador.admitir(estimacion(costo)):
+            dentro.set()
+            soltar.wait(5)
+
+    hilo = threading.Thread(target=buscar)
+    hilo.start()
+    assert dentro.wait(5)
+    return hilo, soltar
+
+
+def test_admite_las_que_caben(resultados):
+    controlador = admission.Controlador(presupuesto=2, espera_maxima=0)
+    hilo, soltar = ocupar(controlador, 1)
+    with controlador.admitir(estimacion(1)):
+        assert controlador._corriendo == 2 and controlador._en_curso == 2
+    soltar.set()
+    hilo.join()
+    assert resultados == ["admitida", "admitida"]
+    assert controlador._corriendo == 0 and controlador._en_curso == 0
+
+
+def test_admite_una_sola_aunque_no_quepa(resultados):
+    controlador = admission.Controlador(presupuesto=1, espera_maxima=0)
+    with controlador.admitir(estimacion(5)):
+        assert controlador._en_curso == 1
+    assert resultados == ["admitida"]
+
+
+def test_difiere_hasta_que_se_libera(resultados):
+    controlador = admission.Controlador(presupuesto=1, espera_maxima=5)
+    hilo, soltar = ocupar(controlador, 1)
+    admitida = threading.Event()
+
+    def esperar():
+        with controlador.admitir(estimacion(1)):
+            admitida.set()
+
+    otro = threading.Thread(target=esperar)
+    otro.start()
+    time.sleep(0.05)
+    assert not admitida.is_set() and controlador._esperando == 1
+    soltar.set()
+    assert admitida.wait(5)
+    hilo.join()
+    otro.join()
+    assert resultados == ["admitida", "diferida"]
+    assert controlador._esperando == 0 and controlador._corriendo == 0
+
+
+def test_rechaza(resultados):
+    controlador = admission.Controlador(presupuesto=1, espera_maxima=0.05)
+    hilo, soltar = ocupar(controlador, 1)
+    try:
+        inicio = time.monotonic()
+        with pytest.raises(admission.Rechazada) as baja:
+            with controlador.admitir(estimacion(1), "low"):
+                pass
+        # la de prioridad baja no espera
+        assert time.monotonic() - inicio < 0.05
+        with pytest.raises(admission.Rechazada) as normal:
+            with controlador.admitir(estimacion(1)):
+                pass
+        assert time.monotonic() - inicio >= 0.05
+    finally:
+        soltar.set()
+        hilo.join()
+    assert baja.value.retry_after >= 1 and normal.value.retry_after >= 1
+    assert resultados == ["admitida", "rechazada", "rechazada"]
+    assert controlador._esperando == 0 and controlador._corriendo == 0
+
+
+def test_promedios_moviles():
+    controlador = admission.Controlador(presupuesto=8, espera_maxima=0)
+    controlador.registrar(estimacion(1, km=100.0), 100, 2.0)
+    assert controlador._historial[PAR] == 100
+    assert controlador._expansiones_por_km == 1.0
+    # 100 expansiones son 2 búsquedas típicas: 1 s por unidad
+    assert controlador._segundos_por_unidad == 1.0
+
+    controlador.registrar(estimacion(1, km=100.0), 200, 8.0)
+    alfa = admission.ALFA
+    assert controlador._historial[PAR] == pytest.approx((1 - alfa) * 100 + alfa * 200)
+    assert controlador._expansiones_por_km == pytest.approx((1 - alfa) * 1.0 + alfa * 2.0)
+    assert controlador._segundos_por_unidad == pytest.approx((1 - alfa) * 1.0 + alfa * 2.0)
+
+
+def test_actual_un_solo_controlador(monkeypatch):
+    monkeypatch.setenv("IA_VUELOS_ADMISSION", "1")
+    admission.usar(None)
+
+    class Lento(admission.Controlador):
+        def __init__(self, *args, **kwargs) -> None:
+            time.sleep(0.01)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(admission, "Controlador", Lento)
+    barrera = threading.Barrier(8)
+    vistos = []
+
+    def pedir():
+        barrera.wait()
+        vistos.append(admission.actual())
+
+    hilos = [threading.Thread(target=pedir) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    admission.usar(None)
+    assert len(vistos) == 8 and len({id(controlador) for controlador in vistos}) == 1
+
+
+def test_get_path_429(aplicacion, base, monkeypatch):
+    controlador = admission.Controlador(presupuesto=1, espera_maxima=0)
+    admission.usar(controlador)
+    monkeypatch.setattr(cache, "rutas", cache.CacheLRU())
+    origin_id, destination_id, date_str = base.corpus[0]
+    url = f"/get_path?origin_id={origin_id}&destination_id={destination_id}&date={date_str}"
+    cliente = aplicacion.app.test_client()
+    try:
+        hilo, soltar = ocupar(controlador, 1)
+        try:
+            respuesta = cliente.get(url, headers={"X-Priority": "low"})
+        finally:
+            soltar.set()
+            hilo.join()
+        assert respuesta.status_code == 429
+        assert int(respuesta.headers["Retry-After"]) >= 1
+
+        # libre otra vez: se busca y se registra lo que costó
+        respuesta = cliente.get(url, headers={"X-Priority": "low"})
+        assert respuesta.status_code == 200
+        assert controlador._corriendo == 0 and len(controlador._historial) == 1
+    finally:
+        admission.usar(None)
@@ -0,0 +1,33 @@
+"""
+Caché de rutas: desactivada por defecto y LRU cuando se activa.
+"""
+
+import os
+
+import pytest
+
+from ia_vuelos import cache
+
+
+@pytest.mark.skipif("IA_VUELOS_ROUTE_CACHE_SIZE" in os.environ, reason="caché configurada")
+def test_desactivada_por_defecto():
+    assert not cache.rutas.habilitada()
+    cache.rutas.guardar(("a",), {"path": []})
+    assert cache.rutas.obtener(("a",)) is None
+    assert len(cache.rutas) == 0
+
+
+def test_lru():
+    lru = cache.CacheLRU(2)
+    lru.guardar("a", 1)
+    lru.guardar("b", 2)
+    assert lru.obtener("a") == 1
+    # "b" es la menos usada
+    lru.guardar("c", 3)
+    assert "b" not in lru and lru.obtener("a") == 1 and lru.obtener("c") == 3
+
+
+def test_llave_ruta_sin_orden():
+    assert cache.llave_ruta([3, 1], [7], "2024-01-02") == cache.llave_ruta(
+        (1, 3), [7], "2024-01-02"
+    )
@@ -0,0 +1,47 @@
+"""
+Horario comprimido: se descomprime igual que el original, salvo los precios, que quedan a lo más
+a `paso_precio / 2` centavos (también en el límite de uint16 de la diferencia cuantizada).
+"""
+
+import numpy as np
+import pytest
+
+from ia_vuelos import compressed_graph, graph
+
+HORA_US = 3_600 * 1_000_000
+
+
+def comparar(horario: graph.Horario) -> compressed_graph.HorarioComprimido:
+    comprimido = compressed_graph.comprimir(horario)
+    descomprimido = comprimido.descomprimir()
+    for nombre in ("ids", "offsets", "salida", "llegada", "destino", "flight_id", "modelo"):
+        assert np.array_equal(getattr(descomprimido, nombre), getattr(horario, nombre)), nombre
+    tolerancia = comprimido.paso_precio / 2 / 100 + 1e-9
+    for nombre in ("precio_business", "precio_economy"):
+        error = np.abs(getattr(descomprimido, nombre) - getattr(horario, nombre))
+        assert error.max(initial=0) <= tolerancia, nombre
+    return comprimido
+
+
+def test_horario_sintetico(base):
+    comparar(graph.construir_desde_db(base.engine))
+
+
+@pytest.mark.parametrize("centavos, paso", [(65_535, 1), (65_536, 2), (131_071, 4)])
+def test_limite_de_la_diferencia_cuantizada(centavos, paso):
+    # tres vuelos del mismo tramo (origen, destino, modelo y duración); la diferencia sobre el
+    # mínimo del tramo va de 0 a `centavos`
+    salida = np.array([8, 12, 16], dtype=np.int64) * HORA_US
+    horario = graph.Horario(
+        ids=np.array([1, 2], dtype=np.int64),
+        offsets=np.array([0, 3, 3], dtype=np.int64),
+        salida=salida,
+        llegada=salida + 2 * HORA_US,
+        destino=np.array([1, 1, 1], dtype=np.int32),
+        flight_id=np.array([b"AB1234", b"AB1235", b"AB1236"], dtype="S11"),
+        modelo=np.zeros(3, dtype=np.uint8),
+        modelos=("Airbus A320neo",),
+        precio_business=np.array([100.0, 100.0 + centavos / 200, 100.0 + centavos / 100]),
+        precio_economy=np.full(3, 50.0),
+    )
+    assert comparar(horario).paso_precio == paso
@@ -0,0 +1,79 @@
+"""
+Índice de vuelos directos: las mismas salidas que recorrer el horario, con las horas guardadas en
+uint32 (también sobre el horario comprimido, decodificado por trozos).
+"""
+
+import random
+from datetime import timedelta
+
+import numpy as np
+import pytest
+
+from ia_vuelos import compressed_graph, direct_flights, graph
+
+MINUTO_US = 60_000_000
+
+
+@pytest.fixture(scope="module")
+def horario(base):
+    return graph.construir_desde_db(base.engine)
+
+
+def esperadas(horario: graph.Horario, origen: int, destino: int, desde: int, hasta: int):
+    inicio, fin = int(horario.offsets[origen]), int(horario.offsets[origen + 1])
+    return [
+        posicion
+        for posicion in range(inicio, fin)
+        if horario.destino[posicion] == destino and desde <= horario.salida[posicion] < hasta
+    ]
+
+
+def comparar(horario: graph.Horario, indice: direct_flights.IndiceDirectos) -> None:
+    aleatorio = random.Random(7)
+    pares = [
+        (int(llave // len(horario.ids)), int(llave % len(horario.ids))) for llave in indice.pares
+    ]
+    for origen, destino in aleatorio.sample(pares, min(len(pares), 50)):
+        salidas = horario.salida[esperadas(horario, origen, destino, 0, np.iinfo(np.int64).max)]
+        # en una salida exacta, un µs antes o después, y fuera del rango del horario
+        bordes = [int(salidas[0]) - 10**12, int(salidas[-1]) + 10**12]
+        for salida in aleatorio.sample(list(salidas), min(len(salidas), 5)):
+            bordes += [int(salida) - 1, int(salida), int(salida) + 1]
+        for desde in bordes:
+            for hasta in (desde + MINUTO_US * 90, desde + 10**13):
+                rango = indice.rango(origen, destino, desde, hasta).tolist()
+                assert rango == esperadas(horario, origen, destino, desde, hasta)
+        dia = graph.EPOCA + timedelta(microseconds=int(salidas[0]) + 1)
+        assert (
+            indice.siguientes(origen, destino, dia, 3)
+            == esperadas(horario, origen, destino, int(salidas[0]) + 1, np.iinfo(np.int64).max)[:3]
+        )
+
+
+def test_horario(horario):
+    indice = direct_flights.IndiceDirectos(horario)
+    assert indice.salida.dtype == np.uint32 and indice.unidad == MINUTO_US
+    comparar(horario, indice)
+
+
+def test_horario_comprimido(horario, monkeypatch):
+    # trozos chicos, para cruzar sus bordes
+    monkeypatch.setattr(direct_flights, "TROZO", 97)
+    comprimido = compressed_graph.comprimir(horario)
+    indice = direct_flights.IndiceDirectos(comprimido)
+    assert indice.salida.dtype == np.uint32
+    assert np.array_equal(indice.salida, direct_flights.IndiceDirectos(horario).salida)
+    comparar(horario, indice)
+
+
+def test_salidas_en_microsegundos(horario):
+    # sin una unidad que divida a todas las salidas, se guardan en int64 como en el horario
+    columnas = {nombre: getattr(horario, nombre) for nombre in graph.COLUMNAS}
+    columnas["salida"] = horario.salida + 1
+    columnas["llegada"] = horario.llegada + 1
+    otro = graph.Horario(
+        ids=horario.ids, offsets=horario.offsets, modelos=horario.modelos, **columnas
+    )
+    indice = direct_flights.IndiceDirectos(otro)
+    assert indice.salida.dtype == np.int64 and indice.unidad == 1
+    comparar(otro, indice)
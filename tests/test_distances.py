@@ -0,0 +1,21 @@
+"""
+Matriz de distancias: los destinos en rango de cada modelo, con su distancia leída de la fila.
+"""
+
+import numpy as np
+
+from ia_vuelos import distances
+
+
+def test_factibles_con_distancia():
+    rng = np.random.default_rng(0)
+    ids = np.arange(1, 201)
+    matriz = distances.construir(ids, rng.uniform(-60, 60, len(ids)), rng.uniform(-180, 180, 200))
+    for modelo, rango in distances.RANGOS_KM.items():
+        destinos, km = matriz.factibles_con_distancia(5, modelo)
+        assert destinos.tolist() == matriz.destinos_factibles(5, modelo).tolist()
+        assert 5 not in destinos.tolist()
+        assert km.tolist() == [matriz.distancia(5, int(d)) for d in destinos]
+        assert (km <= rango).all()
+    vacios = matriz.factibles_con_distancia(999, "Airbus A320neo")
+    assert len(vacios[0]) == len(vacios[1]) == 0
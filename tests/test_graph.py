@@ -0,0 +1,92 @@
+"""
+Horario en memoria: los mismos vecinos que la consulta a la base, también con vuelos a aeropuertos
+que no están en la tabla `airports`.
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, delete, insert
+from sqlalchemy.orm import Session
+
+from ia_vuelos import graph
+from ia_vuelos.lib import a_star
+from ia_vuelos.sqlalchemy import Airport, Base, Flight
+
+DIA = datetime(2024, 1, 2)
+FANTASMA = 99
+
+
+def vuelo(flight_id: str, origen: int, destino: int, salida: int, llegada: int) -> dict:
+    return {
+        "flight_id": flight_id,
+        "model": "Airbus A320neo",
+        "price_business": 120.0,
+        "price_economy": 100.0,
+        "departure_time": DIA.replace(hour=salida),
+        "arrival_time": DIA.replace(hour=llegada),
+        "departure_airport_id": origen,
+        "arrival_airport_id": destino,
+    }
+
+
+@pytest.fixture
+def engine(tmp_path):
+    # sin `storage.make_engine`, que activa las llaves foráneas: así entran vuelos a un
+    # aeropuerto que no existe, como en una base cargada sin ellas
+    engine = create_engine(f"sqlite:///{tmp_path / 'vuelos.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Airport),
+            [
+                {
+                    "id": i,
+                    "ident": f"A{i}",
+                    "type": "medium_airport",
+                    "name": f"Airport {i}",
+                    "latitude_deg": 10.0 * i,
+                    "longitude_deg": 5.0 * i,
+                }
+                for i in (1, 2, 3)
+            ],
+        )
+        connection.execute(
+            insert(Flight),
+            [
+                vuelo("F12", 1, 2, 8, 10),
+                vuelo("F23", 2, 3, 12, 14),
+                vuelo("F1X", 1, FANTASMA, 7, 8),
+                vuelo("FX3", FANTASMA, 3, 9, 10),
+            ],
+        )
+    yield engine
+    graph.usar(None)
+
+
+def test_descarta_vuelos_sin_aeropuerto(engine):
+    horario = graph.construir_desde_db(engine)
+    assert horario.ids.tolist() == [1, 2, 3]
+    assert sorted(f.decode() for f in horario.flight_id.tolist()) == ["F12", "F23"]
+
+
+def test_mismo_camino_que_la_base(engine):
+    with Session(engine) as session:
+        origen, destino = session.get(Airport, 1), session.get(Airport, 3)
+        en_base, _ = a_star(session, origen, destino, DIA)
+        graph.usar(graph.construir_desde_db(engine))
+        en_memoria, _ = a_star(session, origen, destino, DIA)
+    assert [v.flight_id for _, v in en_base] == [v.flight_id for _, v in en_memoria]
+    assert [v.flight_id for _, v in en_memoria] == ["F12", "F23"]
+
+
+def test_vecinos_sin_aeropuerto_de_destino(engine):
+    horario = graph.construir_desde_db(engine)
+    # el aeropuerto 2 desaparece después de cargar el horario
+    with engine.begin() as connection:
+        connection.execute(delete(Airport).where(Airport.id == 2))
+    with Session(engine) as session:
+        vecinos = graph.vecinos(
+            session, horario, session.get(Airport, 1), DIA, DIA.replace(hour=23)
+        )
+    assert vecinos == []
@@ -0,0 +1,139 @@
+"""
+Itinerarios alternativos (`a_star_k` y `/get_path?k=`): distintos, del mejor al peor, con el
+primero igual al de `a_star`, y cortados al pasar el límite de tiempo o de expansiones.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from ia_vuelos import cache, rules
+from ia_vuelos.lib import a_star, a_star_k
+from ia_vuelos.sqlalchemy import Airport
+
+K = 5
+
+
+def costo(camino: list) -> timedelta:
+    return camino[-1][1].arrival_time - camino[0][1].arrival_time
+
+
+def secuencia(camino: list, final: Airport) -> tuple:
+    return tuple(aeropuerto.id for aeropuerto, _ in camino) + (final.id,)
+
+
+@pytest.fixture(scope="module")
+def cliente(aplicacion):
+    return aplicacion.app.test_client()
+
+
+def consultas(base, session):
+    for origin_id, destination_id, date_str in base.corpus:
+        origen, destino = session.get(Airport, origin_id), session.get(Airport, destination_id)
+        yield origen, destino, datetime.strptime(date_str, "%Y-%m-%d")
+
+
+def test_distintos_y_en_orden(base):
+    reglas = rules.Reglas()
+    con_alternativas = 0
+    with base.SessionLocal() as session:
+        for origen, destino, dia in consultas(base, session):
+            caminos = a_star_k(session, origen, destino, dia, k=K, reglas=reglas)
+            assert len(caminos) <= K
+            assert len({secuencia(*camino) for camino in caminos}) == len(caminos)
+            costos = [costo(camino) for camino, _ in caminos]
+            assert costos == sorted(costos)
+            for camino, final in caminos:
+                assert camino[0][0].id == origen.id and final.id == destino.id
+                assert len(set(secuencia(camino, final))) == len(camino) + 1
+                for (_, anterior), (aeropuerto, vuelo) in zip(camino, camino[1:]):
+                    assert anterior.arrival_airport_id == aeropuerto.id
+                    assert reglas.conexion_valida(
+                        aeropuerto, anterior.arrival_time, vuelo.departure_time
+                    )
+            con_alternativas += len(caminos) > 1
+    assert con_alternativas, "el corpus debe tener pares con alternativas"
+
+
+def test_primero_como_a_star(base):
+    with base.SessionLocal() as session:
+        for origen, destino, dia in consultas(base, session):
+            camino, _ = a_star(session, origen, destino, dia)
+            uno = a_star_k(session, origen, destino, dia, k=1)
+            varios = a_star_k(session, origen, destino, dia, k=K)
+            if not camino:
+                assert uno == [] and varios == []
+                continue
+            # con una etiqueta por aeropuerto es la misma búsqueda; con más no puede costar más
+            assert costo(uno[0][0]) == costo(camino)
+            assert costo(varios[0][0]) <= costo(camino)
+
+
+@pytest.mark.parametrize(
+    "limites", [{"max_expansiones": 1}, {"limite_segundos": 0.0}], ids=["expansiones", "tiempo"]
+)
+def test_truncada(base, limites):
+    origin_id, destination_id, date_str = next(
+        consulta for consulta in base.corpus if consulta[0] != consulta[1]
+    )
+    estadisticas: dict[str, int] = {}
+    with base.SessionLocal() as session:
+        caminos = a_star_k(
+            session,
+            session.get(Airport, origin_id),
+            session.get(Airport, destination_id),
+            datetime.strptime(date_str, "%Y-%m-%d"),
+            k=K,
+            estadisticas=estadisticas,
+            **limites,
+        )
+    assert estadisticas["truncada"] == 1
+    assert len(caminos) < K
+
+
+def costo_json(camino: list) -> timedelta:
+    return datetime.fromisoformat(
+        camino[-1]["next_flight"]["arrival_time"]
+    ) - datetime.fromisoformat(camino[0]["next_flight"]["arrival_time"])
+
+
+def test_get_path_k(base, cliente):
+    with base.SessionLocal() as session:
+        for origen, destino, dia in consultas(base, session):
+            camino, _ = a_star(session, origen, destino, dia)
+            url = (
+                f"/get_path?origin_id={origen.id}&destination_id={destino.id}"
+                f"&date={dia.date().isoformat()}"
+            )
+            uno = cliente.get(url).get_json()
+            respuesta = cliente.get(f"{url}&k={K}").get_json()
+            paths = respuesta["paths"]
+            assert 1 <= len(paths) <= K
+            # "path" no depende de k, y es el primero de "paths"
+            assert paths[0]["path"] == respuesta["path"] == uno["path"]
+            assert paths[0]["final_airport"] == respuesta["final_airport"]
+            if not camino:
+                assert paths == [{"path": [], "final_airport": destino.to_dict()}]
+                continue
+            assert costo_json(paths[0]["path"]) == costo(camino)
+            secuencias = {
+                tuple(tramo["airport"]["id"] for tramo in path["path"])
+                + (path["final_airport"]["id"],)
+                for path in paths
+            }
+            assert len(secuencias) == len(paths)
+            costos = [costo_json(path["path"]) for path in paths[1:]]
+            assert costos == sorted(costos)
+
+
+def test_get_path_k_con_limite(base, cliente, aplicacion, monkeypatch):
+    # sin tiempo para las alternativas, queda al menos la del mejor itinerario
+    monkeypatch.setattr(aplicacion, "K_PATHS_DEADLINE_S", 0.0)
+    monkeypatch.setattr(cache, "rutas", cache.CacheLRU())
+    origin_id, destination_id, date_str = base.corpus[0]
+    respuesta = cliente.get(
+        f"/get_path?origin_id={origin_id}&destination_id={destination_id}&date={date_str}" f"&k={K}"
+    )
+    assert respuesta.status_code == 200
+    paths = respuesta.get_json()["paths"]
+    assert 1 <= len(paths) < K and paths[0]["path"] == respuesta.get_json()["path"]
@@ -0,0 +1,45 @@
+"""
+Validación de los parámetros de `/nearby_airports`.
+"""
+
+import pytest
+
+from ia_vuelos.distances import RADIO_TIERRA_KM
+
+
+@pytest.fixture(scope="module")
+def cliente(aplicacion):
+    return aplicacion.app.test_client()
+
+
+@pytest.mark.parametrize(
+    "consulta",
+    [
+        "lat=19.4&lon=-99.1&k=0",
+        "lat=19.4&lon=-99.1&k=-3",
+        "lat=19.4&lon=-99.1&k=501",
+        "lat=19.4&lon=-99.1&k=abc",
+        "lat=19.4&lon=-99.1&k=2.5",
+        "lat=19.4&lon=-99.1&radius_km=-1",
+        "lat=19.4&lon=-99.1&radius_km=nan",
+        "airport_id=abc",
+        "lat=19.4",
+    ],
+)
+def test_parametros_invalidos(cliente, consulta):
+    assert cliente.get(f"/nearby_airports?{consulta}").status_code == 400
+
+
+def test_k(cliente):
+    respuesta = cliente.get("/nearby_airports?lat=19.4&lon=-99.1&k=3")
+    assert respuesta.status_code == 200
+    distancias = [aeropuerto["distance_km"] for aeropuerto in respuesta.get_json()]
+    assert len(distancias) == 3 and distancias == sorted(distancias)
+
+
+def test_radio_sin_k_acotado(aplicacion, cliente, monkeypatch):
+    # todo el globo está dentro del radio: sin k se regresan a lo más NEARBY_MAX
+    monkeypatch.setattr(aplicacion, "NEARBY_MAX", 10)
+    respuesta = cliente.get(f"/nearby_airports?lat=0&lon=0&radius_km={RADIO_TIERRA_KM * 4}")
+    assert respuesta.status_code == 200
+    assert len(respuesta.get_json()) == 10
@@ -0,0 +1,47 @@
+"""
+Validación de los parámetros de `/next_departures`, con y sin el horario en memoria.
+"""
+
+import pytest
+
+from ia_vuelos import graph
+
+
+@pytest.fixture(scope="module")
+def cliente(aplicacion):
+    return aplicacion.app.test_client()
+
+
+@pytest.fixture(params=["base", "horario"])
+def camino(request, base):
+    if request.param == "horario":
+        graph.usar(graph.construir_desde_db(base.engine))
+    yield request.param
+    graph.usar(None)
+
+
+def url(base, **parametros) -> str:
+    origin_id, destination_id, date_str = base.corpus[0]
+    consulta = {"origin_id": origin_id, "destination_id": destination_id, "after": date_str}
+    consulta.update(parametros)
+    return "/next_departures?" + "&".join(f"{k}={v}" for k, v in consulta.items())
+
+
+@pytest.mark.parametrize("n", ["0", "-1", "101", "abc", "2.5"])
+def test_n_fuera_de_rango(cliente, base, camino, n):
+    assert cliente.get(url(base, n=n)).status_code == 400
+
+
+@pytest.mark.parametrize("after", ["2024-01-02T10:00%2B02:00", "2024-01-02T10:00Z"])
+def test_after_con_zona_horaria(cliente, base, camino, after):
+    assert cliente.get(url(base, after=after)).status_code == 400
+
+
+def test_salidas_en_orden(cliente, base, camino):
+    respuesta = cliente.get(url(base, n=100))
+    assert respuesta.status_code == 200
+    vuelos = respuesta.get_json()
+    assert len(vuelos) <= 100
+    salidas = [vuelo["departure_time"] for vuelo in vuelos]
+    assert salidas == sorted(salidas)
+    assert len(cliente.get(url(base, n=1)).get_json()) == min(len(vuelos), 1)
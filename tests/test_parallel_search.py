@@ -0,0 +1,88 @@
+"""
+A* paralelo: el mismo costo que `a_star` en el corpus de las pruebas (en general no está
+garantizado, ver la limitación en `ia_vuelos/parallel_search.py`), y los procesos solo se crean
+cuando se piden.
+"""
+
+from datetime import datetime
+
+import pytest
+
+from ia_vuelos import graph, parallel_search
+from ia_vuelos.lib import a_star
+from ia_vuelos.sqlalchemy import Airport
+
+# el mismo límite que `scripts/benchmark.py`
+MAX_EXPANSIONES = 2000
+
+
+def costo(camino: list) -> float | None:
+    if not camino:
+        return None
+    return (camino[-1][1].arrival_time - camino[0][1].arrival_time).total_seconds()
+
+
+@pytest.fixture(scope="module")
+def horario(base):
+    horario = graph.construir_desde_db(base.engine)
+    graph.usar(horario)
+    yield horario
+    graph.usar(None)
+
+
+@pytest.fixture(scope="module")
+def grupo(base, horario):
+    with base.SessionLocal() as session:
+        grupo = parallel_search.crear(session, horario, 2)
+    yield grupo
+    grupo.cerrar()
+
+
+def test_mismo_costo_que_a_star(base, grupo):
+    con_escalas = 0
+    with base.SessionLocal() as session:
+        for origin_id, destination_id, date_str in base.corpus:
+            origen, destino = session.get(Airport, origin_id), session.get(Airport, destination_id)
+            dia = datetime.strptime(date_str, "%Y-%m-%d")
+            camino, _ = a_star(session, origen, destino, dia, max_expansiones=MAX_EXPANSIONES)
+            encontrado = parallel_search.a_star_paralelo(session, grupo, [origen], [destino], dia)
+            assert encontrado is not None
+            assert costo(encontrado[0]) == costo(camino), (origin_id, destination_id, date_str)
+            con_escalas += len(camino) > 1
+    assert con_escalas, "el corpus debe tener rutas con escalas"
+
+
+def test_cota_admisible(base, horario, grupo):
+    # en los caminos de `a_star`, la cota desde cada escala no pasa del costo que falta
+    revisadas = 0
+    with base.SessionLocal() as session:
+        for origin_id, destination_id, date_str in base.corpus:
+            dia = datetime.strptime(date_str, "%Y-%m-%d")
+            camino, _ = a_star(
+                session,
+                session.get(Airport, origin_id),
+                session.get(Airport, destination_id),
+                dia,
+                max_expansiones=MAX_EXPANSIONES,
+            )
+            h = grupo.heuristica([horario.indice(destination_id)])
+            for (_, anterior), (aeropuerto, _) in zip(camino, camino[1:]):
+                falta = (camino[-1][1].arrival_time - anterior.arrival_time).total_seconds()
+                assert h[horario.indice(int(aeropuerto.id))] <= falta * 1e6
+                revisadas += 1
+    assert revisadas
+
+
+def test_procesos_al_pedirlos(monkeypatch, base, horario):
+    assert parallel_search.actual() is None
+    with base.SessionLocal() as session:
+        assert parallel_search.para(session, horario) is None
+        monkeypatch.setenv("IA_VUELOS_PARALLEL_WORKERS", "2")
+        assert parallel_search.para(session, None) is None
+        grupo = parallel_search.para(session, horario)
+        try:
+            assert grupo is not None and grupo.procesos == 2
+            assert parallel_search.para(session, horario) is grupo
+        finally:
+            grupo.cerrar()
+            parallel_search.usar(None)
@@ -0,0 +1,80 @@
+"""
+Alcanzabilidad precalculada: nunca descarta una ruta que `a_star` encuentra, y la guardada solo se
+usa con el horario con el que se calculó.
+"""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from ia_vuelos import graph, reachability
+from ia_vuelos.lib import a_star
+from ia_vuelos.sqlalchemy import Airport
+
+# el mismo límite que `scripts/benchmark.py`
+MAX_EXPANSIONES = 2000
+
+
+@pytest.fixture(scope="module")
+def horario(base):
+    return graph.construir_desde_db(base.engine)
+
+
+@pytest.fixture
+def sin_global():
+    yield
+    reachability.usar(None)
+
+
+def test_sin_falsos_negativos(base, horario):
+    alcanzabilidad = reachability.construir(horario)
+    encontradas = 0
+    with base.SessionLocal() as session:
+        for origin_id, destination_id, date_str in base.corpus:
+            dia = datetime.strptime(date_str, "%Y-%m-%d")
+            camino, _ = a_star(
+                session,
+                session.get(Airport, origin_id),
+                session.get(Airport, destination_id),
+                dia,
+                max_expansiones=MAX_EXPANSIONES,
+            )
+            if camino:
+                encontradas += 1
+                assert alcanzabilidad.alcanzable(origin_id, destination_id, dia)
+    assert encontradas
+
+
+def test_cargar_guardada(tmp_path, base, horario, sin_global):
+    construida = reachability.construir(horario)
+    construida.guardar(str(tmp_path))
+    cargada = reachability.cargar_global(horario, str(tmp_path))
+    assert cargada is not None and reachability.actual() is cargada
+    for origin_id, destination_id, date_str in base.corpus:
+        dia = datetime.strptime(date_str, "%Y-%m-%d")
+        assert cargada.alcanzable(origin_id, destination_id, dia) == construida.alcanzable(
+            origin_id, destination_id, dia
+        )
+
+
+def test_no_carga_otro_horario(tmp_path, horario, sin_global):
+    reachability.construir(horario).guardar(str(tmp_path))
+    # el mismo horario con un vuelo que sale una hora después
+    salida = np.array(horario.salida)
+    salida[0] += 3_600 * 1_000_000
+    otro = graph.Horario(
+        horario.ids,
+        horario.offsets,
+        salida,
+        horario.llegada,
+        horario.destino,
+        horario.flight_id,
+        horario.modelo,
+        horario.modelos,
+        horario.precio_business,
+        horario.precio_economy,
+    )
+    assert reachability.cargar_global(otro, str(tmp_path)) is None
+    assert reachability.actual() is None
+    assert reachability.cargar_global(horario, str(tmp_path / "no_existe")) is None
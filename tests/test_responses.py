@@ -0,0 +1,74 @@
+"""
+Compresión de las respuestas JSON, completas y transmitidas por partes.
+"""
+
+import gzip
+import json
+
+import pytest
+from flask import Flask
+
+from ia_vuelos import responses
+
+app = Flask(__name__)
+
+POCOS = [{"id": i} for i in range(3)]
+MUCHOS = [{"id": i, "name": f"Airport {i}"} for i in range(5000)]
+
+
+def cuerpo(respuesta) -> bytes:
+    datos = b"".join(respuesta.response)
+    if respuesta.headers.get("Content-Encoding") == "gzip":
+        return gzip.decompress(datos)
+    return datos
+
+
+@pytest.mark.parametrize("ndjson", [False, True])
+def test_stream_pequenio_sin_comprimir(ndjson):
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        respuesta = responses.stream_json(iter(POCOS), ndjson=ndjson)
+    assert "Content-Encoding" not in respuesta.headers
+    assert not respuesta.is_streamed
+    datos = cuerpo(respuesta).decode()
+    if ndjson:
+        assert [json.loads(linea) for linea in datos.splitlines()] == POCOS
+    else:
+        assert json.loads(datos) == POCOS
+
+
+def test_stream_grande_comprimido():
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        respuesta = responses.stream_json(iter(MUCHOS), ndjson=False)
+        assert respuesta.headers["Content-Encoding"] == "gzip"
+        assert json.loads(cuerpo(respuesta)) == MUCHOS
+
+
+def test_stream_sin_accept_encoding():
+    with app.test_request_context():
+        respuesta = responses.stream_json(iter(MUCHOS), ndjson=False)
+        assert "Content-Encoding" not in respuesta.headers
+        assert json.loads(cuerpo(respuesta)) == MUCHOS
+
+
+def test_json_response_umbral():
+    with app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+        assert "Content-Encoding" not in responses.json_response(POCOS).headers
+        respuesta = responses.json_response(MUCHOS)
+    assert respuesta.headers["Content-Encoding"] == "gzip"
+    assert json.loads(cuerpo(respuesta)) == MUCHOS
+
+
+@pytest.mark.parametrize(
+    "url, headers, vary",
+    [
+        ("/", {}, "Accept, Accept-Encoding"),
+        ("/", {"Accept": "application/x-ndjson"}, "Accept, Accept-Encoding"),
+        ("/?format=ndjson", {}, "Accept-Encoding"),
+    ],
+)
+def test_stream_vary_accept(url, headers, vary):
+    with app.test_request_context(url, headers=headers):
+        assert responses.stream_json(iter(POCOS)).headers["Vary"] == vary
+    # con el formato fijo no depende del `Accept`
+    with app.test_request_context(url, headers=headers):
+        assert responses.stream_json(iter(POCOS), ndjson=False).headers["Vary"] == "Accept-Encoding"
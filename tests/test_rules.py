@@ -0,0 +1,90 @@
+"""
+Reglas de conexión en la búsqueda, sobre el corpus de los benchmarks: ningún camino las rompe y,
+al no generar las conexiones imposibles, se expanden menos aeropuertos que sin ellas.
+"""
+
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from ia_vuelos import rules
+from ia_vuelos.lib import a_star
+from ia_vuelos.sqlalchemy import Airport
+
+# el mismo límite que `scripts/benchmark.py`
+MAX_EXPANSIONES = 2000
+
+
+def buscar_corpus(base, reglas: rules.Reglas) -> list[tuple[tuple, list, int]]:
+    """
+    `(consulta, camino, expansiones)` de cada consulta del corpus.
+    """
+    resultados = []
+    for consulta in base.corpus:
+        origin_id, destination_id, date_str = consulta
+        estadisticas: dict[str, int] = {}
+        with base.SessionLocal() as session:
+            camino, _ = a_star(
+                session,
+                session.get(Airport, origin_id),
+                session.get(Airport, destination_id),
+                datetime.strptime(date_str, "%Y-%m-%d"),
+                estadisticas=estadisticas,
+                max_expansiones=MAX_EXPANSIONES,
+                reglas=reglas,
+            )
+        resultados.append((consulta, camino, estadisticas["expansiones"]))
+    return resultados
+
+
+@pytest.fixture(scope="module")
+def con_reglas(base):
+    return buscar_corpus(base, rules.Reglas())
+
+
+@pytest.fixture(scope="module")
+def sin_reglas(base):
+    return buscar_corpus(base, rules.Reglas.sin_restricciones())
+
+
+def test_ningun_camino_invalido(con_reglas):
+    reglas = rules.Reglas()
+    caminos = [(consulta, camino) for consulta, camino, _ in con_reglas if camino]
+    assert caminos, "el corpus debe tener rutas con escalas"
+    for (origin_id, destination_id, date_str), camino in caminos:
+        dia = datetime.strptime(date_str, "%Y-%m-%d")
+        assert camino[0][0].id == origin_id
+        assert dia <= camino[0][1].departure_time < dia + timedelta(days=1)
+        assert camino[-1][1].arrival_airport_id == destination_id
+        for (_, anterior), (aeropuerto, vuelo) in zip(camino, camino[1:]):
+            # sin cambiar de aeropuerto entre vuelos
+            assert vuelo.departure_airport_id == anterior.arrival_airport_id == aeropuerto.id
+            espera = vuelo.departure_time - anterior.arrival_time
+            assert espera >= reglas.mct(aeropuerto)
+            assert espera < reglas.escala_maxima_en(aeropuerto)
+
+
+def test_menos_expansiones(con_reglas, sin_reglas):
+    total_con = sum(expansiones for _, _, expansiones in con_reglas)
+    total_sin = sum(expansiones for _, _, expansiones in sin_reglas)
+    assert total_con < total_sin
+
+
+def test_excepciones_por_aeropuerto(tmp_path):
+    ruta = tmp_path / "rules.json"
+    ruta.write_text(
+        json.dumps(
+            {
+                "mct_min_by_type": {"large_airport": 75},
+                "max_layover_min": 600,
+                "airports": {"7": {"mct_min": 90, "max_layover_min": 120}},
+            }
+        )
+    )
+    reglas = rules.cargar(str(ruta))
+    assert reglas.mct_de(1, "large_airport") == timedelta(minutes=75)
+    assert reglas.mct_de(1, "medium_airport") == rules.MCT_POR_TIPO["medium_airport"]
+    assert reglas.mct_de(7, "large_airport") == timedelta(minutes=90)
+    assert reglas.escala_maxima_de(1) == timedelta(minutes=600)
+    assert reglas.escala_maxima_de(7) == timedelta(minutes=120)
@@ -0,0 +1,33 @@
+"""
+Índice de `/search_airports`: se construye al arrancar y tolera errores de dedo.
+"""
+
+from ia_vuelos import search_index
+
+# COLUMNAS (id, ident, iata_code, name, municipality, iso_country, type) y keywords
+FILAS = [
+    (1, "MMMX", "MEX", "Benito Juárez Intl", "Ciudad de México", "MX", "large_airport", None),
+    (2, "MMGL", "GDL", "Guadalajara Intl", "Guadalajara", "MX", "large_airport", None),
+    (3, "SKBO", "BOG", "El Dorado Intl", "Bogotá", "CO", "large_airport", None),
+    (4, "MMSM", "NLU", "Felipe Ángeles Intl", "Santa Lucía", "MX", "large_airport", "AIFA"),
+    (5, "MX-0001", None, "Helipuerto Ciudad de México", "Ciudad de México", "MX", "heliport", None),
+]
+
+
+def test_construido_al_arrancar(aplicacion):
+    assert set(search_index._indices) == {False, True}
+
+
+def test_buscar():
+    indice = search_index.IndiceBusqueda(FILAS)
+    assert [indice.filas[p][0] for p, _ in indice.buscar("mex")][:1] == [1]
+    # todas las palabras deben coincidir, en cualquier campo y orden
+    assert [indice.filas[p][0] for p, _ in indice.buscar("intl mexico")] == [1]
+    assert [indice.filas[p][0] for p, _ in indice.buscar("ciudad mex", k=1)] == [1]
+    assert indice.buscar("bogota dorado guadalajara") == []
+
+
+def test_errores_de_dedo():
+    indice = search_index.IndiceBusqueda(FILAS)
+    assert [indice.filas[p][0] for p, _ in indice.buscar("guadalajata")][:1] == [2]
+    assert [indice.filas[p][0] for p, _ in indice.buscar("intl bogpta")][:1] == [3]
@@ -0,0 +1,77 @@
+"""
+Número de consultas SQL por endpoint: fallan si un endpoint empieza a emitir una consulta por
+fila (N+1).
+"""
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import select
+
+from ia_vuelos import sqltrace
+from ia_vuelos.lib import a_star
+from ia_vuelos.sqlalchemy import Airport
+
+
+@pytest.fixture(scope="module")
+def cliente(aplicacion):
+    return aplicacion.app.test_client()
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "/get_continents",
+        "/get_countries?continent=NA",
+        "/get_airports?iso_country=MX",
+        "/get_airports?iso_country=MX&only_served=1",
+    ],
+)
+def test_listados_una_consulta(aplicacion, cliente, url):
+    with sqltrace.esperar_consultas(aplicacion.engine, 1):
+        respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+    assert respuesta.get_json()
+
+
+def test_next_departures_una_consulta(aplicacion, cliente, base):
+    origin_id, destination_id, date_str = base.corpus[0]
+    url = f"/next_departures?origin_id={origin_id}&destination_id={destination_id}&after={date_str}"
+    with sqltrace.esperar_consultas(aplicacion.engine, 1):
+        respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+
+
+def test_get_path_una_consulta_por_expansion(aplicacion, cliente, base):
+    """
+    `/get_path` (sin el horario en memoria) hace una consulta de vecinos por aeropuerto expandido,
+    más la carga del origen y del destino; nada por cada vuelo o aeropuerto vecino.
+    """
+    for origin_id, destination_id, date_str in base.corpus[:10]:
+        estadisticas: dict[str, int] = {}
+        with base.SessionLocal() as session:
+            a_star(
+                session,
+                session.get(Airport, origin_id),
+                session.get(Airport, destination_id),
+                datetime.strptime(date_str, "%Y-%m-%d"),
+                estadisticas=estadisticas,
+            )
+
+        url = f"/get_path?origin_id={origin_id}&destination_id={destination_id}&date={date_str}"
+        with sqltrace.esperar_consultas(aplicacion.engine, estadisticas["consultas_vecinos"] + 2):
+            respuesta = cliente.get(url)
+        assert respuesta.status_code == 200
+
+
+def test_esperar_consultas_detecta_n_mas_1(base):
+    with pytest.raises(AssertionError, match="se esperaban máximo 1"):
+        with sqltrace.esperar_consultas(base.engine, 1):
+            with base.SessionLocal() as session:
+                aeropuertos = session.scalars(select(Airport).limit(5)).all()
+                # una carga perezosa de `Airport.country` por aeropuerto
+                [aeropuerto.country for aeropuerto in aeropuertos]
+
+
+def test_consultas_endpoint(aplicacion, cliente):
+    assert sqltrace.consultas_endpoint(cliente, aplicacion.engine, "/get_continents") == 1
@@ -0,0 +1,168 @@
+"""
+Patrones de transbordo: minimizan el mismo costo que `a_star` (de la llegada del primer vuelo a la
+del último) y se evalúan con todos los vuelos de cada tramo, no solo con el que llega primero.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import Session
+
+from ia_vuelos import graph, rules, transfer_patterns
+from ia_vuelos.lib import a_star
+from ia_vuelos.sqlalchemy import Airport, Base, Flight
+
+# el mismo límite que `scripts/benchmark.py`
+MAX_EXPANSIONES = 2000
+DIA = datetime(2024, 1, 2)
+
+
+def costo(camino: list) -> timedelta:
+    return camino[-1][1].arrival_time - camino[0][1].arrival_time
+
+
+def preparar(session: Session, horario: graph.Horario, reglas: rules.Reglas):
+    mct_us, escala_us = transfer_patterns.limites_conexion(session, horario, reglas)
+    return transfer_patterns.construir(horario, mct_us, escala_us, procesos=1)
+
+
+@pytest.fixture(scope="module")
+def horario(base):
+    horario = graph.construir_desde_db(base.engine)
+    graph.usar(horario)
+    yield horario
+    graph.usar(None)
+
+
+def test_corpus_no_cuesta_mas_que_a_star(base, horario):
+    reglas = rules.Reglas()
+    with base.SessionLocal() as session:
+        patrones = preparar(session, horario, reglas)
+        comparados = 0
+        for origin_id, destination_id, date_str in base.corpus:
+            origen, destino = session.get(Airport, origin_id), session.get(Airport, destination_id)
+            dia = datetime.strptime(date_str, "%Y-%m-%d")
+            camino, _ = a_star(session, origen, destino, dia, max_expansiones=MAX_EXPANSIONES)
+            encontrado = transfer_patterns.buscar(session, horario, patrones, origen, destino, dia)
+            if not camino or len(camino) > transfer_patterns.MAX_TRAMOS:
+                continue
+            assert encontrado is not None and encontrado[0]
+            por_patrones = encontrado[0]
+            assert por_patrones[0][0].id == origin_id
+            assert dia <= por_patrones[0][1].departure_time < dia + timedelta(days=1)
+            assert por_patrones[-1][1].arrival_airport_id == destination_id
+            for (_, anterior), (aeropuerto, vuelo) in zip(por_patrones, por_patrones[1:]):
+                assert reglas.conexion_valida(
+                    aeropuerto, anterior.arrival_time, vuelo.departure_time
+                )
+            assert costo(por_patrones) <= costo(camino)
+            comparados += len(camino) > 1
+    assert comparados, "el corpus debe tener rutas con escalas"
+
+
+def vuelo(flight_id: str, origen: int, destino: int, salida: int, llegada: int) -> dict:
+    return {
+        "flight_id": flight_id,
+        "model": "Airbus A320neo",
+        "price_business": 120.0,
+        "price_economy": 100.0,
+        "departure_time": DIA.replace(hour=salida),
+        "arrival_time": DIA.replace(hour=llegada),
+        "departure_airport_id": origen,
+        "arrival_airport_id": destino,
+    }
+
+
+@pytest.mark.parametrize(
+    "vuelos, esperado",
+    [
+        # el primer vuelo que llega antes espera 8 h; el siguiente, solo 2 h
+        ([vuelo("F1", 1, 2, 6, 8), vuelo("F2", 1, 2, 12, 14), vuelo("F3", 2, 3, 16, 18)], "F2"),
+        # el primer vuelo que llega antes ya no conecta con la escala máxima de 6 h
+        ([vuelo("F1", 1, 2, 6, 7), vuelo("F2", 1, 2, 9, 10), vuelo("F3", 2, 3, 15, 16)], "F2"),
+    ],
+)
+def test_todos_los_vuelos_del_primer_tramo(tmp_path, vuelos, esperado):
+    engine = create_engine(f"sqlite:///{tmp_path / 'vuelos.db'}")
+    Base.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(
+            insert(Airport),
+            [
+                {
+                    "id": i,
+                    "ident": f"A{i}",
+                    "type": "medium_airport",
+                    "name": f"Airport {i}",
+                    "latitude_deg": 10.0 * i,
+                    "longitude_deg": 5.0 * i,
+                }
+                for i in (1, 2, 3)
+            ],
+        )
+        connection.execute(insert(Flight), vuelos)
+
+    horario = graph.construir_desde_db(engine)
+    with Session(engine) as session:
+        patrones = preparar(session, horario, rules.Reglas(escala_maxima=timedelta(hours=6)))
+        assert patrones.de(0, 2) == [[1]]
+        camino, _ = transfer_patterns.buscar(
+            session, horario, patrones, session.get(Airport, 1), session.get(Airport, 3), DIA
+        )
+    assert [v.flight_id for _, v in camino] == [esperado, "F3"]
+
+
+def otro_horario(horario: graph.Horario) -> graph.Horario:
+    # los mismos aeropuertos, con un vuelo que llega una hora después
+    llegada = np.array(horario.llegada)
+    llegada[0] += 3_600 * 1_000_000
+    columnas = {nombre: getattr(horario, nombre) for nombre in graph.COLUMNAS}
+    columnas["llegada"] = llegada
+    return graph.Horario(
+        ids=horario.ids, offsets=horario.offsets, modelos=horario.modelos, **columnas
+    )
+
+
+@pytest.fixture
+def guardados(tmp_path, base, horario):
+    with base.SessionLocal() as session:
+        preparar(session, horario, rules.actuales()).guardar(str(tmp_path))
+    yield str(tmp_path)
+    transfer_patterns.usar(None)
+    rules.usar(None)
+
+
+def test_cargar_mismo_horario_y_reglas(base, horario, guardados):
+    with base.SessionLocal() as session:
+        patrones = transfer_patterns.cargar_global(session, horario, guardados)
+        assert patrones is not None and transfer_patterns.actual() is patrones
+        origen, destino = session.get(Airport, base.corpus[0][0]), session.get(
+            Airport, base.corpus[0][1]
+        )
+        assert (
+            transfer_patterns.buscar(session, horario, patrones, origen, destino, DIA) is not None
+        )
+        # si después cambian las reglas del proceso, se busca de otra forma
+        rules.usar(rules.Reglas(escala_maxima=timedelta(hours=6)))
+        assert transfer_patterns.buscar(session, horario, patrones, origen, destino, DIA) is None
+
+
+def test_no_carga_otro_horario(base, horario, guardados):
+    with base.SessionLocal() as session:
+        assert transfer_patterns.cargar_global(session, otro_horario(horario), guardados) is None
+    assert transfer_patterns.actual() is None
+
+
+def test_no_carga_otras_reglas(base, horario, guardados):
+    rules.usar(rules.Reglas(escala_maxima=timedelta(hours=6)))
+    with base.SessionLocal() as session:
+        assert transfer_patterns.cargar_global(session, horario, guardados) is None
+
+
+def test_no_carga_formato_anterior(base, horario, guardados):
+    os.remove(os.path.join(guardados, "formato.npy"))
+    with base.SessionLocal() as session:
+        assert transfer_patterns.cargar_global(session, horario, guardados) is None
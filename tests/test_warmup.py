@@ -0,0 +1,13 @@
+"""
+Arranque: geopy se importa antes de la primera búsqueda, aun sin `IA_VUELOS_WARMUP`.
+"""
+
+import sys
+
+from ia_vuelos import warmup
+
+
+def test_geodesic_al_arrancar(aplicacion):
+    assert "geopy.distance" in sys.modules
+    assert "geodesic" in warmup.reporte()["pasos"]
+    assert warmup.listo()